@@ -75,8 +75,55 @@ else
 fi
 
 # Step 4: Restart Gunicorn (if it exists)
+# The API is served through ASGI (uvicorn workers, see server/gunicorn.conf.py) so
+# the realtime/stream/ endpoint can hold connections open. A drop-in replaces the
+# unit's WSGI ExecStart with that config, keeping the address the unit already
+# listened on; the main unit file is left untouched.
+SERVER_DIR="$(pwd)/server"
+VENV_DIR="${VENV_DIR:-${SERVER_DIR}/venv}"
+GUNICORN_BIN="${VENV_DIR}/bin/gunicorn"
+GUNICORN_DROPIN="/etc/systemd/system/gunicorn.service.d/asgi.conf"
+
 print_status "Restarting Gunicorn..."
 if sudo systemctl is-active --quiet gunicorn; then
+    if [ ! -x "${VENV_DIR}/bin/pip" ]; then
+        print_error "No virtualenv at ${VENV_DIR} — set VENV_DIR"
+        exit 1
+    fi
+
+    print_status "Installing server requirements into ${VENV_DIR}..."
+    "${VENV_DIR}/bin/pip" install -q -r "${SERVER_DIR}/requirements.txt"
+
+    # Bind and worker count from the main unit file (drop-ins excluded); gunicorn's defaults otherwise
+    UNIT_FILE="$(systemctl show -p FragmentPath --value gunicorn)"
+    GUNICORN_BIND="$(grep -oP '(--bind[= ]|-b )\K[^ \\]+' "${UNIT_FILE}" | head -n 1)"
+    GUNICORN_BIND="${GUNICORN_BIND:-127.0.0.1:8000}"
+    GUNICORN_WORKERS="$(grep -oP '(--workers[= ]|-w )\K[0-9]+' "${UNIT_FILE}" | head -n 1)"
+    GUNICORN_WORKERS="${GUNICORN_WORKERS:-1}"
+    # nginx names a 0.0.0.0 bind by some other host, so only the port is compared then
+    if ! sudo nginx -T 2>/dev/null | grep -qF "${GUNICORN_BIND#0.0.0.0}"; then
+        print_error "Nginx does not proxy to ${GUNICORN_BIND} (the gunicorn unit's bind) — leaving Gunicorn as it is"
+        exit 1
+    fi
+
+    # Imports the ASGI app and the uvicorn worker class before anything is switched
+    if ! (cd "${SERVER_DIR}" && "${GUNICORN_BIN}" --check-config -c gunicorn.conf.py); then
+        print_error "gunicorn.conf.py failed to load — leaving Gunicorn as it is"
+        exit 1
+    fi
+
+    print_status "Pointing the gunicorn unit at ${SERVER_DIR}/gunicorn.conf.py (ASGI, bind ${GUNICORN_BIND}, ${GUNICORN_WORKERS} workers)"
+    sudo mkdir -p "$(dirname ${GUNICORN_DROPIN})"
+    sudo tee ${GUNICORN_DROPIN} > /dev/null <<EOF
+[Service]
+WorkingDirectory=${SERVER_DIR}
+Environment=GUNICORN_BIND=${GUNICORN_BIND}
+Environment=GUNICORN_WORKERS=${GUNICORN_WORKERS}
+ExecStart=
+ExecStart=${GUNICORN_BIN} -c ${SERVER_DIR}/gunicorn.conf.py
+EOF
+    sudo systemctl daemon-reload
+
     if sudo systemctl restart gunicorn; then
         print_success "Gunicorn restarted successfully"
     else
@@ -112,7 +159,7 @@ echo "🎉 Deployment completed successfully!"
 echo "📊 Summary:"
 echo "   • Client built and deployed to ${DEPLOY_DIR}/"
 echo "   • Nginx reloaded"
-echo "   • Gunicorn restarted (if active)"
+echo "   • Gunicorn restarted with ASGI workers (if active)"
 echo "   • File permissions set correctly"
 echo ""
 echo "🌐 Site live at: https://montrose.agency"
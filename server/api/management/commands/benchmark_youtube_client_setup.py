@@ -0,0 +1,74 @@
+# server/api/management/commands/benchmark_youtube_client_setup.py
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+from api.services.youtube_client_cache import build_client, clear_client_cache, get_discovery_document
+
+
+class Command(BaseCommand):
+    """
+    Compare per-account YouTube client setup cost with and without the caches
+    in api.services.youtube_client_cache. Uses synthetic credentials and the
+    bundled discovery documents, so no network or database access is needed:
+    python manage.py benchmark_youtube_client_setup --accounts 500
+    """
+    help = 'Benchmark YouTube Data + Analytics client setup per account sync'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--accounts',
+            type=int,
+            default=200,
+            help='Number of distinct channels to set up clients for',
+        )
+        parser.add_argument(
+            '--passes',
+            type=int,
+            default=2,
+            help='Sync rounds over the same channels (later rounds reuse cached clients)',
+        )
+
+    def handle(self, *args, **options):
+        accounts = options['accounts']
+        passes = options['passes']
+        credentials = [self._credentials(index) for index in range(accounts)]
+
+        # Before: discovery build() for both APIs on every sync
+        started = time.perf_counter()
+        for _ in range(passes):
+            for creds in credentials:
+                build('youtube', 'v3', credentials=creds)
+                build('youtubeAnalytics', 'v2', credentials=creds)
+        uncached = time.perf_counter() - started
+
+        # After: parsed documents per process, built clients per (account, token)
+        get_discovery_document.cache_clear()
+        clear_client_cache()
+        started = time.perf_counter()
+        for _ in range(passes):
+            for index, creds in enumerate(credentials):
+                cache_key = (str(index), creds.token)
+                build_client('youtube', 'v3', creds, cache_key=cache_key)
+                build_client('youtubeAnalytics', 'v2', creds, cache_key=cache_key)
+        cached = time.perf_counter() - started
+
+        setups = accounts * passes
+        self.stdout.write(f'{accounts} accounts x {passes} passes ({setups} account syncs)')
+        if passes > 1 and accounts * 2 > settings.YOUTUBE_CLIENT_CACHE_SIZE:
+            self.stdout.write(
+                f'Note: {accounts * 2} clients exceed YOUTUBE_CLIENT_CACHE_SIZE='
+                f'{settings.YOUTUBE_CLIENT_CACHE_SIZE}, so later passes rebuild evicted clients'
+            )
+        self.stdout.write(f'build() per account:        {uncached / setups * 1000:.2f} ms')
+        self.stdout.write(f'cached clients per account: {cached / setups * 1000:.2f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {uncached / cached:.1f}x'))
+
+    @staticmethod
+    def _credentials(index):
+        return Credentials(
+            token=f'benchmark-token-{index}',
+            client_id=settings.GOOGLE_CLIENT_ID,
+            client_secret=settings.GOOGLE_CLIENT_SECRET,
+        )
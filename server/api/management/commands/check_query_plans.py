@@ -0,0 +1,105 @@
+# server/api/management/commands/check_query_plans.py
+import re
+import uuid
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from api.models import AccountSyncState, RealTimeMetrics, PostMetrics, SyncLog, SocialMediaAccount
+from api.services.incremental_sync_service import IncrementalSyncService
+from api.services.token_refresh_service import TokenRefreshService
+
+# Full table scans in EXPLAIN output: "Seq Scan on t" (PostgreSQL), bare "SCAN t" (SQLite)
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)(?:\s*$| AS )', re.MULTILINE),
+}
+
+
+class Command(BaseCommand):
+    """
+    EXPLAIN the hottest metrics queries and fail if any falls back to a
+    sequential scan. On PostgreSQL enable_seqscan is switched off for the
+    check, so small tables still show whether a usable index exists:
+    python manage.py check_query_plans
+    """
+    help = 'Fail if a hot metrics/sync query cannot use an index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the plan for every query, not just failures',
+        )
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'Unsupported database backend: {connection.vendor}')
+
+        failures = []
+        for name, queryset in self.hot_queries():
+            plan = self.explain(queryset)
+            scanned = pattern.findall(plan)
+
+            if scanned:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'✗ {name}: sequential scan on {", ".join(scanned)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✓ {name}'))
+
+            if scanned or options['verbose_plans']:
+                self.stdout.write(f'    {plan}'.replace('\n', '\n    '))
+
+        if failures:
+            raise CommandError(f'{len(failures)} queries use a sequential scan: {", ".join(failures)}')
+
+    @staticmethod
+    def explain(queryset):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    @staticmethod
+    def hot_queries():
+        """(name, queryset) pairs mirroring the filters used by views, services and tasks"""
+        account_id = uuid.uuid4()
+        other_account_id = uuid.uuid4()
+        account = SocialMediaAccount(id=account_id)
+        now = timezone.now()
+        today = now.date()
+
+        return [
+            ('RealTimeMetrics latest for account',
+             RealTimeMetrics.objects.filter(account_id=account_id).order_by('-date')[:1]),
+            ('RealTimeMetrics account on date',
+             RealTimeMetrics.objects.filter(account_id=account_id, date=today - timedelta(days=1))),
+            ('RealTimeMetrics client accounts 30 days ago',
+             RealTimeMetrics.objects.filter(
+                 account_id__in=[account_id, other_account_id],
+                 date=today - timedelta(days=30)
+             ).values('followers_count')),
+            ('RealTimeMetrics date range across accounts',
+             RealTimeMetrics.objects.filter(
+                 date__lte=today - timedelta(days=7), date__gt=today - timedelta(days=14)
+             ).values('account_id', 'followers_count')),
+            ('RealTimeMetrics past retention',
+             RealTimeMetrics.objects.filter(date__lt=today - timedelta(days=365)).values('pk')),
+            ('PostMetrics recent for account',
+             PostMetrics.objects.filter(
+                 account_id=account_id, posted_at__gte=now - timedelta(days=30)
+             ).order_by('-posted_at')[:10]),
+            ('PostMetrics due for refresh',
+             # Unsaved state: every band due, the widest form of the query
+             IncrementalSyncService.posts_due_for_refresh(account, now=now, state=AccountSyncState(account=account))),
+            ('PostMetrics published since',
+             PostMetrics.objects.filter(posted_at__gte=now - timedelta(days=7)).values('account_id')),
+            ('SyncLog recent for account',
+             SyncLog.objects.filter(account_id=account_id).order_by('-started_at')[:5]),
+            ('SyncLog past retention',
+             SyncLog.objects.filter(started_at__lt=now - timedelta(days=90)).values('pk')),
+            ('SocialMediaAccount tokens due for refresh',
+             TokenRefreshService('youtube').due_account_ids(now=now)),
+        ]
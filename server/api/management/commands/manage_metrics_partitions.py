@@ -0,0 +1,56 @@
+# server/api/management/commands/manage_metrics_partitions.py
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.services.metrics_partition_service import MetricsPartitionService
+
+
+class Command(BaseCommand):
+    """
+    Partition RealTimeMetrics by month on PostgreSQL and keep partitions current
+    Convert once in a maintenance window, then the daily beat task takes over:
+    python manage.py manage_metrics_partitions --convert
+    """
+    help = 'Convert, extend and retire monthly RealTimeMetrics partitions (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Rebuild the existing table as a partitioned one (locks the table)',
+        )
+        parser.add_argument(
+            '--retire-expired',
+            action='store_true',
+            help='Drop (or detach) months older than DATA_RETENTION_DAYS["metrics"]',
+        )
+
+    def handle(self, *args, **options):
+        service = MetricsPartitionService()
+        if not service.is_supported():
+            self.stdout.write(
+                self.style.WARNING('Metrics partitioning needs PostgreSQL; keeping the plain table layout')
+            )
+            return
+
+        if options['convert']:
+            created = service.convert_table()
+            if created:
+                self.stdout.write(self.style.SUCCESS(f'Converted {service.table} into {len(created)} monthly partitions'))
+            else:
+                self.stdout.write(f'{service.table} is already partitioned')
+        elif not service.is_partitioned():
+            raise CommandError(f'{service.table} is not partitioned yet; run with --convert first')
+
+        created = service.ensure_partitions()
+        self.stdout.write(f'Created {len(created)} future partitions')
+
+        if options['retire_expired']:
+            cutoff = timezone.now().date() - timedelta(days=settings.DATA_RETENTION_DAYS['metrics'])
+            retired = service.retire_expired_partitions(cutoff)
+            action = 'Detached' if service.archive_expired else 'Dropped'
+            self.stdout.write(f'{action} {len(retired)} expired partitions')
+
+        for month_start, name in sorted(service.list_partitions().items()):
+            self.stdout.write(f'  {month_start:%Y-%m}  {name}')
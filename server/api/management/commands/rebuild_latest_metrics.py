@@ -0,0 +1,46 @@
+# server/api/management/commands/rebuild_latest_metrics.py
+from django.core.management.base import BaseCommand
+from api.models import RealTimeMetrics, LatestAccountMetrics
+from api.services.metrics_aggregation_service import MetricsAggregationService
+
+
+class Command(BaseCommand):
+    """
+    Backfill the LatestAccountMetrics snapshot from RealTimeMetrics history
+    Run once after deploying the snapshot table, or to repair drift:
+    python manage.py rebuild_latest_metrics
+    """
+    help = 'Rebuild the latest-metrics-per-account snapshot table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of snapshot rows written per INSERT',
+        )
+
+    def handle(self, *args, **options):
+        latest_rows = MetricsAggregationService.latest_metrics_per_account(
+            RealTimeMetrics.objects.all()
+        ).values('account_id', *LatestAccountMetrics.SNAPSHOT_FIELDS)
+
+        snapshots = [
+            LatestAccountMetrics(
+                account_id=row['account_id'],
+                **{field: row[field] for field in LatestAccountMetrics.SNAPSHOT_FIELDS}
+            )
+            for row in latest_rows
+        ]
+
+        LatestAccountMetrics.objects.bulk_create(
+            snapshots,
+            batch_size=options['batch_size'],
+            update_conflicts=True,
+            unique_fields=['account'],
+            update_fields=LatestAccountMetrics.SNAPSHOT_FIELDS + ['updated_at']
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt latest metrics snapshot for {len(snapshots)} accounts')
+        )
@@ -0,0 +1,24 @@
+# server/api/management/commands/rebuild_metrics_rollups.py
+from django.core.management.base import BaseCommand
+from api.services.metrics_rollup_service import MetricsRollupService
+
+
+class Command(BaseCommand):
+    """
+    Backfill weekly and monthly MetricsRollup rows from RealTimeMetrics history
+    Run once after deploying the rollup table, or to repair drift:
+    python manage.py rebuild_metrics_rollups
+    """
+    help = 'Rebuild weekly and monthly metrics rollups from daily history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rollup rows written per INSERT',
+        )
+
+    def handle(self, *args, **options):
+        written = MetricsRollupService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} metrics rollups'))
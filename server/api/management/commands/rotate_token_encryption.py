@@ -0,0 +1,77 @@
+# server/api/management/commands/rotate_token_encryption.py
+from cryptography.fernet import InvalidToken
+from django.core.management.base import BaseCommand
+from api.models import SocialMediaAccount
+from api.utils import crypto
+
+
+class Command(BaseCommand):
+    """
+    Re-encrypt every stored OAuth token under the current ENCRYPTION_KEY
+    Run after moving the previous key into ENCRYPTION_KEY_FALLBACKS:
+    python manage.py rotate_token_encryption
+    """
+    help = 'Re-encrypt social account tokens with the current encryption key'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of accounts read and written per batch',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be rotated without writing',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rotated = failed = 0
+        batch = []
+
+        accounts = SocialMediaAccount.objects.only(
+            'id', 'username', 'access_token', 'refresh_token'
+        ).order_by('pk').iterator(chunk_size=batch_size)
+
+        for account in accounts:
+            try:
+                account.access_token = self._rotate(account.access_token)
+                account.refresh_token = self._rotate(account.refresh_token)
+            except InvalidToken:
+                failed += 1
+                self.stderr.write(f'Cannot decrypt tokens for {account.username} ({account.id}) with any configured key')
+                continue
+
+            batch.append(account)
+            if len(batch) >= batch_size:
+                rotated += self._write(batch, options['dry_run'])
+                batch = []
+
+        if batch:
+            rotated += self._write(batch, options['dry_run'])
+
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f'{prefix}Rotated tokens for {rotated} accounts'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} accounts could not be decrypted and were skipped'))
+
+    @staticmethod
+    def _rotate(value):
+        """
+        Ciphertext under the current key; plaintext left over from before encryption is encrypted
+        Raises InvalidToken for ciphertext under a key that is no longer configured
+        """
+        if not value:
+            return value
+        if not crypto.is_encrypted(value):
+            return crypto.encrypt_token(value)
+        return crypto.rotate_token(value)
+
+    @staticmethod
+    def _write(batch, dry_run):
+        # bulk_update leaves updated_at alone; rotation is not a user-visible change
+        if not dry_run:
+            SocialMediaAccount.objects.bulk_update(batch, ['access_token', 'refresh_token'])
+        return len(batch)
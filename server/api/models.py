@@ -2,12 +2,15 @@
 # Django Models for SMMA Dashboard System
 
 from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.files.storage import FileSystemStorage
 from django.utils import timezone
-from cryptography.fernet import Fernet
-from django.conf import settings
 import uuid
 import json
+import hashlib
+
+from .utils import crypto
 
 class User(AbstractUser):
     """Extended User model with role-based access"""
@@ -55,21 +58,35 @@ class SocialMediaAccount(models.Model):
 
     class Meta:
         unique_together = ['client', 'platform', 'account_id']
+        indexes = [
+            # Token refresh scan: active accounts of a platform by expiry
+            models.Index(fields=['platform', 'is_active', 'token_expires_at'], name='socialacct_token_expiry_idx'),
+        ]
 
     def encrypt_token(self, token):
         """Encrypt access token"""
-        f = Fernet(settings.ENCRYPTION_KEY.encode())
-        return f.encrypt(token.encode()).decode()
+        return crypto.encrypt_token(token)
 
     def decrypt_token(self, encrypted_token):
         """Decrypt access token"""
-        f = Fernet(settings.ENCRYPTION_KEY.encode())
-        return f.decrypt(encrypted_token.encode()).decode()
+        return crypto.decrypt_token(encrypted_token)
+
+    @classmethod
+    def decrypt_tokens_bulk(cls, accounts):
+        """Plaintext (access_token, refresh_token) for many accounts, keyed by account id"""
+        accounts = list(accounts)
+        access_tokens = crypto.decrypt_tokens(account.access_token for account in accounts)
+        refresh_tokens = crypto.decrypt_tokens(account.refresh_token for account in accounts)
+        return {
+            account.id: (access_token, refresh_token)
+            for account, access_token, refresh_token in zip(accounts, access_tokens, refresh_tokens)
+        }
 
     def save(self, *args, **kwargs):
-        if self.access_token and not self.access_token.startswith('gAAAAA'):  # Not encrypted
+        # Ciphertext under any key, current or retired, is stored as is
+        if self.access_token and not crypto.is_encrypted(self.access_token):  # Not encrypted
             self.access_token = self.encrypt_token(self.access_token)
-        if self.refresh_token and not self.refresh_token.startswith('gAAAAA'):  # Not encrypted
+        if self.refresh_token and not crypto.is_encrypted(self.refresh_token):  # Not encrypted
             self.refresh_token = self.encrypt_token(self.refresh_token)
         super().save(*args, **kwargs)
 
@@ -90,8 +107,75 @@ class RealTimeMetrics(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
-        unique_together = ['account', 'date']
+        unique_together = ['account', 'date']  # Also serves (account, date) lookups and per-account -date scans
         ordering = ['-date']
+        indexes = [
+            # Cross-account date ranges (retention cleanup, batch aggregation, weekly reports);
+            # trailing followers_count covers the "followers on day X" growth lookups
+            models.Index(fields=['date', 'account', 'followers_count'], name='rtmetrics_date_account_idx'),
+        ]
+
+class LatestAccountMetrics(models.Model):
+    """Denormalized snapshot of the most recent RealTimeMetrics row per account"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account = models.OneToOneField(SocialMediaAccount, on_delete=models.CASCADE, related_name='latest_metrics')
+    date = models.DateField()
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+    posts_count = models.IntegerField(default=0)
+    engagement_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    reach = models.IntegerField(default=0)
+    impressions = models.IntegerField(default=0)
+    profile_views = models.IntegerField(default=0)
+    website_clicks = models.IntegerField(default=0)
+    daily_growth = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    SNAPSHOT_FIELDS = [
+        'date', 'followers_count', 'following_count', 'posts_count',
+        'engagement_rate', 'reach', 'impressions', 'profile_views',
+        'website_clicks', 'daily_growth',
+    ]
+
+    def __str__(self):
+        return f"Latest metrics for {self.account.username} ({self.date})"
+
+    @classmethod
+    def update_from_metrics(cls, metrics):
+        """Upsert the snapshot for metrics.account from a RealTimeMetrics row"""
+        snapshot, _ = cls.objects.update_or_create(
+            account_id=metrics.account_id,
+            defaults={field: getattr(metrics, field) for field in cls.SNAPSHOT_FIELDS}
+        )
+        return snapshot
+
+class MetricsRollup(models.Model):
+    """Weekly or monthly summary of an account's RealTimeMetrics, read by long-range charts"""
+    RESOLUTION_CHOICES = [
+        ('week', 'Weekly'),
+        ('month', 'Monthly'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account = models.ForeignKey(SocialMediaAccount, on_delete=models.CASCADE, related_name='metric_rollups')
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    period_start = models.DateField()  # Monday for weeks, the 1st for months
+    last_date = models.DateField()  # Latest daily row folded in
+    sample_count = models.IntegerField(default=0)
+    stats = models.JSONField(default=dict)  # {counter: {'min', 'max', 'last', 'avg'}} for COUNTER_FIELDS
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTER_FIELDS = [
+        'followers_count', 'following_count', 'posts_count', 'engagement_rate',
+        'reach', 'impressions', 'profile_views', 'website_clicks', 'daily_growth',
+    ]
+
+    class Meta:
+        unique_together = ['account', 'resolution', 'period_start']
+        ordering = ['period_start']
+
+    def __str__(self):
+        return f"{self.get_resolution_display()} metrics for {self.account.username} ({self.period_start})"
 
 class PostMetrics(models.Model):
     """Individual post metrics from social media platforms"""
@@ -108,12 +192,41 @@ class PostMetrics(models.Model):
     reach = models.IntegerField(default=0)
     impressions = models.IntegerField(default=0)
     engagement_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    counters_hash = models.CharField(max_length=32, blank=True)  # Hash of COUNTER_FIELDS at last write
+    refreshed_at = models.DateTimeField(blank=True, null=True)  # Last time changed counters were written
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    COUNTER_FIELDS = ['likes', 'comments', 'shares', 'saves', 'reach', 'impressions']
+
     class Meta:
         unique_together = ['account', 'post_id']
         ordering = ['-posted_at']
+        indexes = [
+            # Recent posts per account (engagement rate, dashboards) and the refresh-due age bands;
+            # no write-stamped columns, so counter upserts stay HOT updates
+            models.Index(fields=['account', '-posted_at'], name='postmetrics_acct_posted_idx'),
+            # Posts published since a date across accounts
+            models.Index(fields=['posted_at'], name='postmetrics_posted_idx'),
+        ]
+
+    def compute_counters_hash(self):
+        """Cheap fingerprint of the post's counters, used to skip unchanged rows"""
+        counters = ':'.join(str(getattr(self, field)) for field in self.COUNTER_FIELDS)
+        return hashlib.md5(counters.encode()).hexdigest()
+
+class AccountSyncState(models.Model):
+    """Per-account high-water mark for incremental post syncs"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account = models.OneToOneField(SocialMediaAccount, on_delete=models.CASCADE, related_name='sync_state')
+    last_posted_at = models.DateTimeField(blank=True, null=True)  # Newest post seen so far
+    last_post_id = models.CharField(max_length=255, blank=True)
+    # REFRESH_SCHEDULE band index -> ISO time its posts were last re-fetched
+    bands_refreshed_at = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Sync state for {self.account.username} ({self.last_posted_at})"
 
 class Client(models.Model):
     """Enhanced Client model with PayPal integration"""
@@ -176,25 +289,16 @@ class Client(models.Model):
     @property
     def total_followers(self):
         """Calculate total followers across all connected accounts"""
-        from .models import RealTimeMetrics  # Import here to avoid circular import
-        latest_metrics = RealTimeMetrics.objects.filter(
+        return LatestAccountMetrics.objects.filter(
             account__client=self
-        ).order_by('account', '-date').distinct('account')
-        return sum(metric.followers_count for metric in latest_metrics)
+        ).aggregate(total=models.Sum('followers_count'))['total'] or 0
 
     @property
     def average_engagement_rate(self):
         """Calculate average engagement rate across all accounts"""
-        from .models import RealTimeMetrics  # Import here to avoid circular import
-        latest_metrics = RealTimeMetrics.objects.filter(
+        return LatestAccountMetrics.objects.filter(
             account__client=self
-        ).order_by('account', '-date').distinct('account')
-        
-        if not latest_metrics:
-            return 0
-        
-        total_engagement = sum(metric.engagement_rate for metric in latest_metrics)
-        return total_engagement / len(latest_metrics)
+        ).aggregate(avg=models.Avg('engagement_rate'))['avg'] or 0
 
     @property
     def has_active_subscription(self):
@@ -241,6 +345,12 @@ class SyncLog(models.Model):
 
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            # Recent sync history per account
+            models.Index(fields=['account', '-started_at'], name='synclog_acct_started_idx'),
+            # Retention cleanup
+            models.Index(fields=['started_at'], name='synclog_started_idx'),
+        ]
 
 
 class Task(models.Model):
@@ -358,6 +468,40 @@ class ContentImage(models.Model):
         if self.image:
             return self.image.url
         return None
+
+
+def content_export_storage():
+    """Archives live outside MEDIA_ROOT so they are never served as public media"""
+    return FileSystemStorage(location=settings.CONTENT_EXPORTS['root'])
+
+
+class ContentExportJob(models.Model):
+    """ZIP export of many content posts, built by a Celery worker"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='content_exports')
+    filters = models.JSONField(default=dict, help_text='client, platform, status, start_date, end_date')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='%Y/%m/', storage=content_export_storage, blank=True)
+    post_count = models.IntegerField(default=0)
+    image_count = models.IntegerField(default=0)
+    file_size = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Content export {self.id} ({self.status})"
     
 class PerformanceData(models.Model):
     """Performance analytics for clients"""
@@ -394,6 +538,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # One direction of a thread in time order (paging, unread counts, mark-read)
+            models.Index(fields=['sender', 'receiver', 'timestamp'], name='message_thread_idx'),
+        ]
 
 class Invoice(models.Model):
     """Invoice management for client billing"""
@@ -543,7 +691,7 @@ class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     title = models.CharField(max_length=255)
     message = models.TextField()
-    notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
+    notification_type = models.CharField(max_length=30, choices=NOTIFICATION_TYPES)
     read = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
 
@@ -552,3 +700,33 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Inbox pages and since= polling
+            models.Index(fields=['user', '-created_at'], name='notification_user_idx'),
+            # Unread badge counts and unread lists; stays small as read rows are archived
+            models.Index(
+                fields=['user', '-created_at'],
+                name='notification_unread_idx',
+                condition=models.Q(read=False),
+            ),
+        ]
+
+
+class NotificationArchive(models.Model):
+    """Read notifications past their retention, moved out of the Notification table"""
+    id = models.UUIDField(primary_key=True, editable=False)  # Id the notification had
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=30)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.title} - {self.user.username} (archived)"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notif_archive_user_idx'),
+        ]
@@ -2,12 +2,13 @@
 # Django REST Framework Serializers for SMMA Dashboard
 
 from django.utils import timezone 
+from django.urls import reverse
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from .models import (
-    ContentImage, User, Client, Task, ContentPost, PerformanceData, 
+    ContentImage, ContentExportJob, User, Client, Task, ContentPost, PerformanceData, 
     Message, Invoice, TeamMember, Project, File, Notification,
-    SocialMediaAccount, RealTimeMetrics  # Add these imports
+    SocialMediaAccount, RealTimeMetrics, LatestAccountMetrics  # Add these imports
 )
 
 class UserSerializer(serializers.ModelSerializer):
@@ -115,21 +116,18 @@ class SocialMediaAccountSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
         
-        # Get latest metrics
+        # Latest metrics come from the denormalized snapshot; views
+        # select_related('latest_metrics') so this costs no extra query
         try:
-            latest_metrics = RealTimeMetrics.objects.filter(
-                account=instance
-            ).order_by('-date').first()
-            
-            if latest_metrics:
-                data['followers_count'] = latest_metrics.followers_count
-                data['engagement_rate'] = float(latest_metrics.engagement_rate)
-                data['posts_count'] = latest_metrics.posts_count
-            else:
-                data['followers_count'] = 0
-                data['engagement_rate'] = 0
-                data['posts_count'] = 0
-        except:
+            latest_metrics = instance.latest_metrics
+        except LatestAccountMetrics.DoesNotExist:
+            latest_metrics = None
+        
+        if latest_metrics:
+            data['followers_count'] = latest_metrics.followers_count
+            data['engagement_rate'] = float(latest_metrics.engagement_rate)
+            data['posts_count'] = latest_metrics.posts_count
+        else:
             data['followers_count'] = 0
             data['engagement_rate'] = 0
             data['posts_count'] = 0
@@ -203,6 +201,28 @@ class ContentImageSerializer(serializers.ModelSerializer):
         return None
 
 
+class ContentExportJobSerializer(serializers.ModelSerializer):
+    """Bulk content export job; download_url (admin only) is set once the archive is built"""
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ContentExportJob
+        fields = [
+            'id', 'filters', 'status', 'post_count', 'image_count', 'file_size',
+            'error', 'download_url', 'created_at', 'started_at', 'completed_at'
+        ]
+        read_only_fields = fields
+    
+    def get_download_url(self, obj):
+        if obj.status != 'completed' or not obj.file:
+            return None
+        url = reverse('content-export-download', kwargs={'job_id': obj.id})
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(url)
+        return url
+
+
 class ContentPostSerializer(serializers.ModelSerializer):
     """Content post serializer"""
     client_name = serializers.CharField(source='client.name', read_only=True)
@@ -0,0 +1,144 @@
+# server/api/services/analytics_service.py
+"""
+Admin analytics time series
+
+Every series is one GROUP BY over the requested range, bucketed by day,
+week (Monday) or month in the database; cumulative client counts are a
+running sum in Python seeded by one COUNT of everything before the range.
+Empty buckets are filled in so charts get a continuous axis. Results are
+cached per (range, bucket) for CACHE_TIMEOUTS['analytics'].
+"""
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum, DateField
+from django.db.models.functions import Trunc
+
+from ..models import Client, Invoice, Task
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ['day', 'week', 'month']
+MAX_BUCKETS = 1000
+
+
+class AnalyticsService:
+    """Client growth, revenue and task statistics over arbitrary ranges"""
+
+    @staticmethod
+    def bucket_start(day, bucket):
+        """First day of the bucket containing day"""
+        if bucket == 'week':
+            return day - timedelta(days=day.weekday())
+        if bucket == 'month':
+            return day.replace(day=1)
+        return day
+
+    @staticmethod
+    def bucket_starts(start_date, end_date, bucket):
+        """Every bucket start from the bucket containing start_date through end_date"""
+        current = AnalyticsService.bucket_start(start_date, bucket)
+        starts = []
+        while current <= end_date:
+            starts.append(current)
+            if bucket == 'month':
+                current = (current + timedelta(days=32)).replace(day=1)
+            else:
+                current += timedelta(days=7 if bucket == 'week' else 1)
+        return starts
+
+    @staticmethod
+    def count_buckets(start_date, end_date, bucket):
+        """Number of points a series over the range would have"""
+        if bucket == 'month':
+            return (end_date.year - start_date.year) * 12 + end_date.month - start_date.month + 1
+        days = (AnalyticsService.bucket_start(end_date, bucket) - AnalyticsService.bucket_start(start_date, bucket)).days
+        return days // (7 if bucket == 'week' else 1) + 1
+
+    @staticmethod
+    def _grouped(queryset, field, bucket, **aggregates):
+        """{bucket start: {aggregate: value}} from one GROUP BY on field truncated to bucket"""
+        rows = queryset.annotate(
+            bucket=Trunc(field, bucket, output_field=DateField())
+        ).values('bucket').annotate(**aggregates).order_by('bucket')
+        return {row.pop('bucket'): row for row in rows}
+
+    @staticmethod
+    def client_growth(start_date, end_date, bucket):
+        """Cumulative client count at the end of each bucket, with the bucket's sign-ups"""
+        range_start = AnalyticsService.bucket_start(start_date, bucket)
+        signups = AnalyticsService._grouped(
+            Client.objects.filter(created_at__date__gte=range_start, created_at__date__lte=end_date),
+            'created_at', bucket, new=Count('id')
+        )
+        total = Client.objects.filter(created_at__date__lt=range_start).count()
+
+        series = []
+        for day in AnalyticsService.bucket_starts(start_date, end_date, bucket):
+            new = signups.get(day, {}).get('new', 0)
+            total += new
+            series.append({'date': day, 'count': total, 'new': new})
+        return series
+
+    @staticmethod
+    def revenue(start_date, end_date, bucket):
+        """Paid invoice totals per bucket"""
+        paid = AnalyticsService._grouped(
+            Invoice.objects.filter(
+                status='paid',
+                paid_at__date__gte=AnalyticsService.bucket_start(start_date, bucket),
+                paid_at__date__lte=end_date
+            ),
+            'paid_at', bucket, total=Sum('amount'), invoices=Count('id')
+        )
+        return [
+            {
+                'date': day,
+                'total': paid.get(day, {}).get('total') or 0,
+                'invoices': paid.get(day, {}).get('invoices', 0)
+            }
+            for day in AnalyticsService.bucket_starts(start_date, end_date, bucket)
+        ]
+
+    @staticmethod
+    def task_stats():
+        """Task counts by status and the completion rate, in one aggregate"""
+        stats = Task.objects.aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            pending=Count('id', filter=Q(status='pending')),
+            in_progress=Count('id', filter=Q(status='in-progress'))
+        )
+        completion_rate = (stats['completed'] / stats['total']) * 100 if stats['total'] else 0
+        return stats, completion_rate
+
+    @staticmethod
+    def get_timeseries(start_date, end_date, bucket='week', revenue_bucket=None):
+        """
+        Client growth, revenue and task stats for a range, cached per (range, buckets)
+
+        Args:
+            start_date, end_date: inclusive date range
+            bucket: 'day', 'week' or 'month' for client growth
+            revenue_bucket: bucket for revenue (defaults to bucket)
+        """
+        revenue_bucket = revenue_bucket or bucket
+        cache_key = f"analytics:timeseries:{start_date}:{end_date}:{bucket}:{revenue_bucket}"
+        data = cache.get(cache_key)
+        if data is not None:
+            return data
+
+        task_stats, completion_rate = AnalyticsService.task_stats()
+        data = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'bucket': bucket,
+            'client_growth': AnalyticsService.client_growth(start_date, end_date, bucket),
+            'revenue': AnalyticsService.revenue(start_date, end_date, revenue_bucket),
+            'task_stats': task_stats,
+            'completion_rate': completion_rate
+        }
+        cache.set(cache_key, data, timeout=settings.CACHE_TIMEOUTS['analytics'])
+        return data
@@ -0,0 +1,180 @@
+# server/api/services/content_export_service.py
+"""
+Multi-post content exports
+
+An admin picks posts by client, platform, status and scheduled date. A
+Celery worker (api.tasks.build_content_export) writes them into one ZIP,
+a folder per post with its post_info.json and images, streaming each
+image from storage into a temporary file with api.utils.zip_stream, then
+hands the finished file to the private export storage under
+CONTENT_EXPORTS['root']. Web workers only create the job, report its
+status and serve the archive to admins. Archives are deleted after
+CONTENT_EXPORTS['expire_hours'].
+"""
+
+import json
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.utils import timezone
+from django.utils.text import slugify
+
+from ..models import Client, ContentPost, ContentExportJob
+from ..utils.zip_stream import write_zip
+
+logger = logging.getLogger(__name__)
+
+
+class ContentExportService:
+    """Select, build and expire bulk content exports"""
+
+    @staticmethod
+    def clean_filters(data):
+        """
+        Validated export filters from request data
+
+        Args:
+            data: mapping with optional client, platform, status,
+                start_date and end_date (YYYY-MM-DD, inclusive)
+
+        Returns:
+            dict of the filters given, JSON-serializable for the job
+
+        Raises:
+            ValueError: with a message for the client
+        """
+        filters = {}
+
+        client_id = data.get('client')
+        if client_id:
+            try:
+                if not Client.objects.filter(id=client_id).exists():
+                    raise ValueError('Client not found')
+            except ValidationError:
+                raise ValueError('Invalid client id')
+            filters['client'] = str(client_id)
+
+        platform = data.get('platform')
+        if platform:
+            if platform not in dict(ContentPost.PLATFORM_CHOICES):
+                raise ValueError(f'Invalid platform: {platform}')
+            filters['platform'] = platform
+
+        status = data.get('status')
+        if status:
+            if status not in dict(ContentPost.STATUS_CHOICES):
+                raise ValueError(f'Invalid status: {status}')
+            filters['status'] = status
+
+        for key in ('start_date', 'end_date'):
+            value = data.get(key)
+            if value:
+                try:
+                    filters[key] = datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+                except (TypeError, ValueError):
+                    raise ValueError(f'Invalid {key}. Use YYYY-MM-DD')
+
+        if filters.get('start_date') and filters.get('end_date') and filters['start_date'] > filters['end_date']:
+            raise ValueError('start_date must be before end_date')
+
+        return filters
+
+    @staticmethod
+    def posts_for(filters):
+        """Posts matching a job's filters, oldest first"""
+        queryset = ContentPost.objects.all()
+        if filters.get('client'):
+            queryset = queryset.filter(client_id=filters['client'])
+        if filters.get('platform'):
+            queryset = queryset.filter(platform=filters['platform'])
+        if filters.get('status'):
+            queryset = queryset.filter(status=filters['status'])
+        if filters.get('start_date'):
+            queryset = queryset.filter(scheduled_date__date__gte=filters['start_date'])
+        if filters.get('end_date'):
+            queryset = queryset.filter(scheduled_date__date__lte=filters['end_date'])
+        return queryset.order_by('scheduled_date', 'id')
+
+    @staticmethod
+    def _entries(posts, counts):
+        """ZIP entries for posts: <client>/<date>_<platform>_<id>/post_info.json and images"""
+        posts = posts.select_related('client', 'social_account').prefetch_related('images')
+        for post in posts.iterator(chunk_size=100):
+            counts['posts'] += 1
+            folder = (
+                f"{slugify(post.client.name) or 'client'}/"
+                f"{post.scheduled_date:%Y-%m-%d}_{post.platform}_{post.id}"
+            )
+            metadata = {
+                'id': str(post.id),
+                'title': post.title,
+                'description': post.content,
+                'platform': post.platform,
+                'status': post.status,
+                'scheduled_date': post.scheduled_date.isoformat(),
+                'client_name': post.client.name,
+                'social_account': post.social_account.username if post.social_account else None,
+                'post_url': post.post_url
+            }
+            yield f"{folder}/post_info.json", json.dumps(metadata, indent=2)
+
+            for i, img in enumerate(post.images.all()):
+                ext = img.image.name.split('.')[-1]
+                yield f"{folder}/image_{i+1}.{ext}", img.image
+
+    @staticmethod
+    def build(job):
+        """
+        Write the archive for job and store it, marking the job completed or failed
+
+        Returns:
+            job
+        """
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+        try:
+            posts = ContentExportService.posts_for(job.filters)
+            counts = {'posts': 0}
+
+            # Spooled to local disk a chunk at a time, then copied to storage
+            with tempfile.TemporaryFile(suffix='.zip') as archive:
+                entries_written = write_zip(archive, ContentExportService._entries(posts, counts))
+                job.file_size = archive.tell()
+                archive.seek(0)
+                job.file.save(f"content_export_{job.id}.zip", File(archive), save=False)
+
+            job.post_count = counts['posts']
+            job.image_count = entries_written - counts['posts']
+            job.status = 'completed'
+            job.completed_at = timezone.now()
+            job.save()
+            logger.info(
+                f"✓ Content export {job.id}: {job.post_count} posts, "
+                f"{job.image_count} images, {job.file_size} bytes"
+            )
+
+        except Exception as e:
+            logger.error(f"Content export {job.id} failed: {str(e)}")
+            job.status = 'failed'
+            job.error = str(e)
+            job.completed_at = timezone.now()
+            job.save(update_fields=['status', 'error', 'completed_at'])
+
+        return job
+
+    @staticmethod
+    def expire_old_exports():
+        """Delete export jobs and their archives older than CONTENT_EXPORTS['expire_hours']"""
+        cutoff = timezone.now() - timedelta(hours=settings.CONTENT_EXPORTS['expire_hours'])
+        expired = 0
+        for job in ContentExportJob.objects.filter(created_at__lt=cutoff).iterator():
+            if job.file:
+                job.file.delete(save=False)
+            job.delete()
+            expired += 1
+        return expired
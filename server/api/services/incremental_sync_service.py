@@ -0,0 +1,151 @@
+# server/api/services/incremental_sync_service.py
+"""
+Change detection and refresh scheduling for PostMetrics
+
+Platform services build PostMetrics objects from API data and hand them to
+save_changed_posts, which only upserts rows whose counters hash moved and
+leaves the rest untouched. Older posts are refreshed on a decaying schedule
+(REFRESH_SCHEDULE) instead of on every sync. The schedule is kept per
+account and age band in AccountSyncState, not per row, so deciding what is
+due never writes to PostMetrics. AccountSyncState also holds a high-water
+mark so only posts newer than it are fetched as new.
+"""
+
+import logging
+from datetime import timedelta
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import AccountSyncState, PostMetrics
+
+logger = logging.getLogger(__name__)
+
+# (post age up to, refresh interval); None means any older post
+REFRESH_SCHEDULE = [
+    (timedelta(days=1), timedelta(hours=1)),
+    (timedelta(days=30), timedelta(days=1)),
+    (None, timedelta(weeks=1)),
+]
+
+POST_METRICS_UPDATE_FIELDS = [
+    'caption', 'media_type', 'posted_at', 'likes', 'comments', 'reach',
+    'impressions', 'saves', 'shares', 'engagement_rate', 'counters_hash',
+    'refreshed_at', 'updated_at'
+]
+
+
+class IncrementalSyncService:
+    """Write only changed PostMetrics and decide which posts are due a refresh"""
+
+    @staticmethod
+    def get_state(account):
+        """AccountSyncState for account, created on first use"""
+        state, _ = AccountSyncState.objects.get_or_create(account=account)
+        return state
+
+    @staticmethod
+    def advance_high_water_mark(state, post_metrics):
+        """Move state's high-water mark to the newest of post_metrics"""
+        newest = max(post_metrics, key=lambda post: post.posted_at, default=None)
+        if newest is None or (state.last_posted_at and newest.posted_at <= state.last_posted_at):
+            return state
+
+        state.last_posted_at = newest.posted_at
+        state.last_post_id = newest.post_id
+        state.save(update_fields=['last_posted_at', 'last_post_id', 'updated_at'])
+        return state
+
+    @staticmethod
+    def due_bands(state, now):
+        """Indexes of REFRESH_SCHEDULE bands whose interval has passed since state last refreshed them"""
+        due = []
+        for band, (_, interval) in enumerate(REFRESH_SCHEDULE):
+            last = state.bands_refreshed_at.get(str(band))
+            if last is None or parse_datetime(last) <= now - interval:
+                due.append(band)
+        return due
+
+    @staticmethod
+    def posts_due_for_refresh(account, now=None, state=None):
+        """
+        PostMetrics of account whose counters are due to be re-fetched:
+        hourly for the first day, daily up to 30 days, weekly after that
+
+        Pass the same now to mark_refreshed() once the sync has saved them.
+        """
+        now = now or timezone.now()
+        state = state or IncrementalSyncService.get_state(account)
+        bands = IncrementalSyncService.due_bands(state, now)
+        if not bands:
+            return PostMetrics.objects.none()
+
+        due = Q()
+        for band in bands:
+            max_age = REFRESH_SCHEDULE[band][0]
+            newer_than = REFRESH_SCHEDULE[band - 1][0] if band else None
+            age_band = Q(account=account)
+            if max_age is not None:
+                age_band &= Q(posted_at__gte=now - max_age)
+            if newer_than is not None:
+                age_band &= Q(posted_at__lt=now - newer_than)
+            due |= age_band
+
+        return PostMetrics.objects.filter(due)
+
+    @staticmethod
+    def mark_refreshed(state, now):
+        """Record that the bands due at now have been refreshed (one small write per sync)"""
+        bands = IncrementalSyncService.due_bands(state, now)
+        if not bands:
+            return state
+        for band in bands:
+            state.bands_refreshed_at[str(band)] = now.isoformat()
+        state.save(update_fields=['bands_refreshed_at', 'updated_at'])
+        return state
+
+    @staticmethod
+    def save_changed_posts(account, post_metrics, now=None):
+        """
+        Upsert post_metrics whose counters changed (or are new); unchanged rows
+        are not written at all. A post listed twice is written once, from its
+        last entry: PostgreSQL rejects an upsert that touches a row twice.
+
+        Returns:
+            (rows written, rows unchanged)
+        """
+        now = now or timezone.now()
+        post_metrics = list({post.post_id: post for post in post_metrics}.values())
+        if not post_metrics:
+            return 0, 0
+
+        existing_hashes = dict(
+            PostMetrics.objects.filter(
+                account=account,
+                post_id__in=[post.post_id for post in post_metrics]
+            ).values_list('post_id', 'counters_hash')
+        )
+
+        changed = []
+        unchanged = 0
+        for post in post_metrics:
+            post.counters_hash = post.compute_counters_hash()
+            if existing_hashes.get(post.post_id) == post.counters_hash:
+                unchanged += 1
+            else:
+                post.refreshed_at = now
+                changed.append(post)
+
+        if changed:
+            PostMetrics.objects.bulk_create(
+                changed,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['account', 'post_id'],
+                update_fields=POST_METRICS_UPDATE_FIELDS
+            )
+
+        logger.info(
+            f"{account.username}: {len(changed)} posts written, {unchanged} unchanged"
+        )
+        return len(changed), unchanged
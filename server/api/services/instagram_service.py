@@ -1,13 +1,66 @@
 # server/api/services/instagram_service.py
 import requests
+import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
 from django.utils import timezone
 from django.conf import settings
-from ..models import SocialMediaAccount, RealTimeMetrics, PostMetrics, SyncLog
+from django.db import transaction
+from ..models import SocialMediaAccount, RealTimeMetrics, LatestAccountMetrics, PostMetrics, SyncLog
+from .incremental_sync_service import IncrementalSyncService
+from .rate_governor import RateGovernor, RateLimitExceeded
 
 logger = logging.getLogger(__name__)
 
+# Graph API limit for operations in a single batch request
+GRAPH_BATCH_LIMIT = 50
+
+# Graph API error codes for app (4), user (17), page (32), custom (613) and
+# business use case (80002 for Instagram) rate limits
+GRAPH_RATE_LIMIT_ERROR_CODES = {4, 17, 32, 613, 80002}
+GRAPH_RATE_LIMIT_BACKOFF = 5 * 60
+
+# Errors meaning the expanded request asked for a field or edge this account or
+# media type cannot serve: invalid parameter (100) and permissions (10, 200-299).
+# Anything else, notably OAuth errors (190, 102), would fail the separate requests too
+EXPANDED_FETCH_FALLBACK_ERROR_CODES = {10, 100} | set(range(200, 300))
+
+ACCOUNT_INSIGHT_METRICS = 'reach,impressions,profile_views,website_clicks'
+POST_INSIGHT_METRICS = 'reach,impressions,saves,shares'
+
+# Media fields requested through field expansion, insights nested per post
+EXPANDED_MEDIA_FIELDS = (
+    'id,caption,media_type,media_url,permalink,timestamp,like_count,comments_count,'
+    f"insights.metric({POST_INSIGHT_METRICS})"
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Process-wide keep-alive session for Graph API calls
+    
+    Reusing one pooled Session avoids a TCP + TLS handshake per request; the
+    pool is sized to the insights fan-out so concurrent fetches don't block.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = max(settings.INSTAGRAM_INSIGHTS_CONCURRENCY, 1)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
 class InstagramService:
     """Instagram Business API service for fetching real data"""
     
@@ -15,6 +68,46 @@ class InstagramService:
         self.account = social_account
         self.access_token = self.account.decrypt_token(social_account.access_token)
         self.base_url = "https://graph.facebook.com/v18.0"
+        self.session = get_http_session()
+        self.insights_concurrency = max(settings.INSTAGRAM_INSIGHTS_CONCURRENCY, 1)
+        self.governor = RateGovernor('instagram', social_account.id)
+        # Number of HTTP calls made to the Graph API by this service instance
+        self.request_count = 0
+        self._request_count_lock = threading.Lock()
+    
+    def _get(self, url, params=None):
+        """GET against the Graph API, metered by the rate governor and counted in request_count"""
+        return self._request('get', url, cost=1, params=params)
+    
+    def _post(self, url, data=None, cost=1):
+        """POST against the Graph API; batch requests cost one unit per operation"""
+        return self._request('post', url, cost=cost, data=data)
+    
+    @staticmethod
+    def _error_code(response):
+        """Graph API error code of a failed response, or None"""
+        try:
+            return response.json().get('error', {}).get('code')
+        except ValueError:
+            return None
+    
+    def _request(self, method, url, cost, **kwargs):
+        """Send a Graph API request, raising RateLimitExceeded on rate-limit errors"""
+        self.governor.acquire(cost)
+        with self._request_count_lock:
+            self.request_count += 1
+        
+        response = getattr(self.session, method)(url, **kwargs)
+        self.governor.observe_headers(response.headers)
+        
+        if response.status_code in (400, 403, 429):
+            error_code = self._error_code(response)
+            if error_code in GRAPH_RATE_LIMIT_ERROR_CODES or response.status_code == 429:
+                # Usage headers normally set a tighter block; this is the floor
+                self.governor.block(GRAPH_RATE_LIMIT_BACKOFF, account_only=error_code not in (4, 613))
+                raise RateLimitExceeded('instagram', GRAPH_RATE_LIMIT_BACKOFF, f"Graph API error {error_code}")
+        
+        return response
     
     def sync_profile_metrics(self):
         """Fetch and save Instagram Business account metrics"""
@@ -32,47 +125,14 @@ class InstagramService:
                 'access_token': self.access_token
             }
             
-            response = requests.get(url, params=params)
+            response = self._get(url, params=params)
             response.raise_for_status()
             profile_data = response.json()
             
             # Get insights data
             insights = self._get_account_insights()
             
-            # Calculate engagement rate
-            engagement_rate = self._calculate_engagement_rate()
-            
-            # Save metrics
-            metrics, created = RealTimeMetrics.objects.update_or_create(
-                account=self.account,
-                date=timezone.now().date(),
-                defaults={
-                    'followers_count': profile_data.get('followers_count', 0),
-                    'following_count': profile_data.get('follows_count', 0),
-                    'posts_count': profile_data.get('media_count', 0),
-                    'engagement_rate': engagement_rate,
-                    'reach': insights.get('reach', 0),
-                    'impressions': insights.get('impressions', 0),
-                    'profile_views': insights.get('profile_views', 0),
-                    'website_clicks': insights.get('website_clicks', 0),
-                }
-            )
-            
-            # Calculate daily growth
-            if not created:
-                yesterday_metrics = RealTimeMetrics.objects.filter(
-                    account=self.account,
-                    date=timezone.now().date() - timedelta(days=1)
-                ).first()
-                
-                if yesterday_metrics:
-                    daily_growth = metrics.followers_count - yesterday_metrics.followers_count
-                    metrics.daily_growth = daily_growth
-                    metrics.save()
-            
-            # Update last sync time
-            self.account.last_sync = timezone.now()
-            self.account.save()
+            metrics = self._save_profile_metrics(profile_data, insights)
             
             sync_log.status = 'success'
             sync_log.records_processed = 1
@@ -119,48 +179,16 @@ class InstagramService:
                 'access_token': self.access_token
             }
             
-            response = requests.get(url, params=params)
+            response = self._get(url, params=params)
             response.raise_for_status()
             data = response.json()
             
-            posts_processed = 0
+            posts = data.get('data', [])
             
-            for post_data in data.get('data', []):
-                # Get detailed insights for each post
-                insights = self._get_post_insights(post_data['id'])
-                
-                # Parse timestamp
-                posted_at = datetime.fromisoformat(
-                    post_data['timestamp'].replace('Z', '+00:00')
-                )
-                
-                # Calculate engagement rate for this post
-                likes = post_data.get('like_count', 0)
-                comments = post_data.get('comments_count', 0)
-                reach = insights.get('reach', 0)
-                
-                engagement_rate = 0
-                if reach > 0:
-                    engagement_rate = ((likes + comments) / reach) * 100
-                
-                post_metrics, created = PostMetrics.objects.update_or_create(
-                    account=self.account,
-                    post_id=post_data['id'],
-                    defaults={
-                        'caption': post_data.get('caption', ''),
-                        'media_type': post_data.get('media_type', ''),
-                        'posted_at': posted_at,
-                        'likes': likes,
-                        'comments': comments,
-                        'reach': insights.get('reach', 0),
-                        'impressions': insights.get('impressions', 0),
-                        'saves': insights.get('saves', 0),
-                        'shares': insights.get('shares', 0),
-                        'engagement_rate': engagement_rate,
-                    }
-                )
-                
-                posts_processed += 1
+            # Fetch insights for every post up front, concurrently
+            insights_by_post = self._get_posts_insights([post['id'] for post in posts])
+            
+            posts_processed = self._save_posts(posts, insights_by_post)
             
             sync_log.status = 'success'
             sync_log.records_processed = posts_processed
@@ -190,30 +218,359 @@ class InstagramService:
             
             raise e
     
+    def sync_posts_incremental(self, initial_limit=25):
+        """
+        Sync new posts since the high-water mark plus older posts due a refresh
+        
+        The first run (no high-water mark yet) takes the newest initial_limit
+        posts. Unchanged rows are not rewritten.
+        """
+        sync_log = SyncLog.objects.create(
+            account=self.account,
+            sync_type='posts',
+            status='in_progress'
+        )
+        
+        try:
+            url = f"{self.base_url}/{self.account.account_id}/media"
+            params = {
+                'fields': EXPANDED_MEDIA_FIELDS,
+                'limit': initial_limit,
+                'access_token': self.access_token
+            }
+            
+            response = self._get(url, params=params)
+            response.raise_for_status()
+            
+            new_count, due_count, written, unchanged = self._sync_posts_incremental(
+                response.json(), initial_limit
+            )
+            
+            sync_log.status = 'success'
+            sync_log.records_processed = written
+            sync_log.completed_at = timezone.now()
+            sync_log.save()
+            
+            logger.info(
+                f"Incremental Instagram sync for {self.account.username}: {new_count} new, "
+                f"{due_count} refreshed, {written} written, {unchanged} unchanged"
+            )
+            
+        except requests.RequestException as e:
+            error_msg = f"API request failed: {str(e)}"
+            logger.error(f"Instagram posts API error for {self.account.username}: {error_msg}")
+            
+            sync_log.status = 'failed'
+            sync_log.error_message = error_msg
+            sync_log.completed_at = timezone.now()
+            sync_log.save()
+            
+            raise e
+        except Exception as e:
+            error_msg = f"Unexpected error: {str(e)}"
+            logger.error(f"Instagram posts sync error for {self.account.username}: {error_msg}")
+            
+            sync_log.status = 'failed'
+            sync_log.error_message = error_msg
+            sync_log.completed_at = timezone.now()
+            sync_log.save()
+            
+            raise e
+    
+    def sync_account_expanded(self, limit=25, incremental=False):
+        """
+        Sync profile metrics, account insights and recent posts with their
+        insights using Graph API field expansion
+        
+        The profile, account insights and the first page of media (with each
+        post's insights nested) come back from a single request; further pages
+        are only followed when limit exceeds what the first page returned.
+        Falls back to the separate profile/posts syncs if the expanded request
+        is rejected for a field or edge it cannot serve; other errors (an
+        expired token, say) are raised as they are. With incremental=True, media paging stops at the account's
+        high-water mark and older posts are refreshed only when due.
+        """
+        sync_log = SyncLog.objects.create(
+            account=self.account,
+            sync_type='account',
+            status='in_progress'
+        )
+        
+        try:
+            url = f"{self.base_url}/{self.account.account_id}"
+            params = {
+                'fields': ','.join([
+                    'followers_count,follows_count,media_count,profile_picture_url,username,name',
+                    f"insights.metric({ACCOUNT_INSIGHT_METRICS}).period(day)",
+                    f"media.limit({limit}){{{EXPANDED_MEDIA_FIELDS}}}",
+                ]),
+                'access_token': self.access_token
+            }
+            
+            try:
+                response = self._get(url, params=params)
+                response.raise_for_status()
+            except requests.HTTPError as e:
+                if (e.response is None or e.response.status_code != 400
+                        or self._error_code(e.response) not in EXPANDED_FETCH_FALLBACK_ERROR_CODES):
+                    raise
+                # Some media types reject nested insights; use the unexpanded path
+                logger.warning(
+                    f"Expanded Instagram fetch rejected for {self.account.username}, "
+                    f"falling back to separate requests: {str(e)}"
+                )
+                sync_log.delete()
+                if incremental:
+                    self.sync_posts_incremental(initial_limit=limit)
+                else:
+                    self.sync_recent_posts(limit=limit)
+                return self.sync_profile_metrics()
+            
+            data = response.json()
+            
+            insights = self._parse_account_insights(data.get('insights', {}))
+            
+            # Posts first so the profile engagement rate sees the fresh numbers
+            if incremental:
+                _, _, posts_processed, _ = self._sync_posts_incremental(data.get('media', {}), limit)
+            else:
+                media = data.get('media', {})
+                posts = media.get('data', [])
+                next_page = media.get('paging', {}).get('next')
+                while next_page and len(posts) < limit:
+                    response = self._get(next_page)
+                    response.raise_for_status()
+                    page = response.json()
+                    posts.extend(page.get('data', []))
+                    next_page = page.get('paging', {}).get('next')
+                posts = posts[:limit]
+                
+                insights_by_post = {
+                    post['id']: self._parse_post_insights(post.get('insights', {}))
+                    for post in posts
+                }
+                posts_processed = self._save_posts(posts, insights_by_post)
+            
+            metrics = self._save_profile_metrics(data, insights)
+            
+            sync_log.status = 'success'
+            sync_log.records_processed = posts_processed + 1
+            sync_log.completed_at = timezone.now()
+            sync_log.save()
+            
+            logger.info(
+                f"Successfully synced Instagram account {self.account.username} "
+                f"({posts_processed} posts, {self.request_count} requests)"
+            )
+            return metrics
+            
+        except requests.RequestException as e:
+            error_msg = f"API request failed: {str(e)}"
+            logger.error(f"Instagram API error for {self.account.username}: {error_msg}")
+            
+            sync_log.status = 'failed'
+            sync_log.error_message = error_msg
+            sync_log.completed_at = timezone.now()
+            sync_log.save()
+            
+            raise e
+        except Exception as e:
+            error_msg = f"Unexpected error: {str(e)}"
+            logger.error(f"Instagram sync error for {self.account.username}: {error_msg}")
+            
+            sync_log.status = 'failed'
+            sync_log.error_message = error_msg
+            sync_log.completed_at = timezone.now()
+            sync_log.save()
+            
+            raise e
+    
+    def _save_profile_metrics(self, profile_data, insights):
+        """Write today's RealTimeMetrics row (and snapshot) from profile fields and account insights"""
+        # Calculate engagement rate
+        engagement_rate = self._calculate_engagement_rate()
+        
+        # Metrics row and latest-metrics snapshot are written together
+        with transaction.atomic():
+            metrics, created = RealTimeMetrics.objects.update_or_create(
+                account=self.account,
+                date=timezone.now().date(),
+                defaults={
+                    'followers_count': profile_data.get('followers_count', 0),
+                    'following_count': profile_data.get('follows_count', 0),
+                    'posts_count': profile_data.get('media_count', 0),
+                    'engagement_rate': engagement_rate,
+                    'reach': insights.get('reach', 0),
+                    'impressions': insights.get('impressions', 0),
+                    'profile_views': insights.get('profile_views', 0),
+                    'website_clicks': insights.get('website_clicks', 0),
+                }
+            )
+            
+            # Calculate daily growth
+            if not created:
+                yesterday_metrics = RealTimeMetrics.objects.filter(
+                    account=self.account,
+                    date=timezone.now().date() - timedelta(days=1)
+                ).first()
+            
+                if yesterday_metrics:
+                    daily_growth = metrics.followers_count - yesterday_metrics.followers_count
+                    metrics.daily_growth = daily_growth
+                    metrics.save()
+            
+            LatestAccountMetrics.update_from_metrics(metrics)
+            
+            # Update last sync time
+            self.account.last_sync = timezone.now()
+            self.account.save()
+        
+        return metrics
+    
+    def _save_posts(self, posts, insights_by_post):
+        """Upsert PostMetrics for Graph API media objects, skipping unchanged rows; returns the number synced"""
+        post_metrics = self._build_post_metrics(posts, insights_by_post)
+        
+        IncrementalSyncService.save_changed_posts(self.account, post_metrics)
+        IncrementalSyncService.advance_high_water_mark(
+            IncrementalSyncService.get_state(self.account), post_metrics
+        )
+        
+        return len(post_metrics)
+    
+    def _build_post_metrics(self, posts, insights_by_post):
+        """Unsaved PostMetrics for Graph API media objects"""
+        post_metrics = []
+        
+        for post_data in posts:
+            insights = insights_by_post.get(post_data['id'], {})
+            
+            # Parse timestamp
+            posted_at = datetime.fromisoformat(
+                post_data['timestamp'].replace('Z', '+00:00')
+            )
+            
+            # Calculate engagement rate for this post
+            likes = post_data.get('like_count', 0)
+            comments = post_data.get('comments_count', 0)
+            reach = insights.get('reach', 0)
+            
+            engagement_rate = 0
+            if reach > 0:
+                engagement_rate = ((likes + comments) / reach) * 100
+            
+            post_metrics.append(PostMetrics(
+                account=self.account,
+                post_id=post_data['id'],
+                caption=post_data.get('caption', ''),
+                media_type=post_data.get('media_type', ''),
+                posted_at=posted_at,
+                likes=likes,
+                comments=comments,
+                reach=reach,
+                impressions=insights.get('impressions', 0),
+                saves=insights.get('saves', 0),
+                shares=insights.get('shares', 0),
+                engagement_rate=round(engagement_rate, 2),
+            ))
+        
+        return post_metrics
+    
+    def _sync_posts_incremental(self, media_page, initial_limit):
+        """
+        Walk media pages (fetched with EXPANDED_MEDIA_FIELDS) back to the
+        high-water mark, look up due older posts by id, and save changed rows
+        
+        Returns:
+            (new posts, refreshed posts, rows written, rows unchanged)
+        """
+        state = IncrementalSyncService.get_state(self.account)
+        
+        new_posts = []
+        page = media_page
+        while page:
+            reached_mark = False
+            for post in page.get('data', []):
+                posted_at = datetime.fromisoformat(post['timestamp'].replace('Z', '+00:00'))
+                if state.last_posted_at and (
+                    posted_at < state.last_posted_at or post['id'] == state.last_post_id
+                ):
+                    reached_mark = True
+                    break
+                new_posts.append(post)
+            
+            if reached_mark or (not state.last_posted_at and len(new_posts) >= initial_limit):
+                break
+            
+            next_page = page.get('paging', {}).get('next')
+            if not next_page:
+                break
+            response = self._get(next_page)
+            response.raise_for_status()
+            page = response.json()
+        
+        if not state.last_posted_at:
+            new_posts = new_posts[:initial_limit]
+        
+        now = timezone.now()
+        due_ids = list(
+            IncrementalSyncService.posts_due_for_refresh(self.account, now=now, state=state)
+            .exclude(post_id__in=[post['id'] for post in new_posts])
+            .values_list('post_id', flat=True)
+        )
+        due_posts = self._get_media_by_ids(due_ids)
+        
+        insights_by_post = {
+            post['id']: self._parse_post_insights(post.get('insights', {}))
+            for post in new_posts + due_posts
+        }
+        new_metrics = self._build_post_metrics(new_posts, insights_by_post)
+        due_metrics = self._build_post_metrics(due_posts, insights_by_post)
+        
+        written, unchanged = IncrementalSyncService.save_changed_posts(
+            self.account, new_metrics + due_metrics
+        )
+        IncrementalSyncService.advance_high_water_mark(state, new_metrics)
+        IncrementalSyncService.mark_refreshed(state, now)
+        
+        return len(new_metrics), len(due_metrics), written, unchanged
+    
+    def _get_media_by_ids(self, post_ids):
+        """Fetch media objects (with nested insights) by id, up to 50 ids per request"""
+        media = []
+        
+        for start in range(0, len(post_ids), GRAPH_BATCH_LIMIT):
+            chunk = post_ids[start:start + GRAPH_BATCH_LIMIT]
+            try:
+                response = self._get(self.base_url, params={
+                    'ids': ','.join(chunk),
+                    'fields': EXPANDED_MEDIA_FIELDS,
+                    'access_token': self.access_token
+                })
+                response.raise_for_status()
+            except requests.RequestException as e:
+                logger.warning(f"Failed to refresh {len(chunk)} Instagram posts: {str(e)}")
+                continue
+            media.extend(response.json().values())
+        
+        return media
+    
     def _get_account_insights(self):
         """Get account-level insights"""
         try:
             url = f"{self.base_url}/{self.account.account_id}/insights"
             params = {
-                'metric': 'reach,impressions,profile_views,website_clicks',
+                'metric': ACCOUNT_INSIGHT_METRICS,
                 'period': 'day',
                 'since': (timezone.now() - timedelta(days=1)).strftime('%Y-%m-%d'),
                 'until': timezone.now().strftime('%Y-%m-%d'),
                 'access_token': self.access_token
             }
             
-            response = requests.get(url, params=params)
+            response = self._get(url, params=params)
             response.raise_for_status()
-            data = response.json()
             
-            insights = {}
-            for metric_data in data.get('data', []):
-                metric_name = metric_data['name']
-                values = metric_data.get('values', [])
-                if values:
-                    insights[metric_name] = values[-1].get('value', 0)
-            
-            return insights
+            return self._parse_account_insights(response.json())
             
         except requests.RequestException as e:
             logger.warning(f"Failed to get Instagram insights: {str(e)}")
@@ -224,27 +581,105 @@ class InstagramService:
         try:
             url = f"{self.base_url}/{post_id}/insights"
             params = {
-                'metric': 'reach,impressions,saves,shares',
+                'metric': POST_INSIGHT_METRICS,
                 'access_token': self.access_token
             }
             
-            response = requests.get(url, params=params)
+            response = self._get(url, params=params)
             response.raise_for_status()
-            data = response.json()
             
-            insights = {}
-            for metric_data in data.get('data', []):
-                metric_name = metric_data['name']
-                values = metric_data.get('values', [])
-                if values:
-                    insights[metric_name] = values[0].get('value', 0)
-            
-            return insights
+            return self._parse_post_insights(response.json())
             
         except requests.RequestException as e:
             logger.warning(f"Failed to get post insights for {post_id}: {str(e)}")
             return {}
     
+    def _get_posts_insights(self, post_ids):
+        """
+        Get insights for many posts, keyed by post id
+        
+        With INSTAGRAM_USE_BATCH_REQUESTS each Graph API batch call covers up
+        to 50 posts; otherwise one request per post. Either way requests run on
+        a thread pool bounded by INSTAGRAM_INSIGHTS_CONCURRENCY.
+        """
+        if not post_ids:
+            return {}
+        
+        if settings.INSTAGRAM_USE_BATCH_REQUESTS:
+            chunks = [
+                post_ids[start:start + GRAPH_BATCH_LIMIT]
+                for start in range(0, len(post_ids), GRAPH_BATCH_LIMIT)
+            ]
+            fetch, jobs = self._get_post_insights_batch, chunks
+        else:
+            fetch, jobs = self._get_post_insights, post_ids
+        
+        workers = min(self.insights_concurrency, len(jobs))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(fetch, jobs))
+        
+        if settings.INSTAGRAM_USE_BATCH_REQUESTS:
+            insights_by_post = {}
+            for chunk_insights in results:
+                insights_by_post.update(chunk_insights)
+            return insights_by_post
+        
+        return dict(zip(post_ids, results))
+    
+    def _get_post_insights_batch(self, post_ids):
+        """Get insights for up to 50 posts with a single Graph API batch request"""
+        batch = [
+            {'method': 'GET', 'relative_url': f"{post_id}/insights?metric={POST_INSIGHT_METRICS}"}
+            for post_id in post_ids
+        ]
+        
+        try:
+            response = self._post(self.base_url, data={
+                'batch': json.dumps(batch),
+                'include_headers': 'false',
+                'access_token': self.access_token
+            }, cost=len(batch))
+            response.raise_for_status()
+            results = response.json()
+        except requests.RequestException as e:
+            logger.warning(f"Failed to get batched post insights for {len(post_ids)} posts: {str(e)}")
+            return {}
+        
+        insights_by_post = {}
+        for post_id, result in zip(post_ids, results):
+            # Individual operations can fail (or be null) inside a successful batch
+            if not result or result.get('code') != 200:
+                logger.warning(f"Failed to get post insights for {post_id}: {result and result.get('body')}")
+                insights_by_post[post_id] = {}
+                continue
+            insights_by_post[post_id] = self._parse_post_insights(json.loads(result['body']))
+        
+        return insights_by_post
+    
+    @staticmethod
+    def _parse_account_insights(data):
+        """Flatten an account insights payload into {metric_name: latest value}"""
+        insights = {}
+        for metric_data in data.get('data', []):
+            metric_name = metric_data['name']
+            values = metric_data.get('values', [])
+            if values:
+                insights[metric_name] = values[-1].get('value', 0)
+        
+        return insights
+    
+    @staticmethod
+    def _parse_post_insights(data):
+        """Flatten a post insights payload into {metric_name: value}"""
+        insights = {}
+        for metric_data in data.get('data', []):
+            metric_name = metric_data['name']
+            values = metric_data.get('values', [])
+            if values:
+                insights[metric_name] = values[0].get('value', 0)
+        
+        return insights
+    
     def _calculate_engagement_rate(self):
         """Calculate overall engagement rate from recent posts"""
         try:
@@ -281,7 +716,7 @@ class InstagramService:
                 'fb_exchange_token': short_lived_token
             }
             
-            response = requests.get(url, params=params)
+            response = self._get(url, params=params)
             response.raise_for_status()
             data = response.json()
             
@@ -310,7 +745,7 @@ class InstagramService:
                 'fb_exchange_token': self.access_token
             }
             
-            response = requests.get(url, params=params)
+            response = self._get(url, params=params)
             response.raise_for_status()
             data = response.json()
             
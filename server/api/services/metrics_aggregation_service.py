@@ -5,14 +5,23 @@ This bridges the gap between daily YouTube metrics and monthly performance summa
 
 USAGE:
 1. Automatically aggregates daily metrics into monthly performance
-2. Provides real-time stats for client dashboard
-3. Syncs YouTube videos to content posts
+2. Batch-aggregates every active client in a handful of queries
+3. Provides real-time stats for client dashboard (cached per client)
+4. Syncs YouTube videos to content posts
 """
 
+import calendar
 import logging
+import time
+from collections import defaultdict
 from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from django.db.models import Avg, Sum, Max, Min, Count, F
+from django.db.models import (
+    Avg, Sum, Max, Min, Count, F, Q, Window, OuterRef, Subquery, FilteredRelation
+)
+from django.db.models.functions import Coalesce, RowNumber
 from decimal import Decimal
 
 from ..models import (
@@ -45,12 +54,7 @@ class MetricsAggregationService:
         if isinstance(month_date, datetime):
             month_date = month_date.date()
         
-        start_date = month_date.replace(day=1)
-        
-        # Calculate last day of month
-        import calendar
-        last_day = calendar.monthrange(month_date.year, month_date.month)[1]
-        end_date = month_date.replace(day=last_day)
+        start_date, end_date = MetricsAggregationService._month_bounds(month_date)
         
         logger.info(f"Aggregating metrics for {client.name} from {start_date} to {end_date}")
         
@@ -140,6 +144,139 @@ class MetricsAggregationService:
         
         return performance_data
     
+    @staticmethod
+    def _month_bounds(month_date):
+        """Return (first_day, last_day) of the month containing month_date"""
+        if isinstance(month_date, datetime):
+            month_date = month_date.date()
+        last_day = calendar.monthrange(month_date.year, month_date.month)[1]
+        return month_date.replace(day=1), month_date.replace(day=last_day)
+    
+    @staticmethod
+    def latest_metrics_per_account(metrics):
+        """
+        Reduce a RealTimeMetrics queryset to the most recent row per account
+        
+        Uses a ROW_NUMBER() window partitioned by account, so the whole
+        reduction happens in a single query on both SQLite and PostgreSQL.
+        """
+        return metrics.annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('account_id')],
+                order_by=F('date').desc(),
+            )
+        ).filter(row_number=1)
+    
+    @staticmethod
+    def aggregate_all_clients_batch(month_date=None):
+        """
+        Aggregate a month of metrics for every active client at once
+        
+        Set-based equivalent of calling aggregate_monthly_performance() per
+        client: one windowed query picks the latest row per account, one
+        query loads the previous month's PerformanceData and one bulk upsert
+        writes every row.
+        
+        Args:
+            month_date: Date object for the month (defaults to current month)
+        
+        Returns:
+            dict with the number of clients written and per-phase timings (seconds)
+        """
+        if month_date is None:
+            month_date = timezone.now().date()
+        
+        start_date, end_date = MetricsAggregationService._month_bounds(month_date)
+        timings = {}
+        
+        # Phase 1: latest metrics row per active account, for all active clients
+        phase_start = time.perf_counter()
+        metrics = RealTimeMetrics.objects.filter(
+            account__is_active=True,
+            account__client__status='active',
+            date__gte=start_date,
+            date__lte=end_date
+        )
+        latest_rows = MetricsAggregationService.latest_metrics_per_account(metrics).values(
+            'account__client_id', 'followers_count', 'reach', 'impressions',
+            'website_clicks', 'engagement_rate'
+        )
+        
+        totals = defaultdict(lambda: {
+            'followers': 0, 'reach': 0, 'impressions': 0, 'clicks': 0, 'engagement_rates': []
+        })
+        for row in latest_rows:
+            client_totals = totals[row['account__client_id']]
+            client_totals['followers'] += row['followers_count']
+            client_totals['reach'] += row['reach']
+            client_totals['impressions'] += row['impressions']
+            client_totals['clicks'] += row['website_clicks']
+            client_totals['engagement_rates'].append(float(row['engagement_rate']))
+        timings['latest_metrics'] = time.perf_counter() - phase_start
+        
+        # Phase 2: previous month's followers for growth rate
+        phase_start = time.perf_counter()
+        previous_month = (start_date - timedelta(days=1)).replace(day=1)
+        previous_followers = dict(
+            PerformanceData.objects.filter(
+                client_id__in=list(totals.keys()),
+                month=previous_month
+            ).values_list('client_id', 'followers')
+        )
+        timings['previous_month'] = time.perf_counter() - phase_start
+        
+        # Phase 3: build PerformanceData rows
+        phase_start = time.perf_counter()
+        rows = []
+        for client_id, client_totals in totals.items():
+            rates = client_totals['engagement_rates']
+            avg_engagement = Decimal(sum(rates) / len(rates)) if rates else Decimal('0.00')
+            
+            growth_rate = Decimal('0.00')
+            previous = previous_followers.get(client_id)
+            if previous:
+                growth_rate = Decimal(((client_totals['followers'] - previous) / previous) * 100)
+            
+            rows.append(PerformanceData(
+                client_id=client_id,
+                month=start_date,
+                followers=client_totals['followers'],
+                engagement=round(avg_engagement, 2),
+                reach=client_totals['reach'],
+                clicks=client_totals['clicks'],
+                impressions=client_totals['impressions'],
+                growth_rate=round(growth_rate, 2)
+            ))
+        timings['build'] = time.perf_counter() - phase_start
+        
+        # Phase 4: single bulk upsert on (client, month)
+        phase_start = time.perf_counter()
+        PerformanceData.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['client', 'month'],
+            update_fields=[
+                'followers', 'engagement', 'reach', 'clicks',
+                'impressions', 'growth_rate', 'updated_at'
+            ]
+        )
+        timings['upsert'] = time.perf_counter() - phase_start
+        timings['total'] = sum(timings.values())
+        
+        logger.info(
+            f"Batch-aggregated PerformanceData for {len(rows)} clients - "
+            f"{start_date.strftime('%Y-%m')} in {timings['total']:.3f}s "
+            f"({', '.join(f'{phase}={seconds:.3f}s' for phase, seconds in timings.items())})"
+        )
+        
+        return {
+            'clients_processed': len(rows),
+            'month': start_date.isoformat(),
+            'timings': {phase: round(seconds, 4) for phase, seconds in timings.items()}
+        }
+    
     @staticmethod
     def aggregate_all_clients_current_month():
         """Aggregate current month data for all clients"""
@@ -164,13 +301,37 @@ class MetricsAggregationService:
         """
         Get real-time stats for client dashboard (alternative to monthly performance)
         This provides up-to-date stats without waiting for monthly aggregation
+        
+        One aggregate query over the client's active accounts: current numbers
+        come from the LatestAccountMetrics snapshot, the 30-days-ago followers
+        from a date-filtered join and the month's posts from a per-account
+        count subquery.
         """
-        social_accounts = SocialMediaAccount.objects.filter(
+        today = timezone.now().date()
+        thirty_days_ago = today - timedelta(days=30)
+        current_month = timezone.now().replace(day=1)
+        
+        posts_this_month = PostMetrics.objects.filter(
+            account=OuterRef('pk'),
+            posted_at__gte=current_month
+        ).values('account').annotate(count=Count('pk')).values('count')
+        
+        totals = SocialMediaAccount.objects.filter(
             client=client,
             is_active=True
+        ).annotate(
+            metrics_30_days_ago=FilteredRelation('metrics', condition=Q(metrics__date=thirty_days_ago)),
+            account_posts_this_month=Coalesce(Subquery(posts_this_month), 0)
+        ).aggregate(
+            accounts=Count('pk'),
+            total_followers=Coalesce(Sum('latest_metrics__followers_count'), 0),
+            reach=Coalesce(Sum('latest_metrics__reach'), 0),
+            engagement_rate=Avg('latest_metrics__engagement_rate'),
+            old_followers=Sum('metrics_30_days_ago__followers_count'),
+            posts_this_month=Coalesce(Sum('account_posts_this_month'), 0)
         )
         
-        if not social_accounts.exists():
+        if not totals['accounts']:
             return {
                 'total_followers': 0,
                 'engagement_rate': 0,
@@ -179,58 +340,43 @@ class MetricsAggregationService:
                 'growth_rate': 0
             }
         
-        # Get latest metrics for each account
-        total_followers = 0
-        total_reach = 0
-        engagement_rates = []
-        daily_growths = []
-        
-        for account in social_accounts:
-            latest = RealTimeMetrics.objects.filter(
-                account=account
-            ).order_by('-date').first()
-            
-            if latest:
-                total_followers += latest.followers_count
-                total_reach += latest.reach
-                engagement_rates.append(float(latest.engagement_rate))
-                daily_growths.append(latest.daily_growth)
-        
-        avg_engagement = sum(engagement_rates) / len(engagement_rates) if engagement_rates else 0
-        total_daily_growth = sum(daily_growths)
-        
-        # Calculate growth rate from last 30 days
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
+        # Growth over the last 30 days, when there is history from back then
         growth_rate = 0
-        
-        try:
-            old_metrics = RealTimeMetrics.objects.filter(
-                account__in=social_accounts,
-                date=thirty_days_ago
-            )
-            
-            if old_metrics.exists():
-                old_followers = sum(m.followers_count for m in old_metrics)
-                if old_followers > 0:
-                    growth_rate = ((total_followers - old_followers) / old_followers) * 100
-        except Exception as e:
-            logger.warning(f"Failed to calculate 30-day growth: {e}")
-        
-        # Posts this month
-        current_month = timezone.now().replace(day=1)
-        posts_this_month = PostMetrics.objects.filter(
-            account__in=social_accounts,
-            posted_at__gte=current_month
-        ).count()
+        old_followers = totals['old_followers']
+        if old_followers:
+            growth_rate = ((totals['total_followers'] - old_followers) / old_followers) * 100
         
         return {
-            'total_followers': total_followers,
-            'engagement_rate': round(avg_engagement, 2),
-            'posts_this_month': posts_this_month,
-            'reach': total_reach,
+            'total_followers': totals['total_followers'],
+            'engagement_rate': round(float(totals['engagement_rate'] or 0), 2),
+            'posts_this_month': totals['posts_this_month'],
+            'reach': totals['reach'],
             'growth_rate': round(growth_rate, 2)
         }
     
+    @staticmethod
+    def client_stats_cache_key(client_id):
+        return f"dashboard_stats:client:{client_id}"
+    
+    @staticmethod
+    def get_cached_client_stats(client):
+        """
+        get_client_real_time_stats() behind a per-client cache entry
+        Entries live for CACHE_TIMEOUTS['dashboard_stats'] and are dropped
+        early by invalidate_client_stats() when the underlying data changes
+        """
+        cache_key = MetricsAggregationService.client_stats_cache_key(client.id)
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = MetricsAggregationService.get_client_real_time_stats(client)
+            cache.set(cache_key, stats, timeout=settings.CACHE_TIMEOUTS['dashboard_stats'])
+        return stats
+    
+    @staticmethod
+    def invalidate_client_stats(client_id):
+        """Drop a client's cached dashboard stats (after syncs and account changes)"""
+        cache.delete(MetricsAggregationService.client_stats_cache_key(client_id))
+    
     @staticmethod
     def sync_youtube_videos_to_content(account):
         """
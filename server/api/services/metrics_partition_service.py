@@ -0,0 +1,241 @@
+# server/api/services/metrics_partition_service.py
+"""
+Monthly range partitioning of RealTimeMetrics on PostgreSQL
+
+Once convert_table() has turned api_realtimemetrics into a table
+partitioned by RANGE (date), every query carrying a date bound (the monthly
+aggregation, growth lookups, retention) only touches the months it needs,
+and retention drops whole expired months instead of DELETEing row by row.
+
+Partitions are named <table>_pYYYYMM and cover [first of month, first of
+next month). A DEFAULT partition catches rows outside the managed range
+(e.g. backfills) so writes never fail for want of a partition. When a
+month's partition is created later, its rows are moved out of DEFAULT in
+the same transaction; PostgreSQL refuses the new partition otherwise.
+
+On any other backend (SQLite in development) the table keeps its plain
+layout and every method here is a no-op.
+"""
+
+import logging
+import re
+from datetime import date
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import RealTimeMetrics
+
+logger = logging.getLogger(__name__)
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def add_months(month_start, months):
+    """First day of the month `months` after month_start (may be negative)"""
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class MetricsPartitionService:
+    """Create, list and retire monthly RealTimeMetrics partitions"""
+
+    def __init__(self):
+        config = settings.METRICS_PARTITIONING
+
+        self.table = RealTimeMetrics._meta.db_table
+        self.months_ahead = max(config['months_ahead'], 0)
+        self.archive_expired = config['archive_expired']
+
+    @staticmethod
+    def is_supported():
+        return connection.vendor == 'postgresql'
+
+    def is_partitioned(self):
+        if not self.is_supported():
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+                [self.table]
+            )
+            return cursor.fetchone() is not None
+
+    def partition_name(self, month_start):
+        return f"{self.table}_p{month_start:%Y%m}"
+
+    def list_partitions(self):
+        """{month start: partition name} for the monthly partitions currently attached"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = to_regclass(%s)
+                """,
+                [self.table]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+
+        partitions = {}
+        for name in names:
+            match = PARTITION_SUFFIX.search(name)
+            if match:
+                partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+        return partitions
+
+    def ensure_partitions(self, today=None):
+        """
+        Create partitions from the current month through months_ahead months out
+
+        Returns:
+            list of partition names created
+        """
+        if not self.is_partitioned():
+            return []
+
+        current_month = (today or timezone.now().date()).replace(day=1)
+        existing = self.list_partitions()
+        created = []
+
+        for offset in range(self.months_ahead + 1):
+            month_start = add_months(current_month, offset)
+            if month_start not in existing:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    self._create_partition(month_start, cursor)
+                created.append(self.partition_name(month_start))
+
+        if created:
+            logger.info(f"Created {self.table} partitions: {', '.join(created)}")
+        return created
+
+    def retire_expired_partitions(self, cutoff):
+        """
+        Drop (or detach, with archive_expired) partitions whose whole month is before cutoff
+
+        Rows in the month containing cutoff are left for the caller's DELETE.
+
+        Returns:
+            list of partition names retired
+        """
+        if not self.is_partitioned():
+            return []
+
+        retired = []
+        for month_start, name in sorted(self.list_partitions().items()):
+            if add_months(month_start, 1) > cutoff:
+                break
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE {self._quote(self.table)} DETACH PARTITION {self._quote(name)}')
+                if not self.archive_expired:
+                    cursor.execute(f'DROP TABLE {self._quote(name)}')
+            retired.append(name)
+
+        if retired:
+            action = 'Detached' if self.archive_expired else 'Dropped'
+            logger.info(f"{action} expired {self.table} partitions: {', '.join(retired)}")
+        return retired
+
+    def convert_table(self):
+        """
+        Rebuild the table as a monthly-partitioned one, keeping its rows
+
+        Runs in one transaction holding an exclusive lock on the table, so
+        schedule it in a maintenance window. The primary key becomes
+        (id, date) because PostgreSQL requires the partition key in every
+        unique constraint; (account, date) stays unique as before.
+
+        Returns:
+            list of partition names created
+        """
+        if not self.is_supported():
+            raise RuntimeError(f'Partitioning is only supported on PostgreSQL, not {connection.vendor}')
+        if self.is_partitioned():
+            return []
+
+        table = self._quote(self.table)
+        old_table = self._quote(f'{self.table}_unpartitioned')
+        account_table = self._quote(RealTimeMetrics._meta.get_field('account').related_model._meta.db_table)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'SELECT MIN(date) FROM {table}')
+            oldest = cursor.fetchone()[0]
+
+            cursor.execute(f'ALTER TABLE {table} RENAME TO {old_table}')
+            cursor.execute(
+                f'CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS INCLUDING STORAGE) '
+                f'PARTITION BY RANGE (date)'
+            )
+            cursor.execute(f'CREATE TABLE {self._quote(self.table + "_default")} PARTITION OF {table} DEFAULT')
+
+            current_month = timezone.now().date().replace(day=1)
+            month_start = oldest.replace(day=1) if oldest else current_month
+            created = []
+            while month_start <= add_months(current_month, self.months_ahead):
+                self._create_partition(month_start, cursor)
+                created.append(self.partition_name(month_start))
+                month_start = add_months(month_start, 1)
+
+            cursor.execute(f'INSERT INTO {table} SELECT * FROM {old_table}')
+            # Dropping the old table frees its index names for the new one
+            cursor.execute(f'DROP TABLE {old_table}')
+
+            # Constraints and indexes on the parent cascade to every partition
+            cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, date)')
+            cursor.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {self._quote(self.table + "_account_date_uniq")} '
+                f'UNIQUE (account_id, date)'
+            )
+            cursor.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {self._quote(self.table + "_account_fk")} '
+                f'FOREIGN KEY (account_id) REFERENCES {account_table} (id) DEFERRABLE INITIALLY DEFERRED'
+            )
+            with connection.schema_editor(atomic=False) as editor:
+                for index in RealTimeMetrics._meta.indexes:
+                    editor.add_index(RealTimeMetrics, index)
+
+        logger.info(f"Converted {self.table} to {len(created)} monthly partitions")
+        return created
+
+    def _create_partition(self, month_start, cursor):
+        """
+        Create the partition for month_start, moving that month's rows out of DEFAULT
+
+        Call inside a transaction. Creating a partition while DEFAULT holds rows
+        in its range fails, so in that case DEFAULT is detached, the partition
+        created, the rows re-inserted through the parent (which routes them to
+        it) and DEFAULT attached again.
+        """
+        table = self._quote(self.table)
+        default = self._quote(f'{self.table}_default')
+        bounds = [month_start, add_months(month_start, 1)]
+        create_sql = (
+            f'CREATE TABLE {self._quote(self.partition_name(month_start))} '
+            f'PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)'
+        )
+
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [f'{self.table}_default'])
+        has_default = cursor.fetchone()[0]
+        if has_default:
+            cursor.execute(f'SELECT 1 FROM {default} WHERE date >= %s AND date < %s LIMIT 1', bounds)
+        if not has_default or cursor.fetchone() is None:
+            cursor.execute(create_sql, bounds)
+            return
+
+        cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+        cursor.execute(create_sql, bounds)
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {default} WHERE date >= %s AND date < %s RETURNING *) '
+            f'INSERT INTO {table} SELECT * FROM moved',
+            bounds
+        )
+        moved = cursor.rowcount
+        cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT')
+        logger.info(f"Moved {moved} rows from {self.table}_default into {self.partition_name(month_start)}")
+
+    @staticmethod
+    def _quote(name):
+        return connection.ops.quote_name(name)
@@ -0,0 +1,222 @@
+# server/api/services/metrics_rollup_service.py
+"""
+Weekly and monthly rollups of RealTimeMetrics for long-range charts
+
+Daily rows are folded into one MetricsRollup per account per week and per
+month, holding min / max / last / avg of every counter. Range queries pick
+the coarsest tier that still gives the requested resolution, so a three
+year chart reads ~36 monthly rows per account instead of ~1,100 daily ones.
+
+Rollups are refreshed incrementally: each run refolds only the weeks and
+months overlapping the last few days, which is where syncs write.
+"""
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import RealTimeMetrics, MetricsRollup
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = ['day', 'week', 'month']
+
+
+class MetricsRollupService:
+    """Build MetricsRollup rows and serve metrics history from the right tier"""
+
+    @staticmethod
+    def period_start(day, resolution):
+        """First day of the week (Monday) or month containing day"""
+        if resolution == 'week':
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1)
+
+    @staticmethod
+    def choose_resolution(start_date, end_date, requested='auto'):
+        """
+        Tier to read for a date range
+
+        An explicit resolution is honoured; 'auto' picks daily rows for short
+        ranges, weekly rollups up to METRICS_ROLLUP['weekly_days'] and monthly
+        rollups beyond.
+        """
+        if requested in RESOLUTIONS:
+            return requested
+
+        config = settings.METRICS_ROLLUP
+        span = (end_date - start_date).days
+        if span <= config['daily_days']:
+            return 'day'
+        if span <= config['weekly_days']:
+            return 'week'
+        return 'month'
+
+    @staticmethod
+    def refresh(since=None, account_ids=None, batch_size=500):
+        """
+        Refold the weeks and months overlapping [since, today] from daily rows
+
+        Args:
+            since: first day whose rollups may be stale (defaults to
+                METRICS_ROLLUP['refresh_lookback_days'] ago)
+            account_ids: restrict to these accounts
+            batch_size: rollup rows written per upsert
+
+        Returns:
+            number of rollup rows written
+        """
+        if since is None:
+            since = timezone.now().date() - timedelta(days=settings.METRICS_ROLLUP['refresh_lookback_days'])
+
+        # Refold whole periods only: each tier starts at the period containing `since`
+        starts = {
+            resolution: MetricsRollupService.period_start(since, resolution)
+            for resolution in ('week', 'month')
+        }
+        metrics = RealTimeMetrics.objects.filter(date__gte=min(starts.values()))
+        if account_ids is not None:
+            metrics = metrics.filter(account_id__in=account_ids)
+
+        return MetricsRollupService._fold(metrics, batch_size, starts)
+
+    @staticmethod
+    def rebuild(batch_size=500):
+        """Refold every rollup from the full daily history"""
+        return MetricsRollupService._fold(RealTimeMetrics.objects.all(), batch_size, {})
+
+    @staticmethod
+    def _fold(metrics, batch_size, starts):
+        """
+        Stream daily rows ordered by (account, date) and upsert one rollup per period
+
+        Within one account rows arrive in date order, so each week and month
+        is a contiguous run and only the current run is held in memory.
+        Rows before starts[resolution] are not folded into that tier, so a
+        period is never rewritten from part of its days.
+        """
+        rows = metrics.order_by('account_id', 'date').values(
+            'account_id', 'date', *MetricsRollup.COUNTER_FIELDS
+        ).iterator(chunk_size=2000)
+
+        pending = []
+        written = 0
+        current = {'week': None, 'month': None}
+
+        def flush_pending():
+            nonlocal pending, written
+            MetricsRollup.objects.bulk_create(
+                pending,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['account', 'resolution', 'period_start'],
+                update_fields=['last_date', 'sample_count', 'stats', 'updated_at']
+            )
+            written += len(pending)
+            pending = []
+
+        for row in rows:
+            for resolution in ('week', 'month'):
+                if resolution in starts and row['date'] < starts[resolution]:
+                    continue
+                key = (row['account_id'], MetricsRollupService.period_start(row['date'], resolution))
+                accumulator = current[resolution]
+                if accumulator is None or accumulator['key'] != key:
+                    if accumulator is not None:
+                        pending.append(MetricsRollupService._to_rollup(resolution, accumulator))
+                    accumulator = current[resolution] = {'key': key, 'samples': 0, 'stats': {}}
+                MetricsRollupService._add_sample(accumulator, row)
+
+            if len(pending) >= batch_size:
+                flush_pending()
+
+        for resolution, accumulator in current.items():
+            if accumulator is not None:
+                pending.append(MetricsRollupService._to_rollup(resolution, accumulator))
+        if pending:
+            flush_pending()
+
+        logger.info(f"Refreshed {written} metrics rollups")
+        return written
+
+    @staticmethod
+    def _add_sample(accumulator, row):
+        accumulator['samples'] += 1
+        accumulator['last_date'] = row['date']
+        for field in MetricsRollup.COUNTER_FIELDS:
+            value = float(row[field])
+            stat = accumulator['stats'].get(field)
+            if stat is None:
+                accumulator['stats'][field] = {'min': value, 'max': value, 'last': value, 'sum': value}
+            else:
+                stat['min'] = min(stat['min'], value)
+                stat['max'] = max(stat['max'], value)
+                stat['last'] = value
+                stat['sum'] += value
+
+    @staticmethod
+    def _to_rollup(resolution, accumulator):
+        account_id, period_start = accumulator['key']
+        samples = accumulator['samples']
+        return MetricsRollup(
+            account_id=account_id,
+            resolution=resolution,
+            period_start=period_start,
+            last_date=accumulator['last_date'],
+            sample_count=samples,
+            stats={
+                field: {
+                    'min': stat['min'],
+                    'max': stat['max'],
+                    'last': stat['last'],
+                    'avg': round(stat['sum'] / samples, 2),
+                }
+                for field, stat in accumulator['stats'].items()
+            }
+        )
+
+    @staticmethod
+    def get_history(account_ids, start_date, end_date, resolution='auto'):
+        """
+        Metrics history for accounts between two dates
+
+        Daily points come straight from RealTimeMetrics (min = max = last =
+        avg); weekly and monthly points from MetricsRollup, so every tier
+        has the same shape.
+
+        Returns:
+            (resolution used, {account_id: [point, ...]}) with points in date order
+        """
+        resolution = MetricsRollupService.choose_resolution(start_date, end_date, resolution)
+        history = {account_id: [] for account_id in account_ids}
+
+        if resolution == 'day':
+            rows = RealTimeMetrics.objects.filter(
+                account_id__in=account_ids,
+                date__gte=start_date,
+                date__lte=end_date
+            ).order_by('date').values('account_id', 'date', *MetricsRollup.COUNTER_FIELDS)
+
+            for row in rows:
+                stats = {}
+                for field in MetricsRollup.COUNTER_FIELDS:
+                    value = float(row[field])
+                    stats[field] = {'min': value, 'max': value, 'last': value, 'avg': value}
+                history[row['account_id']].append({'date': row['date'], 'samples': 1, **stats})
+            return resolution, history
+
+        rollups = MetricsRollup.objects.filter(
+            account_id__in=account_ids,
+            resolution=resolution,
+            period_start__gte=MetricsRollupService.period_start(start_date, resolution),
+            period_start__lte=end_date
+        ).order_by('period_start').values('account_id', 'period_start', 'sample_count', 'stats')
+
+        for rollup in rollups:
+            history[rollup['account_id']].append({
+                'date': rollup['period_start'],
+                'samples': rollup['sample_count'],
+                **rollup['stats']
+            })
+        return resolution, history
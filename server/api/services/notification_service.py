@@ -2,8 +2,13 @@
 """
 Notification service for sending various types of notifications
 """
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
 from ..models import Notification
+from .realtime_service import RealtimeService
+from .unread_counter_service import UnreadCounterService
 import logging
 
 User = get_user_model()
@@ -23,24 +28,90 @@ class NotificationService:
                 message=message,
                 notification_type=notification_type
             )
+            UnreadCounterService.notifications_created(notification.user_id)
+            RealtimeService.publish_notification(notification)
             logger.info(f"Notification created for user {user.email}: {title}")
             return notification
         except Exception as e:
             logger.error(f"Error creating notification: {e}")
             return None
     
+    @staticmethod
+    def create_notifications(recipients, title, message, notification_type='general'):
+        """
+        Create the same notification for many users with one bulk INSERT
+        
+        Args:
+            recipients: User queryset, or iterable of Users or user ids
+            title, message, notification_type: as for create_notification
+        
+        Returns:
+            list of created Notifications (empty on error)
+        """
+        if isinstance(recipients, QuerySet):
+            user_ids = list(recipients.values_list('id', flat=True))
+        else:
+            user_ids = [getattr(recipient, 'pk', recipient) for recipient in recipients]
+        if not user_ids:
+            return []
+        
+        try:
+            notifications = Notification.objects.bulk_create(
+                [
+                    Notification(
+                        user_id=user_id,
+                        title=title,
+                        message=message,
+                        notification_type=notification_type
+                    )
+                    for user_id in user_ids
+                ],
+                batch_size=settings.NOTIFICATION_FANOUT['batch_size']
+            )
+            UnreadCounterService.notifications_created(user_ids)
+            RealtimeService.publish_notifications(notifications)
+            logger.info(f"Notification created for {len(notifications)} users: {title}")
+            return notifications
+        except Exception as e:
+            logger.error(f"Error creating notifications: {e}")
+            return []
+    
+    @staticmethod
+    def notify_admins(title, message, notification_type='general'):
+        """
+        Send a notification to every admin
+        
+        With NOTIFICATION_FANOUT['async'] the rows are written by a Celery
+        worker once the current transaction commits, so the request does no
+        per-admin work; if the task cannot be queued they are written inline.
+        """
+        if not settings.NOTIFICATION_FANOUT['async']:
+            NotificationService.create_notifications(
+                User.objects.filter(role='admin'), title, message, notification_type
+            )
+            return
+        
+        def enqueue():
+            from ..tasks import fan_out_notification
+            try:
+                fan_out_notification.delay(title, message, notification_type, role='admin')
+            except Exception as e:
+                logger.warning(f"Could not queue admin notification, sending inline: {e}")
+                NotificationService.create_notifications(
+                    User.objects.filter(role='admin'), title, message, notification_type
+                )
+        
+        transaction.on_commit(enqueue)
+    
     # Content-related notifications
     @staticmethod
     def notify_content_submitted(content_post):
         """Notify admins when client submits content"""
-        admin_users = User.objects.filter(role='admin')
-        for admin in admin_users:
-            NotificationService.create_notification(
-                user=admin,
-                title="New Content Submitted 📝",
-                message=f"Client {content_post.client.name} submitted content: '{content_post.caption[:50]}...' for review.",
-                notification_type='content_submitted'
-            )
+        NotificationService.notify_admins(
+            title="New Content Submitted 📝",
+            message=f"Client {content_post.client.name} submitted content: '{content_post.caption[:50]}...' for review.",
+            notification_type='content_submitted'
+        )
     
     @staticmethod
     def notify_content_approved(client_user, content_post):
@@ -80,14 +151,11 @@ class NotificationService:
     @staticmethod
     def notify_message_to_admin(sender_name):
         """Notify admins of new message"""
-        admin_users = User.objects.filter(role='admin')
-        for admin in admin_users:
-            NotificationService.create_notification(
-                user=admin,
-                title="New Message 💬",
-                message=f"You have a new message from {sender_name}",
-                notification_type='message_received'
-            )
+        NotificationService.notify_admins(
+            title="New Message 💬",
+            message=f"You have a new message from {sender_name}",
+            notification_type='message_received'
+        )
     
     @staticmethod
     def notify_message_received(recipient_user, sender_name):
@@ -103,14 +171,11 @@ class NotificationService:
     @staticmethod
     def notify_new_user_registered(user):
         """Notify admins of new user registration"""
-        admin_users = User.objects.filter(role='admin')
-        for admin in admin_users:
-            NotificationService.create_notification(
-                user=admin,
-                title="New User Registered 👋",
-                message=f"New user {user.first_name or user.email} has registered with role: {user.role}",
-                notification_type='user_registered'
-            )
+        NotificationService.notify_admins(
+            title="New User Registered 👋",
+            message=f"New user {user.first_name or user.email} has registered with role: {user.role}",
+            notification_type='user_registered'
+        )
     
     # Invoice notifications
     @staticmethod
@@ -167,14 +232,11 @@ class NotificationService:
     @staticmethod
     def notify_subscription_created(client, plan_name):
         """Notify admins of new subscription"""
-        admin_users = User.objects.filter(role='admin')
-        for admin in admin_users:
-            NotificationService.create_notification(
-                user=admin,
-                title="New Subscription Created 💼",
-                message=f"Client {client.name} has subscribed to {plan_name}",
-                notification_type='subscription_created'
-            )
+        NotificationService.notify_admins(
+            title="New Subscription Created 💼",
+            message=f"Client {client.name} has subscribed to {plan_name}",
+            notification_type='subscription_created'
+        )
     
     @staticmethod
     def notify_subscription_cancelled(client_user):
@@ -189,14 +251,11 @@ class NotificationService:
     @staticmethod
     def notify_client_cancelled_subscription(client):
         """Notify admins when client cancels subscription"""
-        admin_users = User.objects.filter(role='admin')
-        for admin in admin_users:
-            NotificationService.create_notification(
-                user=admin,
-                title="Client Cancelled Subscription",
-                message=f"Client {client.name} has cancelled their subscription.",
-                notification_type='subscription_cancelled'
-            )
+        NotificationService.notify_admins(
+            title="Client Cancelled Subscription",
+            message=f"Client {client.name} has cancelled their subscription.",
+            notification_type='subscription_cancelled'
+        )
     
     @staticmethod
     def notify_subscription_renewal_reminder(client_user, renewal_date):
@@ -212,14 +271,11 @@ class NotificationService:
     @staticmethod
     def notify_payment_verification_submitted(client, amount, plan):
         """Notify admins of payment verification submission"""
-        admin_users = User.objects.filter(role='admin')
-        for admin in admin_users:
-            NotificationService.create_notification(
-                user=admin,
-                title="Payment Verification Submitted 💳",
-                message=f"Client {client.name} submitted payment verification for {plan} plan (${amount})",
-                notification_type='payment_verification'
-            )
+        NotificationService.notify_admins(
+            title="Payment Verification Submitted 💳",
+            message=f"Client {client.name} submitted payment verification for {plan} plan (${amount})",
+            notification_type='payment_verification'
+        )
     
     # Task notifications
     @staticmethod
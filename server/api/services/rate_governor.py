@@ -0,0 +1,253 @@
+# server/api/services/rate_governor.py
+"""
+Redis-backed token buckets for platform API quotas
+
+Every YouTube / Graph API call acquires its cost from two buckets - one for
+the platform (shared by the whole app) and one for the account - in a single
+atomic Lua script, so all Celery workers draw from the same budget. When a
+bucket is short, the caller sleeps if the wait is under
+RATE_GOVERNOR_MAX_WAIT and otherwise gets RateLimitExceeded with the number
+of seconds to reschedule by.
+
+Graph API usage headers (X-App-Usage, X-Business-Use-Case-Usage) feed a
+throttle factor that inflates the cost of further calls as usage climbs, and
+a hard block once Meta reports a limit was hit.
+
+If Redis is unavailable the governor fails open: calls go through unmetered.
+"""
+
+import json
+import logging
+import threading
+import time
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# YouTube Data API quota cost per method
+YOUTUBE_QUOTA_COSTS = {
+    'search.list': 100,
+    'videos.list': 1,
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'reports.query': 1,
+}
+
+# Usage percentage at which Graph API calls start costing more
+THROTTLE_START_PERCENT = 60
+# Cost multiplier reached at 100% usage
+THROTTLE_MAX_FACTOR = 5
+# How long usage readings from response headers stay relevant
+USAGE_TTL_SECONDS = 5 * 60
+
+# Atomically take ARGV[2] tokens from every bucket in KEYS, or none of them.
+# ARGV: now, cost, then capacity/refill-per-second pairs for each key.
+# Returns '0' on success, otherwise the seconds until all buckets can pay.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local wait = 0
+local levels = {}
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[1 + i * 2])
+    local rate = tonumber(ARGV[2 + i * 2])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+
+if wait > 0 then
+    return tostring(wait)
+end
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[1 + i * 2])
+    local rate = tonumber(ARGV[2 + i * 2])
+    redis.call('HSET', key, 'tokens', levels[i] - cost, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 60)
+end
+
+return '0'
+"""
+
+# Seconds to skip Redis after a connection error, so calls don't each wait on a timeout
+REDIS_RETRY_SECONDS = 30
+
+_redis = None
+_token_bucket = None
+_redis_lock = threading.Lock()
+_redis_down_until = 0
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call cannot be made within the platform/account budget"""
+
+    def __init__(self, platform, retry_after, reason='budget exhausted'):
+        self.platform = platform
+        self.retry_after = max(int(retry_after), 1)
+        super().__init__(f"{platform} rate limit: {reason}, retry in {self.retry_after}s")
+
+
+def get_redis():
+    """Shared Redis client and registered token bucket script"""
+    global _redis, _token_bucket
+    if time.time() < _redis_down_until:
+        raise redis.ConnectionError('rate governor Redis marked unavailable')
+    if _redis is None:
+        with _redis_lock:
+            if _redis is None:
+                client = redis.Redis.from_url(
+                    settings.RATE_GOVERNOR_REDIS_URL,
+                    socket_timeout=1,
+                    socket_connect_timeout=1,
+                )
+                _token_bucket = client.register_script(TOKEN_BUCKET_SCRIPT)
+                _redis = client
+    return _redis, _token_bucket
+
+
+def _redis_failed(error):
+    """Log a Redis error and skip the governor for REDIS_RETRY_SECONDS"""
+    global _redis_down_until
+    if time.time() >= _redis_down_until:
+        logger.warning(f"Rate governor unavailable, failing open: {str(error)}")
+    _redis_down_until = time.time() + REDIS_RETRY_SECONDS
+
+
+class RateGovernor:
+    """Meters API calls for one account against platform and account buckets"""
+
+    def __init__(self, platform, account_id):
+        self.platform = platform
+        self.account_id = str(account_id)
+        self.limits = settings.RATE_GOVERNOR_BUCKETS[platform]
+        self.platform_key = f"ratelimit:{platform}"
+        self.account_key = f"ratelimit:{platform}:{self.account_id}"
+
+    def acquire(self, cost=1, max_wait=None):
+        """
+        Take cost units from the platform and account buckets
+
+        Sleeps when the budget frees up within max_wait seconds (default
+        RATE_GOVERNOR_MAX_WAIT); otherwise raises RateLimitExceeded.
+        """
+        if max_wait is None:
+            max_wait = settings.RATE_GOVERNOR_MAX_WAIT
+
+        try:
+            client, token_bucket = get_redis()
+
+            blocked_until = max(
+                (float(value) for value in client.mget(
+                    f"{self.platform_key}:blocked", f"{self.account_key}:blocked"
+                ) if value),
+                default=0
+            )
+            if blocked_until > time.time():
+                raise RateLimitExceeded(self.platform, blocked_until - time.time(), 'blocked by platform')
+
+            cost = cost * self._throttle_factor(client)
+
+            keys = [self.platform_key, self.account_key]
+            args = []
+            for scope in ('platform', 'account'):
+                capacity = self.limits[scope]['capacity']
+                args += [capacity, capacity / self.limits[scope]['period']]
+            # A call can never cost more than a full bucket
+            cost = min(cost, *args[0::2])
+
+            while True:
+                wait = float(token_bucket(keys=keys, args=[time.time(), cost, *args]))
+                if wait <= 0:
+                    return
+                if wait > max_wait:
+                    raise RateLimitExceeded(self.platform, wait)
+                time.sleep(wait)
+
+        except redis.RedisError as e:
+            _redis_failed(e)
+
+    def block(self, retry_after, account_only=False):
+        """Stop all calls (or only this account's) for retry_after seconds"""
+        key = self.account_key if account_only else self.platform_key
+        try:
+            client, _ = get_redis()
+            client.set(f"{key}:blocked", time.time() + retry_after, ex=max(int(retry_after), 1))
+        except redis.RedisError as e:
+            _redis_failed(e)
+
+    def observe_headers(self, headers):
+        """
+        Adapt to Graph API usage headers
+
+        X-App-Usage reports app-wide usage percentages; X-Business-Use-Case-Usage
+        reports per-account usage and the minutes until access is regained.
+        """
+        app_usage = self._parse_usage(headers.get('X-App-Usage'))
+        account_usage = 0
+        regain_minutes = 0
+
+        business_usage = headers.get('X-Business-Use-Case-Usage')
+        if business_usage:
+            try:
+                for entries in json.loads(business_usage).values():
+                    for entry in entries:
+                        account_usage = max(account_usage, self._max_percentage(entry))
+                        regain_minutes = max(regain_minutes, entry.get('estimated_time_to_regain_access', 0))
+            except (ValueError, AttributeError):
+                logger.warning(f"Unparseable X-Business-Use-Case-Usage header: {business_usage}")
+
+        if not app_usage and not account_usage:
+            return
+
+        try:
+            client, _ = get_redis()
+            pipe = client.pipeline()
+            pipe.set(f"{self.platform_key}:usage", app_usage, ex=USAGE_TTL_SECONDS)
+            pipe.set(f"{self.account_key}:usage", account_usage, ex=USAGE_TTL_SECONDS)
+            pipe.execute()
+        except redis.RedisError as e:
+            _redis_failed(e)
+
+        if regain_minutes:
+            self.block(regain_minutes * 60, account_only=True)
+        elif app_usage >= 100:
+            self.block(USAGE_TTL_SECONDS)
+        elif account_usage >= 100:
+            self.block(USAGE_TTL_SECONDS, account_only=True)
+
+    def _throttle_factor(self, client):
+        """Cost multiplier from the latest usage readings"""
+        readings = client.mget(f"{self.platform_key}:usage", f"{self.account_key}:usage")
+        usage = max((float(value) for value in readings if value), default=0)
+        if usage <= THROTTLE_START_PERCENT:
+            return 1
+        usage = min(usage, 100)
+        return 1 + (THROTTLE_MAX_FACTOR - 1) * (usage - THROTTLE_START_PERCENT) / (100 - THROTTLE_START_PERCENT)
+
+    @classmethod
+    def _parse_usage(cls, header):
+        """Highest percentage in an X-App-Usage style JSON header"""
+        if not header:
+            return 0
+        try:
+            return cls._max_percentage(json.loads(header))
+        except (ValueError, AttributeError):
+            logger.warning(f"Unparseable usage header: {header}")
+            return 0
+
+    @staticmethod
+    def _max_percentage(usage):
+        """Highest of the call count / CPU / time percentages in a usage entry"""
+        return max(
+            usage.get('call_count', 0),
+            usage.get('total_cputime', 0),
+            usage.get('total_time', 0),
+        )
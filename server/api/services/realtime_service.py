@@ -0,0 +1,125 @@
+# server/api/services/realtime_service.py
+"""
+Real-time push of messages and notifications
+
+Writers publish small JSON events to a per-user Redis pub/sub channel;
+the Server-Sent Events view in api.views.realtime_views holds one
+subscription per open browser tab and forwards them. Nothing is stored:
+a client that is offline when an event is published catches up through
+the regular list endpoints when it reconnects.
+
+Publishing happens after the surrounding transaction commits and never
+raises, so a Redis outage only delays delivery to the next poll/reload.
+"""
+
+import json
+import logging
+import threading
+import time
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# After a Redis error, skip publishing for this long instead of timing out on every write
+REDIS_RETRY_SECONDS = 30
+
+_redis = None
+_redis_lock = threading.Lock()
+_redis_down_until = 0
+
+
+def user_channel(user_id):
+    """Pub/sub channel carrying one user's events"""
+    return f"realtime:user:{user_id}"
+
+
+def encode_event(event, data):
+    return json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder)
+
+
+def get_redis():
+    """Shared Redis client for publishing"""
+    global _redis
+    if time.time() < _redis_down_until:
+        raise redis.ConnectionError('realtime Redis marked unavailable')
+    if _redis is None:
+        with _redis_lock:
+            if _redis is None:
+                _redis = redis.Redis.from_url(
+                    settings.REALTIME['redis_url'],
+                    socket_timeout=1,
+                    socket_connect_timeout=1,
+                )
+    return _redis
+
+
+class RealtimeService:
+    """Publish events to connected clients"""
+
+    @staticmethod
+    def publish(user_id, event, data):
+        """
+        Send event to every open stream of user_id once the current transaction commits
+
+        Args:
+            user_id: recipient User id
+            event: SSE event name, e.g. 'message' or 'notification'
+            data: JSON-serializable payload (UUIDs and datetimes allowed)
+        """
+        payload = encode_event(event, data)
+        transaction.on_commit(lambda: RealtimeService._publish_now([(user_id, payload)]))
+
+    @staticmethod
+    def publish_many(events):
+        """
+        Send several events in one pipelined round trip once the current transaction commits
+
+        Args:
+            events: iterable of (user_id, event, data) as for publish()
+        """
+        payloads = [(user_id, encode_event(event, data)) for user_id, event, data in events]
+        if payloads:
+            transaction.on_commit(lambda: RealtimeService._publish_now(payloads))
+
+    @staticmethod
+    def _publish_now(payloads):
+        global _redis_down_until
+        try:
+            if len(payloads) == 1:
+                user_id, payload = payloads[0]
+                get_redis().publish(user_channel(user_id), payload)
+                return
+            pipeline = get_redis().pipeline(transaction=False)
+            for user_id, payload in payloads:
+                pipeline.publish(user_channel(user_id), payload)
+            pipeline.execute()
+        except redis.RedisError as e:
+            if time.time() >= _redis_down_until:
+                logger.warning(f"Realtime publish failed, clients will catch up on reload: {str(e)}")
+            _redis_down_until = time.time() + REDIS_RETRY_SECONDS
+
+    @staticmethod
+    def publish_message(message):
+        """Push a new Message to its receiver"""
+        from ..serializers import MessageSerializer
+        RealtimeService.publish(message.receiver_id, 'message', MessageSerializer(message).data)
+
+    @staticmethod
+    def publish_notification(notification):
+        """Push a new Notification to its user"""
+        from ..serializers import NotificationSerializer
+        RealtimeService.publish(notification.user_id, 'notification', NotificationSerializer(notification).data)
+
+    @staticmethod
+    def publish_notifications(notifications):
+        """Push several new Notifications, each to its own user"""
+        from ..serializers import NotificationSerializer
+        RealtimeService.publish_many(
+            (notification.user_id, 'notification', data)
+            for notification, data in zip(
+                notifications, NotificationSerializer(notifications, many=True).data
+            )
+        )
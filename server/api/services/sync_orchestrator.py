@@ -0,0 +1,143 @@
+# server/api/services/sync_orchestrator.py
+"""
+Fan-out of per-account sync tasks
+
+Instead of calling .delay() for every account at the top of the hour, the
+orchestrator splits the account list into slots of at most `concurrency`
+accounts, gives every task a jittered countdown inside its slot, and enqueues
+accounts in chunks as Celery groups. Only summary counts are returned so the
+result backend does not hold one entry per account.
+
+`concurrency` limits how many syncs are started per slot, i.e. the start
+rate. It does not cap how many run at once: a slow sync keeps running while
+the next slot starts. That bound comes from worker concurrency on the queue.
+
+Countdowns never exceed CELERY_MAX_COUNTDOWN_SECONDS. The Redis broker keeps
+ETA tasks unacked until they run and redelivers them after its
+visibility_timeout, so longer countdowns would sync accounts twice.
+
+Configured per platform through settings.SYNC_ORCHESTRATION.
+"""
+
+import logging
+import math
+import random
+from celery import group
+from django.conf import settings
+
+from ..models import SocialMediaAccount
+
+logger = logging.getLogger(__name__)
+
+
+class SyncOrchestrator:
+    """Spread sync tasks for every active account of a platform across a window"""
+
+    def __init__(self, platform, task):
+        """
+        Args:
+            platform: SocialMediaAccount.platform value
+            task: Celery task taking the account id as its only argument
+        """
+        config = settings.SYNC_ORCHESTRATION[platform]
+
+        self.platform = platform
+        self.task = task
+        self.window_seconds = config['window_seconds']
+        self.concurrency = max(config['concurrency'], 1)
+        self.chunk_size = max(config['chunk_size'], 1)
+        self.min_slot_seconds = config['min_slot_seconds']
+        self.max_countdown_seconds = settings.CELERY_MAX_COUNTDOWN_SECONDS
+
+    def get_account_ids(self):
+        """Ids of the accounts to sync, in a stable order"""
+        return SocialMediaAccount.objects.filter(
+            platform=self.platform,
+            is_active=True
+        ).order_by('id').values_list('id', flat=True)
+
+    def slot_seconds(self, total):
+        """
+        Length of one slot so that `total` accounts fill the window, at least
+        min_slot_seconds, but never pushing the last start past max_countdown_seconds
+        """
+        slots = max(math.ceil(total / self.concurrency), 1)
+        return min(
+            max(self.window_seconds / slots, self.min_slot_seconds),
+            self.max_countdown_seconds / slots
+        )
+
+    def countdown_for(self, index, slot_seconds):
+        """Jittered start offset for the index-th account"""
+        slot = index // self.concurrency
+        return round(slot * slot_seconds + random.uniform(0, slot_seconds), 1)
+
+    def dispatch(self):
+        """
+        Enqueue a sync task for every active account
+
+        Returns:
+            dict with queued/failed counts, chunks sent and the spread actually used
+        """
+        account_ids = self.get_account_ids()
+        total = account_ids.count()
+
+        if not total:
+            return {'platform': self.platform, 'accounts_total': 0, 'accounts_queued': 0,
+                    'accounts_failed': 0, 'chunks': 0, 'spread_seconds': 0}
+
+        slots = math.ceil(total / self.concurrency)
+        slot_seconds = self.slot_seconds(total)
+        spread_seconds = slots * slot_seconds
+
+        # min_slot_seconds wins over the window when the fleet is too large,
+        # up to the countdown cap, where slots get shorter instead
+        if slots * self.min_slot_seconds > self.window_seconds:
+            logger.warning(
+                f"{self.platform} sync for {total} accounts needs {int(slots * self.min_slot_seconds)}s "
+                f"at concurrency {self.concurrency}, longer than the {self.window_seconds}s window; "
+                f"spreading over {int(spread_seconds)}s"
+            )
+
+        queued = failed = chunks = 0
+        chunk = []
+
+        for index, account_id in enumerate(account_ids.iterator(chunk_size=self.chunk_size)):
+            chunk.append(
+                self.task.si(str(account_id)).set(countdown=self.countdown_for(index, slot_seconds))
+            )
+            if len(chunk) >= self.chunk_size:
+                sent = self._send_chunk(chunk)
+                queued += sent
+                failed += len(chunk) - sent
+                chunks += 1
+                chunk = []
+
+        if chunk:
+            sent = self._send_chunk(chunk)
+            queued += sent
+            failed += len(chunk) - sent
+            chunks += 1
+
+        logger.info(
+            f"✓ Queued {queued} {self.platform} sync tasks in {chunks} chunks "
+            f"over {int(spread_seconds)}s"
+        )
+
+        return {
+            'platform': self.platform,
+            'accounts_total': total,
+            'accounts_queued': queued,
+            'accounts_failed': failed,
+            'chunks': chunks,
+            'spread_seconds': int(spread_seconds),
+        }
+
+    def _send_chunk(self, signatures):
+        """Enqueue one chunk as a group; returns the number of tasks sent"""
+        try:
+            group(signatures).apply_async()
+            return len(signatures)
+        except Exception as e:
+            logger.error(f"Failed to queue {len(signatures)} {self.platform} sync tasks: {e}")
+            return 0
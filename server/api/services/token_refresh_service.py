@@ -0,0 +1,228 @@
+# server/api/services/token_refresh_service.py
+"""
+Proactive OAuth token refresh
+
+A beat task finds accounts whose token_expires_at falls inside the
+platform's lookahead window (an indexed range scan) and enqueues them in
+batches with a jittered countdown. Each batch refreshes its tokens on a
+small thread pool and writes them back with one bulk_update, so sync tasks
+find a valid token instead of doing the OAuth round trip themselves.
+
+Only a revoked grant deactivates an account; transient failures are left
+for the next scan. A token that cannot be decrypted fails only its own
+account and is recorded in its SyncLog history.
+
+Platforms with TOKEN_REFRESH[platform]['proactive'] off are not scanned:
+YouTube access tokens last an hour, so refreshing them ahead of time would
+cost a token round trip per account per hour whether or not it syncs.
+YouTubeService refreshes them when a sync finds them expired instead.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, timezone as dt_timezone
+from cryptography.fernet import InvalidToken
+from django.conf import settings
+from django.utils import timezone
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+from ..models import SocialMediaAccount, SyncLog
+from ..utils import crypto
+from .instagram_service import get_http_session
+
+logger = logging.getLogger(__name__)
+
+# Graph API error code for an expired or revoked access token
+GRAPH_INVALID_TOKEN_CODE = 190
+
+
+class TokenRevoked(Exception):
+    """The platform rejected the grant; the account must be reconnected"""
+
+
+class TokenUnreadable(Exception):
+    """The stored token is corrupt or was encrypted with a key that is no longer configured"""
+
+
+class TokenRefreshService:
+    """Refresh access tokens ahead of expiry, in batches"""
+
+    def __init__(self, platform):
+        config = settings.TOKEN_REFRESH[platform]
+
+        self.platform = platform
+        self.proactive = config.get('proactive', True)
+        self.lookahead = timedelta(minutes=config['lookahead_minutes'])
+        self.batch_size = max(config['batch_size'], 1)
+        self.concurrency = max(config['concurrency'], 1)
+
+    def due_account_ids(self, now=None):
+        """Ids of active accounts whose token expires within the lookahead window"""
+        now = now or timezone.now()
+        return SocialMediaAccount.objects.filter(
+            platform=self.platform,
+            is_active=True,
+            token_expires_at__lte=now + self.lookahead
+        ).order_by('token_expires_at').values_list('id', flat=True)
+
+    def refresh_batch(self, account_ids):
+        """
+        Refresh tokens for account_ids and write them back in one bulk_update
+
+        Returns:
+            dict with refreshed / revoked / failed counts
+        """
+        accounts = list(
+            SocialMediaAccount.objects.filter(id__in=account_ids, platform=self.platform, is_active=True)
+        )
+        if not accounts:
+            return {'refreshed': 0, 'revoked': 0, 'failed': 0}
+
+        refresh = self._refresh_youtube if self.platform == 'youtube' else self._refresh_instagram
+
+        def attempt(account):
+            # Decrypted per account so one unreadable token fails only its own account
+            try:
+                tokens = crypto.decrypt_tokens([account.access_token, account.refresh_token])
+            except InvalidToken:
+                return account, None, TokenUnreadable('stored token cannot be decrypted with any configured key')
+            try:
+                return account, refresh(*tokens), None
+            except Exception as e:
+                return account, None, e
+
+        workers = min(self.concurrency, len(accounts))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(attempt, accounts))
+
+        now = timezone.now()
+        changed = []
+        unreadable = []
+        revoked = failed = 0
+
+        for account, result, error in results:
+            if isinstance(error, TokenUnreadable):
+                logger.error(f"{self.platform} token refresh skipped for {account.username}: {error}")
+                unreadable.append((account, error))
+                failed += 1
+                continue
+            elif isinstance(error, TokenRevoked):
+                logger.error(f"{self.platform} token revoked for {account.username}, deactivating: {error}")
+                account.is_active = False
+                revoked += 1
+            elif error is not None:
+                logger.warning(f"{self.platform} token refresh failed for {account.username}: {error}")
+                failed += 1
+                continue
+            else:
+                access_token, refresh_token, expires_at = result
+                account.access_token = crypto.encrypt_token(access_token)
+                if refresh_token:
+                    account.refresh_token = crypto.encrypt_token(refresh_token)
+                account.token_expires_at = expires_at
+
+            # bulk_update skips auto_now, so stamp it here
+            account.updated_at = now
+            changed.append(account)
+
+        SocialMediaAccount.objects.bulk_update(
+            changed,
+            ['access_token', 'refresh_token', 'token_expires_at', 'is_active', 'updated_at']
+        )
+
+        self._record_unreadable(unreadable, now)
+
+        refreshed = len(changed) - revoked
+        logger.info(
+            f"Refreshed {refreshed} {self.platform} tokens ({revoked} revoked, {failed} failed)"
+        )
+        return {'refreshed': refreshed, 'revoked': revoked, 'failed': failed}
+
+    @staticmethod
+    def _record_unreadable(failures, now):
+        """
+        Log unreadable tokens in the accounts' sync history, once a day per account
+        The scan keeps finding them, so they would otherwise be logged every run
+        """
+        if not failures:
+            return
+        recently_logged = set(
+            SyncLog.objects.filter(
+                account_id__in=[account.id for account, _ in failures],
+                sync_type='token_refresh',
+                status='failed',
+                started_at__gte=now - timedelta(days=1)
+            ).values_list('account_id', flat=True)
+        )
+        SyncLog.objects.bulk_create([
+            SyncLog(
+                account=account,
+                sync_type='token_refresh',
+                status='failed',
+                error_message=str(error),
+                started_at=now,
+                completed_at=now
+            )
+            for account, error in failures
+            if account.id not in recently_logged
+        ])
+
+    @staticmethod
+    def is_revoked_grant(error):
+        """Whether a google-auth RefreshError means the grant is gone (invalid_grant)"""
+        if not isinstance(error, RefreshError):
+            return False
+        if len(error.args) > 1 and isinstance(error.args[1], dict):
+            return error.args[1].get('error') == 'invalid_grant'
+        return 'invalid_grant' in str(error)
+
+    def _refresh_youtube(self, access_token, refresh_token):
+        """New (access token, refresh token, expiry) from Google's token endpoint"""
+        if not refresh_token:
+            raise TokenRevoked('no refresh token stored')
+
+        creds = Credentials(
+            token=access_token,
+            refresh_token=refresh_token,
+            token_uri="https://oauth2.googleapis.com/token",
+            client_id=settings.GOOGLE_CLIENT_ID,
+            client_secret=settings.GOOGLE_CLIENT_SECRET
+        )
+        try:
+            creds.refresh(Request())
+        except RefreshError as e:
+            if self.is_revoked_grant(e):
+                raise TokenRevoked(str(e))
+            raise
+
+        # google-auth returns a naive UTC expiry
+        expires_at = timezone.make_aware(creds.expiry, dt_timezone.utc) if creds.expiry else None
+        return creds.token, creds.refresh_token, expires_at
+
+    def _refresh_instagram(self, access_token, refresh_token):
+        """Exchange the long-lived token for a fresh one"""
+        response = get_http_session().get(
+            "https://graph.facebook.com/v18.0/oauth/access_token",
+            params={
+                'grant_type': 'fb_exchange_token',
+                'client_id': settings.INSTAGRAM_CLIENT_ID,
+                'client_secret': settings.INSTAGRAM_CLIENT_SECRET,
+                'fb_exchange_token': access_token
+            }
+        )
+
+        if response.status_code in (400, 401):
+            try:
+                error_code = response.json().get('error', {}).get('code')
+            except ValueError:
+                error_code = None
+            if error_code == GRAPH_INVALID_TOKEN_CODE:
+                raise TokenRevoked(response.text)
+
+        response.raise_for_status()
+        data = response.json()
+
+        expires_at = timezone.now() + timedelta(seconds=data.get('expires_in', 5184000))
+        return data['access_token'], None, expires_at
@@ -0,0 +1,138 @@
+# server/api/services/unread_counter_service.py
+"""
+Per-user unread counters for notifications and messages
+
+Badges read one cache key instead of counting rows. Writers move a counter
+with an atomic INCR/DECR once their transaction commits, by exactly the
+number of rows whose read state they changed; a key that is not cached is
+left alone and rebuilt from one COUNT on the next read. Paths that change
+read state in ways that are not counted (edits, deletes) just drop the key.
+Keys expire after CACHE_TIMEOUTS['unread_counts'], which bounds any drift
+from a write racing a rebuild.
+"""
+
+import logging
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ..models import Message, Notification
+
+logger = logging.getLogger(__name__)
+
+# kind -> (model, field holding the user the row is unread for)
+COUNTERS = {
+    'notifications': (Notification, 'user'),
+    'messages': (Message, 'receiver'),
+}
+
+# Newest notification ids kept per user for the inbox summary
+LATEST_IDS_CACHED = 20
+
+
+class UnreadCounterService:
+    """Cached unread counts, kept in step with writes"""
+
+    @staticmethod
+    def cache_key(kind, user_id):
+        return f"unread:{kind}:{user_id}"
+
+    @staticmethod
+    def latest_ids_cache_key(user_id):
+        return f"notifications:latest:{user_id}"
+
+    @staticmethod
+    def _count(kind, user_id):
+        model, field = COUNTERS[kind]
+        count = model.objects.filter(**{f'{field}_id': user_id, 'read': False}).count()
+        cache.set(
+            UnreadCounterService.cache_key(kind, user_id), count,
+            timeout=settings.CACHE_TIMEOUTS['unread_counts']
+        )
+        return count
+
+    @staticmethod
+    def get_counts(user_id):
+        """{kind: unread count} for every counter, from one cache read when warm"""
+        keys = {kind: UnreadCounterService.cache_key(kind, user_id) for kind in COUNTERS}
+        cached = cache.get_many(keys.values())
+        counts = {}
+        for kind, key in keys.items():
+            count = cached.get(key)
+            # A decrement that raced a rebuild can leave the counter below zero
+            if count is None or count < 0:
+                count = UnreadCounterService._count(kind, user_id)
+            counts[kind] = count
+        return counts
+
+    @staticmethod
+    def get_count(kind, user_id):
+        return UnreadCounterService.get_counts(user_id)[kind]
+
+    @staticmethod
+    def adjust(kind, user_ids, delta):
+        """
+        Move counters by delta once the current transaction commits
+
+        Args:
+            kind: 'notifications' or 'messages'
+            user_ids: one user id, or an iterable (a user listed twice moves twice)
+            delta: rows that became unread (positive) or read (negative) per listing
+        """
+        if not delta:
+            return
+        if not isinstance(user_ids, (list, tuple, set)):
+            user_ids = [user_ids]
+        steps = Counter(str(user_id) for user_id in user_ids)
+        if not steps:
+            return
+
+        def apply():
+            for user_id, times in steps.items():
+                key = UnreadCounterService.cache_key(kind, user_id)
+                try:
+                    if delta > 0:
+                        cache.incr(key, delta * times)
+                    else:
+                        cache.decr(key, -delta * times)
+                except ValueError:
+                    pass  # Not cached; rebuilt from the database on the next read
+
+        transaction.on_commit(apply)
+
+    @staticmethod
+    def invalidate(kind, user_ids):
+        """Drop counters after a change that was not counted; the next read rebuilds them"""
+        if not isinstance(user_ids, (list, tuple, set)):
+            user_ids = [user_ids]
+        keys = [UnreadCounterService.cache_key(kind, user_id) for user_id in user_ids]
+        if kind == 'notifications':
+            keys += [UnreadCounterService.latest_ids_cache_key(user_id) for user_id in user_ids]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @staticmethod
+    def notifications_created(user_ids):
+        """Count new unread notifications and drop the recipients' cached latest ids"""
+        if not isinstance(user_ids, (list, tuple, set)):
+            user_ids = [user_ids]
+        UnreadCounterService.adjust('notifications', user_ids, 1)
+        keys = [UnreadCounterService.latest_ids_cache_key(user_id) for user_id in set(user_ids)]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @staticmethod
+    def get_latest_notification_ids(user_id, limit):
+        """Ids of a user's newest notifications, newest first (limit <= LATEST_IDS_CACHED)"""
+        key = UnreadCounterService.latest_ids_cache_key(user_id)
+        ids = cache.get(key)
+        if ids is None:
+            ids = [
+                str(notification_id) for notification_id in
+                Notification.objects.filter(user_id=user_id)
+                .order_by('-created_at')
+                .values_list('id', flat=True)[:LATEST_IDS_CACHED]
+            ]
+            cache.set(key, ids, timeout=settings.CACHE_TIMEOUTS['unread_counts'])
+        return ids[:limit]
@@ -0,0 +1,77 @@
+# server/api/services/youtube_client_cache.py
+"""
+Process-level caches for Google API discovery clients
+
+googleapiclient.discovery.build() reads and parses the bundled discovery
+document (~400KB of JSON for YouTube v3) on every call. Here each document is
+parsed once per worker process and clients are built with
+build_from_document; built clients are also kept in a small LRU keyed by
+account and access token, so repeat syncs of the same channel reuse them.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from django.conf import settings
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+
+_clients = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_discovery_document(service_name, version):
+    """
+    Parsed discovery document from the copy bundled with google-api-python-client
+
+    The same dict is shared by every client built from it; the library's
+    in-place fix-ups of method descriptions are idempotent.
+    """
+    document = discovery_cache.get_static_doc(service_name, version)
+    if document is None:
+        return None
+    return json.loads(document)
+
+
+def build_client(service_name, version, credentials, cache_key=None):
+    """
+    Build (or reuse) an API client for credentials
+
+    Args:
+        service_name, version: e.g. 'youtube', 'v3'
+        credentials: google.oauth2 Credentials
+        cache_key: hashable identifying the credentials (e.g. account id and
+            access token); when given, the built client is reused for later
+            calls with the same key
+    """
+    key = (service_name, version, cache_key)
+    if cache_key is not None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is not None:
+                _clients.move_to_end(key)
+                return client
+
+    document = get_discovery_document(service_name, version)
+    if document is None:
+        # Not bundled with the library; fall back to fetching it
+        client = build(service_name, version, credentials=credentials)
+    else:
+        client = build_from_document(document, credentials=credentials)
+
+    if cache_key is not None:
+        with _clients_lock:
+            _clients[key] = client
+            _clients.move_to_end(key)
+            while len(_clients) > settings.YOUTUBE_CLIENT_CACHE_SIZE:
+                _clients.popitem(last=False)
+
+    return client
+
+
+def clear_client_cache():
+    """Drop all cached clients (discovery documents stay parsed)"""
+    with _clients_lock:
+        _clients.clear()
@@ -1,15 +1,21 @@
 # server/api/services/youtube_service.py
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
 from django.utils import timezone
 from django.conf import settings
-from googleapiclient.discovery import build
+from django.db import transaction
+from googleapiclient.errors import HttpError
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 import json
 import requests
 
-from ..models import SocialMediaAccount, RealTimeMetrics, PostMetrics, SyncLog
+from ..models import SocialMediaAccount, RealTimeMetrics, LatestAccountMetrics, PostMetrics, SyncLog
+from .incremental_sync_service import IncrementalSyncService
+from .youtube_client_cache import build_client
+from .token_refresh_service import TokenRefreshService
+from .rate_governor import RateGovernor, RateLimitExceeded, YOUTUBE_QUOTA_COSTS
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +24,10 @@ class YouTubeService:
     
     def __init__(self, social_account):
         self.account = social_account
-        self.access_token = self.account.decrypt_token(social_account.access_token)
-        self.refresh_token = self.account.decrypt_token(social_account.refresh_token) if social_account.refresh_token else None
+        self.access_token, self.refresh_token = SocialMediaAccount.decrypt_tokens_bulk(
+            [social_account]
+        )[social_account.id]
+        self.governor = RateGovernor('youtube', social_account.id)
         self.service = self._build_service()
     
     def _build_service(self):
@@ -32,10 +40,15 @@ class YouTubeService:
                 client_id=settings.GOOGLE_CLIENT_ID,
                 client_secret=settings.GOOGLE_CLIENT_SECRET,
                 scopes=['https://www.googleapis.com/auth/youtube.readonly',
-                       'https://www.googleapis.com/auth/yt-analytics.readonly']
+                       'https://www.googleapis.com/auth/yt-analytics.readonly'],
+                # google-auth compares a naive UTC expiry; without it expired is never true
+                expiry=(
+                    self.account.token_expires_at.astimezone(dt_timezone.utc).replace(tzinfo=None)
+                    if self.account.token_expires_at else None
+                )
             )
             
-            # Refresh token if needed
+            # Access tokens are refreshed here, when a sync needs one
             if creds.expired and creds.refresh_token:
                 creds.refresh(Request())
                 
@@ -43,17 +56,56 @@ class YouTubeService:
                 self.account.access_token = self.account.encrypt_token(creds.token)
                 if creds.refresh_token:
                     self.account.refresh_token = self.account.encrypt_token(creds.refresh_token)
-                self.account.token_expires_at = creds.expiry
+                self.account.token_expires_at = timezone.make_aware(creds.expiry, dt_timezone.utc)
                 self.account.save()
             
-            return build('youtube', 'v3', credentials=creds)
+            self.credentials = creds
+            
+            # Reuses the parsed discovery document and, for the same token, the built client
+            return build_client('youtube', 'v3', creds, cache_key=self._client_cache_key())
             
         except Exception as e:
             logger.error(f"Failed to build YouTube service for {self.account.username}: {str(e)}")
-            self.account.is_active = False
-            self.account.save()
+            # Only a revoked grant needs the user to reconnect; other failures are retried
+            if TokenRefreshService.is_revoked_grant(e):
+                self.account.is_active = False
+                self.account.save()
             raise e
     
+    def _client_cache_key(self):
+        """Cached clients are per account and per access token"""
+        return (str(self.account.id), self.credentials.token)
+    
+    def _execute(self, request, method):
+        """
+        Execute an API request once its quota cost is available
+        
+        Quota and rate-limit errors from the API are turned into
+        RateLimitExceeded (and block further calls) so callers reschedule
+        instead of retrying blindly.
+        """
+        self.governor.acquire(YOUTUBE_QUOTA_COSTS.get(method, 1))
+        
+        try:
+            return request.execute()
+        except HttpError as e:
+            details = e.error_details if isinstance(e.error_details, list) else []
+            reasons = {detail.get('reason') for detail in details if isinstance(detail, dict)}
+            
+            if 'quotaExceeded' in reasons or 'dailyLimitExceeded' in reasons:
+                # Daily quota resets at midnight Pacific time
+                pacific_now = datetime.now(ZoneInfo('America/Los_Angeles'))
+                reset = (pacific_now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+                retry_after = (reset - pacific_now).total_seconds()
+                self.governor.block(retry_after)
+                raise RateLimitExceeded('youtube', retry_after, 'daily quota exceeded')
+            
+            if e.resp.status == 429 or reasons & {'rateLimitExceeded', 'userRateLimitExceeded'}:
+                self.governor.block(60, account_only=True)
+                raise RateLimitExceeded('youtube', 60, 'rate limit exceeded')
+            
+            raise
+    
     def sync_channel_metrics(self):
         """Sync YouTube channel statistics"""
         sync_log = SyncLog.objects.create(
@@ -68,7 +120,7 @@ class YouTubeService:
                 part='statistics,snippet,brandingSettings',
                 mine=True
             )
-            response = request.execute()
+            response = self._execute(request, 'channels.list')
             
             if not response['items']:
                 raise ValueError("No channel found for authenticated user")
@@ -83,37 +135,41 @@ class YouTubeService:
             # Calculate engagement rate from recent videos
             engagement_rate = self._calculate_channel_engagement_rate()
             
-            metrics, created = RealTimeMetrics.objects.update_or_create(
-                account=self.account,
-                date=timezone.now().date(),
-                defaults={
-                    'followers_count': int(stats.get('subscriberCount', 0)),
-                    'posts_count': int(stats.get('videoCount', 0)),
-                    'reach': int(stats.get('viewCount', 0)),  # Total views as reach
-                    'impressions': analytics_data.get('impressions', 0),
-                    'engagement_rate': engagement_rate,
-                    'profile_views': analytics_data.get('channel_views', 0),
-                    'website_clicks': analytics_data.get('annotation_clicks', 0),
-                }
-            )
-            
-            # Calculate daily growth
-            if not created:
-                yesterday_metrics = RealTimeMetrics.objects.filter(
+            # Metrics row and latest-metrics snapshot are written together
+            with transaction.atomic():
+                metrics, created = RealTimeMetrics.objects.update_or_create(
                     account=self.account,
-                    date=timezone.now().date() - timedelta(days=1)
-                ).first()
+                    date=timezone.now().date(),
+                    defaults={
+                        'followers_count': int(stats.get('subscriberCount', 0)),
+                        'posts_count': int(stats.get('videoCount', 0)),
+                        'reach': int(stats.get('viewCount', 0)),  # Total views as reach
+                        'impressions': analytics_data.get('impressions', 0),
+                        'engagement_rate': engagement_rate,
+                        'profile_views': analytics_data.get('channel_views', 0),
+                        'website_clicks': analytics_data.get('annotation_clicks', 0),
+                    }
+                )
+                
+                # Calculate daily growth
+                if not created:
+                    yesterday_metrics = RealTimeMetrics.objects.filter(
+                        account=self.account,
+                        date=timezone.now().date() - timedelta(days=1)
+                    ).first()
+                
+                    if yesterday_metrics:
+                        daily_growth = metrics.followers_count - yesterday_metrics.followers_count
+                        metrics.daily_growth = daily_growth
+                        metrics.save()
+                
+                LatestAccountMetrics.update_from_metrics(metrics)
+                
+                # Update account info
+                self.account.username = snippet.get('title', self.account.username)
+                self.account.last_sync = timezone.now()
+                self.account.save()
                 
-                if yesterday_metrics:
-                    daily_growth = metrics.followers_count - yesterday_metrics.followers_count
-                    metrics.daily_growth = daily_growth
-                    metrics.save()
-            
-            # Update account info
-            self.account.username = snippet.get('title', self.account.username)
-            self.account.last_sync = timezone.now()
-            self.account.save()
-            
             sync_log.status = 'success'
             sync_log.records_processed = 1
             sync_log.completed_at = timezone.now()
@@ -133,8 +189,18 @@ class YouTubeService:
             
             raise e
     
+    # YouTube Data API page size ceiling for playlistItems.list and videos.list
+    MAX_RESULTS_PER_PAGE = 50
+    
     def sync_recent_videos(self, limit=25):
-        """Sync recent video performance"""
+        """
+        Sync recent video performance
+        
+        Pages through the channel's uploads playlist with nextPageToken, so
+        limit can exceed a single page; limit=None backfills the whole channel.
+        PostMetrics are written with one bulk upsert, skipping rows whose
+        counters are unchanged.
+        """
         sync_log = SyncLog.objects.create(
             account=self.account,
             sync_type='posts',
@@ -142,17 +208,9 @@ class YouTubeService:
         )
         
         try:
-            # Get recent videos
-            search_request = self.service.search().list(
-                part='id,snippet',
-                forMine=True,
-                type='video',
-                order='date',
-                maxResults=limit
-            )
-            search_response = search_request.execute()
+            uploads = self._list_recent_uploads(limit)
             
-            if not search_response.get('items'):
+            if not uploads:
                 logger.info(f"No videos found for {self.account.username}")
                 sync_log.status = 'success'
                 sync_log.records_processed = 0
@@ -160,61 +218,21 @@ class YouTubeService:
                 sync_log.save()
                 return
             
-            video_ids = [item['id']['videoId'] for item in search_response['items']]
+            stats_by_id = self._get_video_statistics(list(uploads))
             
-            # Get detailed stats for videos
-            stats_request = self.service.videos().list(
-                part='statistics,snippet',
-                id=','.join(video_ids)
-            )
-            stats_response = stats_request.execute()
+            post_metrics = [
+                self._build_post_metrics(video_id, snippet, stats_by_id[video_id])
+                for video_id, snippet in uploads.items()
+                if video_id in stats_by_id
+            ]
             
-            videos_processed = 0
+            # Only rows whose counters moved are rewritten
+            IncrementalSyncService.save_changed_posts(self.account, post_metrics)
+            IncrementalSyncService.advance_high_water_mark(
+                IncrementalSyncService.get_state(self.account), post_metrics
+            )
             
-            for i, video in enumerate(search_response['items']):
-                video_id = video['id']['videoId']
-                snippet = video['snippet']
-                
-                # Find corresponding stats
-                stats_data = None
-                for stats_video in stats_response['items']:
-                    if stats_video['id'] == video_id:
-                        stats_data = stats_video['statistics']
-                        break
-                
-                if not stats_data:
-                    continue
-                
-                # Parse publish date
-                published_at = datetime.fromisoformat(
-                    snippet['publishedAt'].replace('Z', '+00:00')
-                )
-                
-                # Calculate engagement rate
-                likes = int(stats_data.get('likeCount', 0))
-                comments = int(stats_data.get('commentCount', 0))
-                views = int(stats_data.get('viewCount', 0))
-                
-                engagement_rate = 0
-                if views > 0:
-                    engagement_rate = ((likes + comments) / views) * 100
-                
-                post_metrics, created = PostMetrics.objects.update_or_create(
-                    account=self.account,
-                    post_id=video_id,
-                    defaults={
-                        'caption': snippet['title'],
-                        'media_type': 'video',
-                        'posted_at': published_at,
-                        'likes': likes,
-                        'comments': comments,
-                        'reach': views,
-                        'impressions': views,  # For YouTube, views = impressions
-                        'engagement_rate': engagement_rate,
-                    }
-                )
-                
-                videos_processed += 1
+            videos_processed = len(post_metrics)
             
             sync_log.status = 'success'
             sync_log.records_processed = videos_processed
@@ -234,11 +252,191 @@ class YouTubeService:
             
             raise e
     
+    def sync_recent_videos_incremental(self, initial_limit=25):
+        """
+        Sync only what changed since the last run
+        
+        New videos are found with publishedAfter the account's high-water mark
+        (the first run falls back to the newest initial_limit videos); older
+        videos only have their statistics re-fetched when due under the
+        decaying refresh schedule. Unchanged rows are not rewritten.
+        """
+        sync_log = SyncLog.objects.create(
+            account=self.account,
+            sync_type='posts',
+            status='in_progress'
+        )
+        
+        try:
+            state = IncrementalSyncService.get_state(self.account)
+            
+            if state.last_posted_at:
+                uploads = self._list_recent_uploads(None, published_after=state.last_posted_at)
+                uploads.pop(state.last_post_id, None)
+            else:
+                uploads = self._list_recent_uploads(initial_limit)
+            
+            new_ids = list(uploads)
+            now = timezone.now()
+            due_posts = {
+                post.post_id: post
+                for post in IncrementalSyncService.posts_due_for_refresh(self.account, now=now, state=state)
+                .exclude(post_id__in=new_ids)
+                .only('post_id', 'caption', 'posted_at')
+            }
+            
+            stats_by_id = self._get_video_statistics(new_ids + list(due_posts))
+            
+            new_metrics = [
+                self._build_post_metrics(video_id, snippet, stats_by_id[video_id])
+                for video_id, snippet in uploads.items()
+                if video_id in stats_by_id
+            ]
+            # Due videos keep their stored title and publish date
+            due_metrics = [
+                self._build_post_metrics(
+                    post_id,
+                    {'title': post.caption, 'publishedAt': post.posted_at.isoformat()},
+                    stats_by_id[post_id]
+                )
+                for post_id, post in due_posts.items()
+                if post_id in stats_by_id
+            ]
+            
+            written, unchanged = IncrementalSyncService.save_changed_posts(
+                self.account, new_metrics + due_metrics
+            )
+            IncrementalSyncService.advance_high_water_mark(state, new_metrics)
+            IncrementalSyncService.mark_refreshed(state, now)
+            
+            sync_log.status = 'success'
+            sync_log.records_processed = written
+            sync_log.completed_at = timezone.now()
+            sync_log.save()
+            
+            logger.info(
+                f"Incremental YouTube sync for {self.account.username}: {len(uploads)} new, "
+                f"{len(due_posts)} refreshed, {written} written, {unchanged} unchanged"
+            )
+            
+        except Exception as e:
+            error_msg = f"YouTube videos sync error: {str(e)}"
+            logger.error(f"YouTube videos sync error for {self.account.username}: {error_msg}")
+            
+            sync_log.status = 'failed'
+            sync_log.error_message = error_msg
+            sync_log.completed_at = timezone.now()
+            sync_log.save()
+            
+            raise e
+    
+    def _build_post_metrics(self, video_id, snippet, stats_data):
+        """Unsaved PostMetrics for a video from its snippet and statistics"""
+        # Parse publish date
+        published_at = datetime.fromisoformat(
+            snippet['publishedAt'].replace('Z', '+00:00')
+        )
+        
+        # Calculate engagement rate
+        likes = int(stats_data.get('likeCount', 0))
+        comments = int(stats_data.get('commentCount', 0))
+        views = int(stats_data.get('viewCount', 0))
+        
+        engagement_rate = 0
+        if views > 0:
+            engagement_rate = ((likes + comments) / views) * 100
+        
+        return PostMetrics(
+            account=self.account,
+            post_id=video_id,
+            caption=snippet['title'],
+            media_type='video',
+            posted_at=published_at,
+            likes=likes,
+            comments=comments,
+            reach=views,
+            impressions=views,  # For YouTube, views = impressions
+            engagement_rate=round(engagement_rate, 2),
+        )
+    
+    def _uploads_playlist_id(self):
+        """Id of the channel's uploads playlist"""
+        request = self.service.channels().list(part='contentDetails', mine=True)
+        response = self._execute(request, 'channels.list')
+        if not response.get('items'):
+            raise ValueError("No channel found for authenticated user")
+        return response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+    
+    def _list_recent_uploads(self, limit=25, published_after=None):
+        """
+        Newest uploads first, following nextPageToken until limit is reached
+        
+        Reads the uploads playlist (playlistItems.list, 1 quota unit per page)
+        rather than search.list (100 units per page, capped at ~500 results).
+        published_after keeps only videos published at or after that time;
+        paging stops at the first page holding none.
+        
+        Returns:
+            {video_id: {'title', 'publishedAt'}}, each video once, newest first
+        """
+        uploads = {}
+        playlist_id = self._uploads_playlist_id()
+        page_token = None
+        
+        while limit is None or len(uploads) < limit:
+            page_size = self.MAX_RESULTS_PER_PAGE
+            if limit is not None:
+                page_size = min(page_size, limit - len(uploads))
+            
+            request = self.service.playlistItems().list(
+                part='snippet,contentDetails',
+                playlistId=playlist_id,
+                maxResults=page_size,
+                pageToken=page_token
+            )
+            response = self._execute(request, 'playlistItems.list')
+            
+            page_has_new = False
+            for item in response.get('items', []):
+                video_id = item['contentDetails']['videoId']
+                # snippet.publishedAt is when the video joined the playlist
+                published = item['contentDetails'].get('videoPublishedAt') or item['snippet']['publishedAt']
+                if published_after and datetime.fromisoformat(published.replace('Z', '+00:00')) < published_after:
+                    continue
+                page_has_new = True
+                uploads.setdefault(video_id, {'title': item['snippet']['title'], 'publishedAt': published})
+            
+            page_token = response.get('nextPageToken')
+            if not page_token or (published_after and not page_has_new):
+                break
+        
+        return uploads
+    
+    def _get_video_statistics(self, video_ids):
+        """Fetch statistics for video_ids in chunks of 50, keyed by video id"""
+        stats_by_id = {}
+        
+        for start in range(0, len(video_ids), self.MAX_RESULTS_PER_PAGE):
+            chunk = video_ids[start:start + self.MAX_RESULTS_PER_PAGE]
+            stats_request = self.service.videos().list(
+                part='statistics',
+                id=','.join(chunk),
+                maxResults=len(chunk)
+            )
+            stats_response = self._execute(stats_request, 'videos.list')
+            
+            for stats_video in stats_response.get('items', []):
+                stats_by_id[stats_video['id']] = stats_video['statistics']
+        
+        return stats_by_id
+    
     def _get_channel_analytics(self):
         """Get YouTube Analytics data"""
         try:
-            # Build YouTube Analytics service
-            analytics_service = build('youtubeAnalytics', 'v2', credentials=self.service._http.credentials)
+            # Build YouTube Analytics service from the same credentials
+            analytics_service = build_client(
+                'youtubeAnalytics', 'v2', self.credentials, cache_key=self._client_cache_key()
+            )
             
             # Get analytics for last 28 days
             end_date = timezone.now().date()
@@ -252,7 +450,7 @@ class YouTubeService:
                 dimensions='day'
             )
             
-            response = request.execute()
+            response = self._execute(request, 'reports.query')
             
             analytics_data = {}
             if response.get('rows'):
@@ -283,6 +481,8 @@ class YouTubeService:
             
             return analytics_data
             
+        except RateLimitExceeded:
+            raise  # Defer the sync like every other governed call
         except Exception as e:
             logger.warning(f"Failed to get YouTube Analytics data: {str(e)}")
             return {}
@@ -5,8 +5,14 @@ Handles YouTube sync, metrics aggregation, and scheduled tasks
 """
 
 from celery import shared_task
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
 from django.utils import timezone
 import logging
+import random
+
+from .services.rate_governor import RateLimitExceeded
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +41,10 @@ def sync_youtube_data(self, account_id):
         
         # Sync recent videos
         logger.info(f"Syncing recent videos for {account.username}")
-        service.sync_recent_videos(limit=25)
+        if settings.INCREMENTAL_POST_SYNC:
+            service.sync_recent_videos_incremental(initial_limit=25)
+        else:
+            service.sync_recent_videos(limit=25)
         
         # Sync videos to content posts
         logger.info(f"Syncing videos to content posts for {account.username}")
@@ -44,6 +53,7 @@ def sync_youtube_data(self, account_id):
         # Update last sync time
         account.last_sync = timezone.now()
         account.save()
+        MetricsAggregationService.invalidate_client_stats(account.client_id)
         
         logger.info(f"✓ YouTube sync completed successfully for {account.username}")
         
@@ -58,6 +68,15 @@ def sync_youtube_data(self, account_id):
         logger.error(f"Account {account_id} not found")
         return {'success': False, 'error': 'Account not found'}
         
+    except RateLimitExceeded as e:
+        # Reschedule for when the quota/rate budget frees up, unless that is
+        # far off; the next scheduled sync run picks the account up then
+        if e.retry_after <= settings.SYNC_RATE_LIMIT_RETRY_MAX_SECONDS:
+            logger.warning(f"YouTube sync for {account_id} deferred: {str(e)}")
+            raise self.retry(exc=e, countdown=e.retry_after)
+        logger.warning(f"YouTube sync for {account_id} skipped until the next run: {str(e)}")
+        return {'success': False, 'account_id': str(account_id), 'error': str(e), 'deferred': True}
+        
     except Exception as e:
         logger.error(f"YouTube sync failed for {account_id}: {str(e)}", exc_info=True)
         
@@ -79,19 +98,43 @@ def sync_instagram_data(self, account_id):
         
         service = InstagramService(account)
         
-        # Sync profile metrics
-        service.sync_profile_metrics()
-        
-        # Sync recent posts
-        service.sync_recent_posts(limit=25)
+        if settings.INSTAGRAM_EXPANDED_FETCH:
+            # Profile, insights and posts in one field-expanded request
+            service.sync_account_expanded(limit=25, incremental=settings.INCREMENTAL_POST_SYNC)
+        else:
+            # Sync profile metrics
+            service.sync_profile_metrics()
+            
+            # Sync recent posts
+            if settings.INCREMENTAL_POST_SYNC:
+                service.sync_posts_incremental(initial_limit=25)
+            else:
+                service.sync_recent_posts(limit=25)
         
         # Update last sync
         account.last_sync = timezone.now()
         account.save()
+        MetricsAggregationService.invalidate_client_stats(account.client_id)
         
-        logger.info(f"✓ Instagram sync completed for {account.username}")
+        logger.info(
+            f"✓ Instagram sync completed for {account.username} "
+            f"({service.request_count} API requests)"
+        )
         
-        return {'success': True, 'account_id': str(account_id)}
+        return {
+            'success': True,
+            'account_id': str(account_id),
+            'request_count': service.request_count
+        }
+        
+    except RateLimitExceeded as e:
+        # Reschedule for when the Graph API budget frees up, unless that is
+        # far off; the next scheduled sync run picks the account up then
+        if e.retry_after <= settings.SYNC_RATE_LIMIT_RETRY_MAX_SECONDS:
+            logger.warning(f"Instagram sync for {account_id} deferred: {str(e)}")
+            raise self.retry(exc=e, countdown=e.retry_after)
+        logger.warning(f"Instagram sync for {account_id} skipped until the next run: {str(e)}")
+        return {'success': False, 'account_id': str(account_id), 'error': str(e), 'deferred': True}
         
     except Exception as e:
         logger.error(f"Instagram sync failed: {str(e)}")
@@ -99,10 +142,13 @@ def sync_instagram_data(self, account_id):
 
 
 @shared_task
-def aggregate_monthly_performance():
+def aggregate_monthly_performance(batch=True):
     """
     Aggregate daily metrics into monthly performance data
     Run this at the end of each month or daily to keep data fresh
+    
+    batch=True aggregates every client in a few set-based queries and reports
+    per-phase timings; batch=False falls back to the per-client loop.
     """
     try:
         from .models import Client
@@ -110,6 +156,18 @@ def aggregate_monthly_performance():
         
         logger.info("Starting monthly performance aggregation for all clients")
         
+        if batch:
+            summary = MetricsAggregationService.aggregate_all_clients_batch()
+            
+            logger.info(f"✓ Aggregated performance data for {summary['clients_processed']} clients")
+            
+            return {
+                'success': True,
+                'clients_processed': summary['clients_processed'],
+                'timings': summary['timings'],
+                'timestamp': timezone.now().isoformat()
+            }
+        
         results = MetricsAggregationService.aggregate_all_clients_current_month()
         
         logger.info(f"✓ Aggregated performance data for {len(results)} clients")
@@ -129,74 +187,408 @@ def aggregate_monthly_performance():
 def sync_all_youtube_accounts():
     """
     Sync all active YouTube accounts
-    Run this on a schedule (e.g., every 6 hours)
+    Run this on a schedule (e.g., every 6 hours); tasks are spread across
+    the sync window by SyncOrchestrator
     """
     try:
-        from .models import SocialMediaAccount
+        from .services.sync_orchestrator import SyncOrchestrator
         
-        youtube_accounts = SocialMediaAccount.objects.filter(
-            platform='youtube',
-            is_active=True
-        )
+        summary = SyncOrchestrator('youtube', sync_youtube_data).dispatch()
+        
+        return {'success': True, **summary}
+        
+    except Exception as e:
+        logger.error(f"Batch YouTube sync failed: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+@shared_task
+def sync_all_instagram_accounts():
+    """
+    Sync all active Instagram accounts
+    Spread across the sync window by SyncOrchestrator
+    """
+    try:
+        from .services.sync_orchestrator import SyncOrchestrator
+        
+        summary = SyncOrchestrator('instagram', sync_instagram_data).dispatch()
+        
+        return {'success': True, **summary}
+        
+    except Exception as e:
+        logger.error(f"Batch Instagram sync failed: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+# Platforms with a per-account sync task, keyed to their FEATURES flag
+SYNC_PLATFORMS = {
+    'youtube': 'ENABLE_YOUTUBE',
+    'instagram': 'ENABLE_INSTAGRAM',
+}
+
+
+@shared_task
+def sync_all_client_data(platforms=None):
+    """
+    Sync every active account on every enabled platform, or only on `platforms`
+    Beat runs it per platform at that platform's cadence; each platform is
+    fanned out by SyncOrchestrator
+    """
+    from .services.sync_orchestrator import SyncOrchestrator
+    
+    sync_tasks = {
+        'youtube': sync_youtube_data,
+        'instagram': sync_instagram_data,
+    }
+    
+    summaries = {}
+    for platform, feature_flag in SYNC_PLATFORMS.items():
+        if platforms is not None and platform not in platforms:
+            continue
+        if not settings.FEATURES.get(feature_flag, False):
+            continue
+        
+        try:
+            summaries[platform] = SyncOrchestrator(platform, sync_tasks[platform]).dispatch()
+        except Exception as e:
+            logger.error(f"Failed to dispatch {platform} sync: {str(e)}")
+            summaries[platform] = {'error': str(e)}
+    
+    return {
+        'success': not any('error' in summary for summary in summaries.values()),
+        'accounts_queued': sum(summary.get('accounts_queued', 0) for summary in summaries.values()),
+        'platforms': summaries
+    }
+
+
+@shared_task
+def refresh_expiring_tokens():
+    """
+    Queue token refresh batches for accounts whose tokens expire soon
+    Run every 15 minutes; batches start at jittered offsets
+    """
+    from .services.token_refresh_service import TokenRefreshService
+    
+    summary = {}
+    for platform, feature_flag in SYNC_PLATFORMS.items():
+        if not settings.FEATURES.get(feature_flag, False):
+            continue
+        
+        service = TokenRefreshService(platform)
+        if not service.proactive:
+            continue
+        batch = []
+        batches = 0
+        for account_id in service.due_account_ids().iterator():
+            batch.append(str(account_id))
+            if len(batch) >= service.batch_size:
+                refresh_token_batch.apply_async(
+                    args=[platform, batch],
+                    countdown=random.uniform(0, settings.TOKEN_REFRESH_JITTER_SECONDS)
+                )
+                batches += 1
+                batch = []
+        if batch:
+            refresh_token_batch.apply_async(
+                args=[platform, batch],
+                countdown=random.uniform(0, settings.TOKEN_REFRESH_JITTER_SECONDS)
+            )
+            batches += 1
+        
+        summary[platform] = batches
+    
+    logger.info(f"Queued token refresh batches: {summary}")
+    return {'success': True, 'batches_queued': summary}
+
+
+@shared_task
+def refresh_token_batch(platform, account_ids):
+    """Refresh one batch of tokens and write them back together"""
+    from .services.token_refresh_service import TokenRefreshService
+    
+    try:
+        return {'success': True, **TokenRefreshService(platform).refresh_batch(account_ids)}
+    except Exception as e:
+        logger.error(f"Token refresh batch failed for {platform}: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+def _delete_in_batches(queryset, batch_size):
+    """
+    Delete rows matching queryset a batch of primary keys at a time
+    Each DELETE is its own short statement, so locks are never held for long
+    """
+    model = queryset.model
+    deleted = 0
+    
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        
+        count, _ = model.objects.filter(pk__in=pks).delete()
+        deleted += count
+
+
+@shared_task
+def cleanup_old_metrics(batch_size=5000):
+    """
+    Delete RealTimeMetrics and SyncLog rows older than DATA_RETENTION_DAYS
+    Run weekly; LatestAccountMetrics keeps the current numbers for accounts
+    whose history is pruned. When RealTimeMetrics is partitioned, whole
+    expired months are dropped first and only the boundary month is DELETEd
+    """
+    try:
+        from .models import RealTimeMetrics, SyncLog
+        from .services.metrics_partition_service import MetricsPartitionService
         
-        logger.info(f"Syncing {youtube_accounts.count()} YouTube accounts")
+        today = timezone.now().date()
+        retention = settings.DATA_RETENTION_DAYS
+        metrics_cutoff = today - timedelta(days=retention['metrics'])
         
-        results = []
-        for account in youtube_accounts:
-            try:
-                task = sync_youtube_data.delay(str(account.id))
-                results.append({
-                    'account_id': str(account.id),
-                    'username': account.username,
-                    'task_id': task.id
-                })
-            except Exception as e:
-                logger.error(f"Failed to queue sync for {account.username}: {e}")
+        partitions_retired = MetricsPartitionService().retire_expired_partitions(metrics_cutoff)
         
-        logger.info(f"✓ Queued {len(results)} YouTube sync tasks")
+        metrics_deleted = _delete_in_batches(
+            RealTimeMetrics.objects.filter(date__lt=metrics_cutoff),
+            batch_size
+        )
+        
+        sync_logs_deleted = _delete_in_batches(
+            SyncLog.objects.filter(
+                started_at__lt=timezone.now() - timedelta(days=retention['sync_logs'])
+            ),
+            batch_size
+        )
+        
+        logger.info(
+            f"✓ Cleanup removed {metrics_deleted} metrics rows, {len(partitions_retired)} "
+            f"metrics partitions and {sync_logs_deleted} sync logs"
+        )
         
         return {
             'success': True,
-            'accounts_queued': len(results),
-            'results': results
+            'metrics_deleted': metrics_deleted,
+            'metrics_partitions_retired': partitions_retired,
+            'sync_logs_deleted': sync_logs_deleted
         }
         
     except Exception as e:
-        logger.error(f"Batch YouTube sync failed: {str(e)}")
+        logger.error(f"Metrics cleanup failed: {str(e)}")
         return {'success': False, 'error': str(e)}
 
 
 @shared_task
-def sync_all_instagram_accounts():
-    """Sync all active Instagram accounts"""
+def archive_old_notifications():
+    """
+    Move read notifications older than DATA_RETENTION_DAYS['read_notifications']
+    to NotificationArchive (or just delete them), a batch at a time
+    Each batch is its own short transaction; a run stops after max_batches
+    and the next run carries on. Unread notifications are never touched
+    """
+    from django.db import transaction
+    from .models import Notification, NotificationArchive
+    
+    archiving = settings.NOTIFICATION_ARCHIVING
+    cutoff = timezone.now() - timedelta(days=settings.DATA_RETENTION_DAYS['read_notifications'])
+    expired = Notification.objects.filter(read=True, created_at__lt=cutoff).order_by()
+    fields = ['id', 'user_id', 'title', 'message', 'notification_type', 'created_at']
+    moved = 0
+    
     try:
-        from .models import SocialMediaAccount
+        for _ in range(archiving['max_batches']):
+            rows = list(expired.values(*fields)[:archiving['batch_size']])
+            if not rows:
+                break
+            
+            with transaction.atomic():
+                if archiving['archive']:
+                    NotificationArchive.objects.bulk_create(
+                        [NotificationArchive(**row) for row in rows],
+                        ignore_conflicts=True
+                    )
+                Notification.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+            moved += len(rows)
+        
+        logger.info(f"✓ {'Archived' if archiving['archive'] else 'Deleted'} {moved} read notifications")
+        return {'success': True, 'notifications_removed': moved, 'archived': archiving['archive']}
         
-        instagram_accounts = SocialMediaAccount.objects.filter(
-            platform='instagram',
-            is_active=True
+    except Exception as e:
+        logger.error(f"Notification archiving failed: {str(e)}")
+        return {'success': False, 'error': str(e), 'notifications_removed': moved}
+
+
+@shared_task
+def refresh_metrics_rollups():
+    """
+    Refold weekly and monthly MetricsRollup rows touched by recent syncs
+    Run after each sync round; rebuild_metrics_rollups backfills history
+    """
+    from .services.metrics_rollup_service import MetricsRollupService
+    
+    try:
+        written = MetricsRollupService.refresh()
+        return {'success': True, 'rollups_written': written}
+    except Exception as e:
+        logger.error(f"Metrics rollup refresh failed: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+@shared_task
+def maintain_metrics_partitions():
+    """
+    Pre-create RealTimeMetrics partitions for the coming months
+    Run daily; does nothing unless the table has been partitioned
+    """
+    from .services.metrics_partition_service import MetricsPartitionService
+    
+    try:
+        created = MetricsPartitionService().ensure_partitions()
+        return {'success': True, 'partitions_created': created}
+    except Exception as e:
+        logger.error(f"Metrics partition maintenance failed: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+@shared_task(ignore_result=True)
+def build_content_export(job_id):
+    """
+    Build the ZIP archive for a ContentExportJob
+    Queued by ContentPostViewSet.bulk_export; poll export_status for the result
+    """
+    from .models import ContentExportJob
+    from .services.content_export_service import ContentExportService
+    
+    try:
+        job = ContentExportJob.objects.get(id=job_id, status='pending')
+    except ContentExportJob.DoesNotExist:
+        logger.warning(f"Content export {job_id} not found or already started")
+        return {'success': False, 'error': 'Job not found or already started'}
+    
+    job = ContentExportService.build(job)
+    return {
+        'success': job.status == 'completed',
+        'job_id': str(job.id),
+        'posts': job.post_count,
+        'images': job.image_count,
+        'file_size': job.file_size
+    }
+
+
+@shared_task
+def expire_content_exports():
+    """Delete content export archives older than CONTENT_EXPORTS['expire_hours']"""
+    from .services.content_export_service import ContentExportService
+    
+    try:
+        expired = ContentExportService.expire_old_exports()
+        return {'success': True, 'exports_expired': expired}
+    except Exception as e:
+        logger.error(f"Content export expiry failed: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+@shared_task(ignore_result=True)
+def fan_out_notification(title, message, notification_type='general', role=None, user_ids=None):
+    """
+    Write one notification per recipient with a single bulk INSERT
+    Recipients are every user with role, or the given user ids
+    """
+    from django.contrib.auth import get_user_model
+    from .services.notification_service import NotificationService
+    
+    User = get_user_model()
+    recipients = User.objects.filter(role=role) if role else User.objects.filter(id__in=user_ids or [])
+    notifications = NotificationService.create_notifications(recipients, title, message, notification_type)
+    return {'success': True, 'notifications_created': len(notifications)}
+
+
+@shared_task
+def generate_weekly_reports():
+    """
+    Send every active client a weekly performance notification
+    Each figure comes from one grouped query across all clients
+    """
+    try:
+        from django.db.models import Avg, Count, Sum
+        from .models import (
+            Client, LatestAccountMetrics, RealTimeMetrics, PostMetrics,
+            Task, Notification
         )
+        from .services.metrics_aggregation_service import MetricsAggregationService
+        from .services.unread_counter_service import UnreadCounterService
         
-        logger.info(f"Syncing {instagram_accounts.count()} Instagram accounts")
+        now = timezone.now()
+        week_ago = now - timedelta(days=7)
         
-        results = []
-        for account in instagram_accounts:
-            try:
-                task = sync_instagram_data.delay(str(account.id))
-                results.append({
-                    'account_id': str(account.id),
-                    'task_id': task.id
-                })
-            except Exception as e:
-                logger.error(f"Failed to queue Instagram sync: {e}")
+        clients = list(
+            Client.objects.filter(status='active').values('id', 'user_id')
+        )
         
-        return {
-            'success': True,
-            'accounts_queued': len(results)
+        current = {
+            row['account__client_id']: row
+            for row in LatestAccountMetrics.objects.values('account__client_id').annotate(
+                followers=Sum('followers_count'),
+                engagement=Avg('engagement_rate')
+            )
         }
         
+        # Followers a week ago: latest row per account on or before that day
+        previous_followers = defaultdict(int)
+        week_ago_rows = MetricsAggregationService.latest_metrics_per_account(
+            RealTimeMetrics.objects.filter(
+                date__lte=week_ago.date(),
+                date__gt=week_ago.date() - timedelta(days=7)
+            )
+        ).values('account__client_id', 'followers_count')
+        for row in week_ago_rows:
+            previous_followers[row['account__client_id']] += row['followers_count']
+        
+        posts = dict(
+            PostMetrics.objects.filter(posted_at__gte=week_ago)
+            .values('account__client_id')
+            .annotate(count=Count('id'))
+            .values_list('account__client_id', 'count')
+        )
+        
+        tasks_completed = dict(
+            Task.objects.filter(status='completed', completed_at__gte=week_ago)
+            .values('client_id')
+            .annotate(count=Count('id'))
+            .values_list('client_id', 'count')
+        )
+        
+        notifications = []
+        for client in clients:
+            client_id = client['id']
+            stats = current.get(client_id)
+            if not stats:
+                continue
+            
+            followers = stats['followers'] or 0
+            growth = followers - previous_followers[client_id] if client_id in previous_followers else 0
+            engagement = round(stats['engagement'] or 0, 2)
+            
+            message = f"This week you gained {growth} followers (now {followers}) "
+            message += f"with {engagement}% average engagement. "
+            message += f"{posts.get(client_id, 0)} posts published and "
+            message += f"{tasks_completed.get(client_id, 0)} tasks completed."
+            
+            notifications.append(Notification(
+                user_id=client['user_id'],
+                title="Weekly Performance Report 📊",
+                message=message,
+                notification_type='performance_update'
+            ))
+        
+        Notification.objects.bulk_create(notifications, batch_size=500)
+        UnreadCounterService.notifications_created([notification.user_id for notification in notifications])
+        
+        logger.info(f"✓ Generated {len(notifications)} weekly reports")
+        
+        return {'success': True, 'reports_generated': len(notifications)}
+        
     except Exception as e:
-        logger.error(f"Batch Instagram sync failed: {str(e)}")
+        logger.error(f"Weekly report generation failed: {str(e)}")
         return {'success': False, 'error': str(e)}
 
 
@@ -1,3 +1,504 @@
-from django.test import TestCase
+from datetime import timedelta
+import json
+import requests
+import tempfile
+import uuid
+import zipfile
+from io import StringIO
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import (
+    Client, ContentExportJob, ContentPost, Message, Notification, PostMetrics, RealTimeMetrics, SocialMediaAccount, SyncLog, User
+)
+from .services.content_export_service import ContentExportService
+from .services.incremental_sync_service import IncrementalSyncService
+from .services.instagram_service import InstagramService
+from .services.metrics_partition_service import MetricsPartitionService, add_months
+from .services.rate_governor import RateLimitExceeded
+from .services.token_refresh_service import TokenRefreshService
+from .services.youtube_service import YouTubeService
+from .tasks import sync_youtube_data
+from .utils import crypto
+from .utils.pagination import encode_cursor
+from .views.realtime_views import _authenticated_user
+
+
+def make_client(username='client'):
+    user = User.objects.create(username=username, email=f'{username}@example.com', role='client')
+    return Client.objects.create(
+        user=user, name=username, email=f'{username}@example.com', company='Example',
+        start_date=timezone.now().date(), status='active'
+    )
+
+
+OLD_KEY = Fernet.generate_key().decode()
+NEW_KEY = Fernet.generate_key().decode()
+
+
+class TokenEncryptionTests(TestCase):
+    def create_account(self, access_token='ya29.plaintext-access', refresh_token='1//plaintext-refresh'):
+        with override_settings(ENCRYPTION_KEY=OLD_KEY, ENCRYPTION_KEY_FALLBACKS=[]):
+            return SocialMediaAccount.objects.create(
+                client=make_client(), platform='youtube', account_id='UC1', username='channel',
+                access_token=access_token, refresh_token=refresh_token
+            )
+
+    def test_plaintext_is_not_mistaken_for_ciphertext(self):
+        self.assertFalse(crypto.is_encrypted('ya29.plaintext-access'))
+        self.assertFalse(crypto.is_encrypted('IGQVJ' + 'x' * 200))
+        self.assertTrue(crypto.is_encrypted(Fernet(OLD_KEY).encrypt(b'token').decode()))
+
+    def test_save_keeps_ciphertext_from_a_retired_key(self):
+        account = self.create_account()
+        stored = account.access_token
+        with override_settings(ENCRYPTION_KEY=NEW_KEY, ENCRYPTION_KEY_FALLBACKS=[]):
+            account.save()
+            account.refresh_from_db()
+            self.assertEqual(account.access_token, stored)
+            with self.assertRaises(InvalidToken):
+                account.decrypt_token(account.access_token)
+
+    def test_rotation_skips_tokens_under_a_removed_key(self):
+        account = self.create_account()
+        stored = (account.access_token, account.refresh_token)
+
+        # Old key dropped before rotating: the account is reported and left untouched
+        with override_settings(ENCRYPTION_KEY=NEW_KEY, ENCRYPTION_KEY_FALLBACKS=[]):
+            stdout, stderr = StringIO(), StringIO()
+            call_command('rotate_token_encryption', stdout=stdout, stderr=stderr)
+        self.assertIn('Cannot decrypt tokens for channel', stderr.getvalue())
+        self.assertIn('1 accounts could not be decrypted', stdout.getvalue())
+        account.refresh_from_db()
+        self.assertEqual((account.access_token, account.refresh_token), stored)
+
+        # Restoring the key as a fallback recovers and rotates them
+        with override_settings(ENCRYPTION_KEY=NEW_KEY, ENCRYPTION_KEY_FALLBACKS=[OLD_KEY]):
+            call_command('rotate_token_encryption', stdout=StringIO(), stderr=StringIO())
+        account.refresh_from_db()
+        with override_settings(ENCRYPTION_KEY=NEW_KEY, ENCRYPTION_KEY_FALLBACKS=[]):
+            self.assertEqual(account.decrypt_token(account.access_token), 'ya29.plaintext-access')
+            self.assertEqual(account.decrypt_token(account.refresh_token), '1//plaintext-refresh')
+
+
+@override_settings(ENCRYPTION_KEY=OLD_KEY, ENCRYPTION_KEY_FALLBACKS=[])
+class TokenRefreshBatchTests(TestCase):
+    def test_unreadable_token_fails_only_its_own_account(self):
+        client = make_client()
+        accounts = [
+            SocialMediaAccount.objects.create(
+                client=client, platform='instagram', account_id=str(index), username=f'acct{index}',
+                access_token=f'IGQ-token-{index}', token_expires_at=timezone.now() + timedelta(days=1)
+            )
+            for index in range(3)
+        ]
+        # Encrypted under a key that is not configured
+        foreign = Fernet(Fernet.generate_key()).encrypt(b'lost').decode()
+        SocialMediaAccount.objects.filter(id=accounts[1].id).update(access_token=foreign)
+
+        new_expiry = timezone.now() + timedelta(days=60)
+        with mock.patch.object(
+            TokenRefreshService, '_refresh_instagram',
+            side_effect=lambda access, refresh: (access + '-new', None, new_expiry)
+        ):
+            service = TokenRefreshService('instagram')
+            result = service.refresh_batch([account.id for account in accounts])
+            service.refresh_batch([account.id for account in accounts])
+
+        self.assertEqual(result, {'refreshed': 2, 'revoked': 0, 'failed': 1})
+        for account in accounts:
+            account.refresh_from_db()
+        self.assertEqual(accounts[0].decrypt_token(accounts[0].access_token), 'IGQ-token-0-new-new')
+        self.assertEqual(accounts[1].access_token, foreign)
+        self.assertTrue(accounts[1].is_active)
+        # Recorded once however often the scan retries it
+        self.assertEqual(
+            SyncLog.objects.filter(account=accounts[1], sync_type='token_refresh', status='failed').count(), 1
+        )
+
+
+@override_settings(ENCRYPTION_KEY=OLD_KEY, ENCRYPTION_KEY_FALLBACKS=[])
+class IncrementalSyncTests(TestCase):
+    def setUp(self):
+        self.account = SocialMediaAccount.objects.create(
+            client=make_client(), platform='instagram', account_id='1', username='acct', access_token='IGQ-token'
+        )
+        self.now = timezone.now()
+
+    def post(self, post_id, age, likes=0):
+        return PostMetrics(
+            account=self.account, post_id=post_id, media_type='image',
+            posted_at=self.now - age, likes=likes
+        )
+
+    def test_unchanged_posts_are_not_written(self):
+        posts = [self.post('a', timedelta(hours=2)), self.post('b', timedelta(days=3))]
+        self.assertEqual(IncrementalSyncService.save_changed_posts(self.account, posts, now=self.now), (2, 0))
+        first_write = PostMetrics.objects.get(post_id='b').refreshed_at
+
+        later = self.now + timedelta(hours=1)
+        again = [self.post('a', timedelta(hours=2), likes=5), self.post('b', timedelta(days=3))]
+        self.assertEqual(IncrementalSyncService.save_changed_posts(self.account, again, now=later), (1, 1))
+        self.assertEqual(PostMetrics.objects.get(post_id='b').refreshed_at, first_write)
+        self.assertEqual(PostMetrics.objects.get(post_id='a').likes, 5)
+
+    def test_refresh_schedule_is_kept_per_age_band(self):
+        IncrementalSyncService.save_changed_posts(self.account, [
+            self.post('hour', timedelta(hours=2)),
+            self.post('week', timedelta(days=3)),
+            self.post('year', timedelta(days=365)),
+        ], now=self.now)
+        state = IncrementalSyncService.get_state(self.account)
+
+        def due(at):
+            return set(
+                IncrementalSyncService.posts_due_for_refresh(self.account, now=at, state=state)
+                .values_list('post_id', flat=True)
+            )
+
+        self.assertEqual(due(self.now), {'hour', 'week', 'year'})
+        IncrementalSyncService.mark_refreshed(state, self.now)
+        self.assertEqual(due(self.now + timedelta(minutes=30)), set())
+        self.assertEqual(due(self.now + timedelta(hours=2)), {'hour'})
+        # By then the two-hour-old post has aged into the daily band
+        self.assertEqual(due(self.now + timedelta(days=2)), {'hour', 'week'})
+        self.assertEqual(due(self.now + timedelta(days=8)), {'hour', 'week', 'year'})
+
+
+@override_settings(ENCRYPTION_KEY=OLD_KEY, ENCRYPTION_KEY_FALLBACKS=[], SYNC_RATE_LIMIT_RETRY_MAX_SECONDS=900)
+class SyncRateLimitTests(TestCase):
+    def setUp(self):
+        self.account = SocialMediaAccount.objects.create(
+            client=make_client(), platform='youtube', account_id='UC1', username='channel',
+            access_token='ya29.access', refresh_token='1//refresh'
+        )
+
+    def run_sync(self, retry_after):
+        error = RateLimitExceeded('youtube', retry_after, 'daily quota exceeded')
+        with mock.patch('api.services.youtube_service.YouTubeService', side_effect=error), \
+                mock.patch.object(sync_youtube_data, 'retry', side_effect=RuntimeError('retried')) as retry:
+            try:
+                result = sync_youtube_data.apply(args=[str(self.account.id)]).get()
+            except RuntimeError:
+                result = None
+        return result, retry
+
+    def test_short_wait_is_retried(self):
+        result, retry = self.run_sync(60)
+        self.assertIsNone(result)
+        self.assertEqual(retry.call_args.kwargs['countdown'], 60)
+
+    def test_quota_reset_hours_away_is_left_to_the_next_run(self):
+        result, retry = self.run_sync(20 * 60 * 60)
+        retry.assert_not_called()
+        self.assertTrue(result['deferred'])
+        self.assertFalse(result['success'])
+
+
+class RealtimeTicketTests(TestCase):
+    def setUp(self):
+        self.user = make_client().user
+
+    def stream_user(self, ticket):
+        request = RequestFactory().get('/api/realtime/stream/', {'ticket': ticket})
+        return async_to_sync(_authenticated_user)(request)
+
+    def test_ticket_opens_the_stream_for_its_user(self):
+        api = APIClient()
+        api.force_authenticate(self.user)
+        response = api.post('/api/realtime/ticket/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stream_user(response.data['ticket']), self.user)
+
+    def test_tampered_and_expired_tickets_are_refused(self):
+        api = APIClient()
+        api.force_authenticate(self.user)
+        ticket = api.post('/api/realtime/ticket/').data['ticket']
+        self.assertIsNone(self.stream_user(ticket + 'x'))
+        with override_settings(REALTIME={**settings.REALTIME, 'ticket_max_age_seconds': -1}):
+            self.assertIsNone(self.stream_user(ticket))
+
+
+class ContentExportDownloadTests(TestCase):
+    def setUp(self):
+        # The field resolves its storage once, at import, so point it at a scratch directory
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        storage = mock.patch.object(
+            ContentExportJob._meta.get_field('file'), 'storage', FileSystemStorage(location=root.name)
+        )
+        storage.start()
+        self.addCleanup(storage.stop)
+
+        client = make_client()
+        self.admin = User.objects.create(username='admin', email='admin@example.com', role='admin')
+        ContentPost.objects.create(
+            client=client, title='Launch', content='Launch post', platform='instagram',
+            scheduled_date=timezone.now()
+        )
+        self.job = ContentExportService.build(
+            ContentExportJob.objects.create(requested_by=self.admin, filters={}, post_count=1)
+        )
+
+    def test_archive_is_served_to_admins_only(self):
+        api = APIClient()
+        api.force_authenticate(self.admin)
+        status_response = api.get(f'/api/content/exports/{self.job.id}/')
+        self.assertEqual(status_response.data['status'], 'completed')
+        url = status_response.data['download_url']
+        self.assertIn(f'/api/content/exports/{self.job.id}/download/', url)
+        self.assertNotIn(settings.MEDIA_URL, url)
+
+        response = api.get(url)
+        self.assertEqual(response.status_code, 200)
+        with tempfile.TemporaryFile() as body:
+            body.write(b''.join(response.streaming_content))
+            archive = zipfile.ZipFile(body)
+            self.assertEqual(len(archive.namelist()), 1)
+
+        api.force_authenticate(make_client('other').user)
+        self.assertEqual(api.get(url).status_code, 403)
+
+
+def playlist_item(video_id, published):
+    return {
+        'snippet': {'title': f'Video {video_id}', 'publishedAt': '2026-01-01T00:00:00Z'},
+        'contentDetails': {'videoId': video_id, 'videoPublishedAt': published},
+    }
+
+
+class YouTubeUploadsTests(TestCase):
+    # Newest first; v2 shows up again on the next page while the playlist changes under us
+    PAGES = {
+        None: {'items': [playlist_item('v3', '2026-03-03T00:00:00Z'), playlist_item('v2', '2026-03-02T00:00:00Z')],
+               'nextPageToken': 'p2'},
+        'p2': {'items': [playlist_item('v2', '2026-03-02T00:00:00Z'), playlist_item('v1', '2026-02-01T00:00:00Z')],
+               'nextPageToken': 'p3'},
+        'p3': {'items': [playlist_item('v0', '2026-01-01T00:00:00Z')]},
+    }
+
+    def setUp(self):
+        self.service = object.__new__(YouTubeService)
+        self.service.governor = mock.Mock()
+        self.service.service = api = mock.Mock()
+        api.channels().list().execute.return_value = {
+            'items': [{'contentDetails': {'relatedPlaylists': {'uploads': 'UU1'}}}]
+        }
+        self.pages_read = []
+
+        def list_page(**params):
+            self.pages_read.append(params['pageToken'])
+            return mock.Mock(execute=mock.Mock(return_value=self.PAGES[params['pageToken']]))
+        api.playlistItems().list.side_effect = list_page
+
+    def test_uploads_are_listed_once_each_from_the_playlist(self):
+        uploads = self.service._list_recent_uploads(None)
+        self.assertEqual(list(uploads), ['v3', 'v2', 'v1', 'v0'])
+        self.assertEqual(uploads['v3']['publishedAt'], '2026-03-03T00:00:00Z')
+        costs = [call.args[0] for call in self.service.governor.acquire.call_args_list]
+        self.assertEqual(costs, [1, 1, 1, 1])
+
+    def test_paging_stops_below_published_after(self):
+        uploads = self.service._list_recent_uploads(
+            None, published_after=timezone.make_aware(timezone.datetime(2026, 3, 1), timezone.utc)
+        )
+        self.assertEqual(list(uploads), ['v3', 'v2'])
+        # p2 still held v2; p3 held nothing new, so paging ends there
+        self.assertEqual(self.pages_read, [None, 'p2', 'p3'])
+
+    def test_analytics_quota_errors_defer_the_sync(self):
+        self.service.account = mock.Mock(id='acct')
+        self.service.credentials = mock.Mock(token='token')
+        error = RateLimitExceeded('youtube', 3600, 'daily quota exceeded')
+        with mock.patch('api.services.youtube_service.build_client'), \
+                mock.patch.object(self.service, '_execute', side_effect=error):
+            with self.assertRaises(RateLimitExceeded):
+                self.service._get_channel_analytics()
+
+    def test_duplicate_posts_are_saved_once(self):
+        account = SocialMediaAccount.objects.create(
+            client=make_client(), platform='youtube', account_id='UC1', username='channel'
+        )
+        posted_at = timezone.now()
+        rows = [
+            PostMetrics(account=account, post_id='v1', posted_at=posted_at, likes=likes, media_type='video')
+            for likes in (1, 2)
+        ]
+        self.assertEqual(IncrementalSyncService.save_changed_posts(account, rows), (1, 0))
+        self.assertEqual(PostMetrics.objects.get(account=account, post_id='v1').likes, 2)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitioning DDL needs PostgreSQL')
+@override_settings(METRICS_PARTITIONING={'months_ahead': 1, 'archive_expired': False})
+class MetricsPartitionTests(TestCase):
+    def setUp(self):
+        self.service = MetricsPartitionService()
+        self.service.convert_table()
+        self.account = SocialMediaAccount.objects.create(
+            client=make_client(), platform='instagram', account_id='17841', username='acct'
+        )
+
+    def partition_of(self, row):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT tableoid::regclass::text FROM {self.service.table} WHERE id = %s', [row.id]
+            )
+            return cursor.fetchone()[0]
+
+    def test_rows_in_default_move_into_the_new_partition(self):
+        month = add_months(timezone.now().date().replace(day=1), 4)
+        early = RealTimeMetrics.objects.create(account=self.account, date=month.replace(day=3))
+        self.assertEqual(self.partition_of(early), f'{self.service.table}_default')
+
+        # Three months later that month comes into range; the rows in DEFAULT used to block it
+        created = self.service.ensure_partitions(today=add_months(month, -1))
+        self.assertIn(self.service.partition_name(month), created)
+        self.assertEqual(self.partition_of(early), self.service.partition_name(month))
+        self.assertEqual(self.service.ensure_partitions(today=add_months(month, -1)), [])
+
+        # DEFAULT is attached again and still catches rows past the managed range
+        later = RealTimeMetrics.objects.create(account=self.account, date=add_months(month, 6))
+        self.assertEqual(self.partition_of(later), f'{self.service.table}_default')
+
+
+class ConversationPagingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', email='admin@example.com', role='admin')
+        self.client_user = make_client().user
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        self.url = f'/api/messages/conversation/{self.client_user.id}/'
+
+    def send(self, sender, receiver, timestamp, content):
+        return Message.objects.create(sender=sender, receiver=receiver, timestamp=timestamp, content=content)
+
+    def thread(self):
+        """Both directions, interleaved, with three messages sharing one timestamp"""
+        start = timezone.now() - timedelta(hours=1)
+        tie = start + timedelta(minutes=3)
+        messages = [
+            self.send(self.admin, self.client_user, start, 'a1'),
+            self.send(self.client_user, self.admin, start + timedelta(minutes=1), 'c1'),
+            self.send(self.admin, self.client_user, start + timedelta(minutes=2), 'a2'),
+            self.send(self.client_user, self.admin, tie, 'c2'),
+            self.send(self.admin, self.client_user, tie, 'a3'),
+            self.send(self.client_user, self.admin, tie, 'c3'),
+            self.send(self.client_user, self.admin, start + timedelta(minutes=4), 'c4'),
+        ]
+        return [m.content for m in sorted(messages, key=lambda m: (m.timestamp, m.id))]
+
+    def get(self, **params):
+        response = self.api.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_pages_backwards_merge_both_directions_once_each(self):
+        expected = self.thread()
+        pages = []
+        data = self.get(page_size=2)
+        while True:
+            pages.insert(0, [m['content'] for m in data['messages']])
+            if not data['before']:
+                break
+            data = self.get(page_size=2, before=data['before'])
+        self.assertEqual([content for page in pages for content in page], expected)
+        self.assertEqual([len(page) for page in pages], [1, 2, 2, 2])
+
+    def test_polling_after_splits_timestamp_ties(self):
+        expected = self.thread()
+        seen = []
+        data = self.get(page_size=1, after=encode_cursor([timezone.now() - timedelta(days=1), uuid.UUID(int=0)]))
+        while data['messages']:
+            seen += [m['content'] for m in data['messages']]
+            data = self.get(page_size=1, after=data['after'])
+        self.assertEqual(seen, expected)
+
+    def test_since_id_returns_newer_messages(self):
+        expected = self.thread()
+        last_seen = Message.objects.get(content=expected[3])
+        data = self.get(since_id=str(last_seen.id))
+        self.assertEqual([m['content'] for m in data['messages']], expected[4:])
+        self.assertEqual(self.api.get(self.url, {'since_id': str(uuid.uuid4())}).status_code, 404)
+
+    def test_bad_cursors_are_rejected(self):
+        self.thread()
+        for cursor in ('not a cursor', encode_cursor(['yesterday', 'x']), encode_cursor(['2026-01-01T00:00:00'])):
+            for direction in ('before', 'after'):
+                response = self.api.get(self.url, {direction: cursor})
+                self.assertEqual(response.status_code, 400, (direction, cursor))
+        response = self.api.get(self.url, {'after': 'WzEsIDJd'})  # [1, 2]
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty_thread_returns_a_cursor_to_poll_from(self):
+        data = self.get(page_size=10)
+        self.assertEqual(data['messages'], [])
+        self.assertIsNotNone(data['after'])
+
+        self.send(self.client_user, self.admin, timezone.now(), 'first')
+        data = self.get(after=data['after'])
+        self.assertEqual([m['content'] for m in data['messages']], ['first'])
+
+
+class NotificationMarkReadTests(TestCase):
+    def setUp(self):
+        self.user = make_client().user
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_marks_once_and_404s_on_bad_ids(self):
+        notification = Notification.objects.create(user=self.user, title='Hi', message='Hello')
+        url = f'/api/notifications/{notification.id}/mark_read/'
+        self.assertEqual(self.api.post(url).status_code, 200)
+        self.assertEqual(self.api.post(url).status_code, 200)
+        notification.refresh_from_db()
+        self.assertTrue(notification.read)
+
+        self.assertEqual(self.api.post(f'/api/notifications/{uuid.uuid4()}/mark_read/').status_code, 404)
+        self.assertEqual(self.api.post('/api/notifications/not-a-uuid/mark_read/').status_code, 404)
+
+
+def graph_error(code):
+    response = requests.Response()
+    response.status_code = 400
+    response._content = json.dumps({'error': {'code': code, 'message': 'rejected'}}).encode()
+    response.url = 'https://graph.facebook.com/v18.0/17841'
+    return response
+
+
+@override_settings(ENCRYPTION_KEY=OLD_KEY, ENCRYPTION_KEY_FALLBACKS=[])
+class InstagramExpandedFetchTests(TestCase):
+    def setUp(self):
+        account = SocialMediaAccount.objects.create(
+            client=make_client(), platform='instagram', account_id='17841', username='acct',
+            access_token='IGQ-token'
+        )
+        self.service = InstagramService(account)
+        self.service.governor = mock.Mock()
+        self.service.session = mock.Mock()
+
+    def test_field_errors_fall_back_to_separate_requests(self):
+        self.service.session.get.return_value = graph_error(100)
+        with mock.patch.object(self.service, 'sync_recent_posts') as posts, \
+                mock.patch.object(self.service, 'sync_profile_metrics') as profile:
+            self.service.sync_account_expanded()
+        posts.assert_called_once()
+        profile.assert_called_once()
+
+    def test_token_errors_are_raised_without_more_calls(self):
+        self.service.session.get.return_value = graph_error(190)
+        with mock.patch.object(self.service, 'sync_recent_posts') as posts, \
+                mock.patch.object(self.service, 'sync_profile_metrics') as profile:
+            with self.assertRaises(requests.HTTPError):
+                self.service.sync_account_expanded()
+        posts.assert_not_called()
+        profile.assert_not_called()
+        self.assertEqual(self.service.request_count, 1)
+        self.assertEqual(SyncLog.objects.get(account=self.service.account).status, 'failed')
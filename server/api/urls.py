@@ -15,15 +15,17 @@ from .views import (
     FileViewSet, NotificationViewSet, SocialMediaAccountViewSet,
     
     # Real-time metrics
-    get_realtime_metrics,
+    get_realtime_metrics, get_metrics_history,
     
     # Analytics views
-    analytics_overview, client_performance_report,
+    analytics_overview, analytics_timeseries, client_performance_report,
     
     # Health check
     health_check
 )
 
+from .views.realtime_views import realtime_stream, realtime_ticket
+
 from .views.admin.bank_settings_views import (
     admin_bank_settings,
     submit_payment_verification,
@@ -185,6 +187,11 @@ urlpatterns = [
     
     # Real-time metrics endpoints
     path('metrics/realtime/', get_realtime_metrics, name='realtime_metrics'),
+    path('metrics/history/', get_metrics_history, name='metrics_history'),
+    
+    # Real-time push (Server-Sent Events, served over ASGI)
+    path('realtime/ticket/', realtime_ticket, name='realtime_ticket'),
+    path('realtime/stream/', realtime_stream, name='realtime_stream'),
     
     # PAYPAL BILLING ENDPOINTS - Updated for PayPal
     # Subscription management
@@ -218,6 +225,7 @@ urlpatterns = [
     
     # Analytics and reporting
     path('analytics/overview/', analytics_overview, name='analytics_overview'),
+    path('analytics/timeseries/', analytics_timeseries, name='analytics_timeseries'),
     path('analytics/client/<uuid:client_id>/', client_performance_report, name='client_performance_report'),
     
     # Health check
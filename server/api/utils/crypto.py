@@ -0,0 +1,93 @@
+# server/api/utils/crypto.py
+"""
+Encryption of stored OAuth tokens
+
+One MultiFernet is built per process from ENCRYPTION_KEY (used for new
+ciphertexts) and ENCRYPTION_KEY_FALLBACKS (older keys still accepted when
+decrypting), so keys can be rotated without downtime: add the new key as
+ENCRYPTION_KEY, move the old one to the fallbacks, run
+`python manage.py rotate_token_encryption`, then drop the fallback.
+"""
+
+import base64
+import binascii
+from functools import lru_cache
+from cryptography.fernet import Fernet, MultiFernet
+from django.conf import settings
+
+FERNET_VERSION = 0x80
+# version + timestamp + IV + HMAC
+FERNET_OVERHEAD = 1 + 8 + 16 + 32
+# ...plus at least one AES block of ciphertext
+FERNET_MIN_LENGTH = FERNET_OVERHEAD + 16
+
+
+@lru_cache(maxsize=4)
+def _build_fernets(keys):
+    return tuple(Fernet(key.encode()) for key in keys)
+
+
+def get_fernets():
+    """Fernet instances for the current key followed by the fallback keys"""
+    return _build_fernets((settings.ENCRYPTION_KEY, *settings.ENCRYPTION_KEY_FALLBACKS))
+
+
+def get_cipher():
+    """MultiFernet encrypting with ENCRYPTION_KEY and decrypting with any configured key"""
+    return _build_cipher(get_fernets())
+
+
+@lru_cache(maxsize=4)
+def _build_cipher(fernets):
+    return MultiFernet(fernets)
+
+
+def encrypt_token(token):
+    """Encrypt a plaintext token with the current key"""
+    return get_cipher().encrypt(token.encode()).decode()
+
+
+def decrypt_token(encrypted_token):
+    """Decrypt a token encrypted with the current or a fallback key"""
+    return get_cipher().decrypt(encrypted_token.encode()).decode()
+
+
+def decrypt_tokens(encrypted_tokens):
+    """
+    Decrypt many tokens with one cipher lookup
+
+    Empty values come back as None, so optional refresh tokens can be passed
+    straight through.
+    """
+    cipher = get_cipher()
+    return [
+        cipher.decrypt(token.encode()).decode() if token else None
+        for token in encrypted_tokens
+    ]
+
+
+def rotate_token(encrypted_token):
+    """Re-encrypt a token under the current key"""
+    return get_cipher().rotate(encrypted_token.encode()).decode()
+
+
+def is_encrypted(value):
+    """
+    Whether value has the shape of a Fernet token, whichever key produced it
+
+    A token encrypted under a key that is no longer configured still counts
+    as encrypted: it must never be mistaken for plaintext and encrypted a
+    second time, which would lose it for good. Decrypting it raises
+    InvalidToken instead. OAuth tokens never have this shape: base64url
+    decoding to a 0x80 version byte, 8-byte timestamp, 16-byte IV, whole
+    AES blocks of ciphertext and a 32-byte HMAC.
+    """
+    try:
+        token = base64.urlsafe_b64decode(value.encode())
+    except (binascii.Error, ValueError):
+        return False
+    return (
+        len(token) >= FERNET_MIN_LENGTH
+        and token[0] == FERNET_VERSION
+        and (len(token) - FERNET_OVERHEAD) % 16 == 0
+    )
@@ -0,0 +1,104 @@
+# server/api/utils/pagination.py
+"""
+Keyset (cursor) pagination
+
+Pages are selected with a WHERE on the sort key of the last row served
+instead of OFFSET, so every page costs the same however deep the reader
+scrolls, and rows inserted meanwhile never shift a page. The cursor is an
+opaque base64 token holding that sort key; the key must be unique, so end
+it with the primary key.
+"""
+
+import base64
+import json
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """The cursor was not produced by encode_cursor()"""
+
+
+def encode_cursor(values):
+    """Opaque token for a sort key (datetimes, UUIDs and numbers are stored as strings)"""
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Sort key stored in a token from encode_cursor()"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise InvalidCursor('cursor is not a list of strings')
+    return values
+
+
+def page_size_from(query_params, default=DEFAULT_PAGE_SIZE):
+    """page_size query parameter, clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        size = int(query_params.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _keyset_filter(queryset, fields, values, descending):
+    """Rows whose (f0, f1, ...) sort after (v0, v1, ...): f0 beyond v0, or f0 equal and the rest beyond"""
+    lookup = 'lt' if descending else 'gt'
+    after = Q()
+    for index, field in enumerate(fields):
+        condition = Q(**{f'{field}__{lookup}': values[index]})
+        for previous_field, previous_value in zip(fields[:index], values[:index]):
+            condition &= Q(**{previous_field: previous_value})
+        after |= condition
+    return queryset.filter(after)
+
+
+def _sort_key(row, fields):
+    return tuple(row[field] if isinstance(row, dict) else getattr(row, field) for field in fields)
+
+
+def keyset_page(queryset, fields, cursor=None, page_size=DEFAULT_PAGE_SIZE, descending=True):
+    """
+    One page of queryset ordered by fields, starting after cursor
+
+    Args:
+        queryset: unordered queryset (fields may be annotations), or a list
+            of querysets over the same model whose rows are merged (each is
+            read with its own LIMIT, so every one can use its own index)
+        fields: sort key, most significant first; must be unique together
+        cursor: token from a previous page's next_cursor, or None for the first page
+        page_size: rows per page
+        descending: newest-first when True
+
+    Returns:
+        (rows, next_cursor) with next_cursor None on the last page
+
+    Raises:
+        InvalidCursor: the cursor is malformed or does not match fields
+    """
+    querysets = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(fields):
+            raise InvalidCursor('cursor does not match the sort key')
+        querysets = [_keyset_filter(qs, fields, values, descending) for qs in querysets]
+
+    ordering = [f'-{field}' if descending else field for field in fields]
+    rows = []
+    for qs in querysets:
+        rows.extend(qs.order_by(*ordering)[:page_size + 1])
+    if len(querysets) > 1:
+        rows.sort(key=lambda row: _sort_key(row, fields), reverse=descending)
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(_sort_key(rows[-1], fields))
+    return rows, next_cursor
@@ -9,7 +9,7 @@ from .auth_views import (
 # ============ DASHBOARD STATISTICS ============
 from .client.statistic_views import (
     dashboard_stats_view, client_dashboard_stats_view,
-    analytics_overview, client_performance_report
+    analytics_overview, analytics_timeseries, client_performance_report
 )
 
 # ============ MAIN VIEWSETS ============
@@ -18,7 +18,7 @@ from .client.task_views import TaskViewSet
 from .client.content_views import ContentPostViewSet
 from .client.performance_views import PerformanceDataViewSet
 from .admin.invoice_views import InvoiceViewSet
-from .client.social_views import SocialMediaAccountViewSet, get_realtime_metrics
+from .client.social_views import SocialMediaAccountViewSet, get_realtime_metrics, get_metrics_history
 from .message_views import MessageViewSet
 from .notification_views import NotificationViewSet
 from .file_views import FileViewSet
@@ -163,7 +163,7 @@ __all__ = [
     'FileViewSet', 'NotificationViewSet', 'SocialMediaAccountViewSet',
     
     # Analytics and metrics  
-    'get_realtime_metrics', 'analytics_overview', 'client_performance_report',
+    'get_realtime_metrics', 'get_metrics_history', 'analytics_overview', 'analytics_timeseries', 'client_performance_report',
     
     # Message functionality
     'send_message_to_admin', 'send_message_to_client',
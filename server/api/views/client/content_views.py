@@ -6,17 +6,21 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Q
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 import logging
 import json
-import zipfile
-import io
 
-from ...models import ContentPost, ContentImage, Client, SocialMediaAccount
-from ...serializers import ContentPostSerializer, ContentImageSerializer
+from ...models import ContentPost, ContentImage, ContentExportJob, Client, SocialMediaAccount
+from ...serializers import ContentPostSerializer, ContentImageSerializer, ContentExportJobSerializer
+from ...services.content_export_service import ContentExportService
 from ...services.notification_service import NotificationService
+from ...tasks import build_content_export
+from ...utils.zip_stream import iter_zip
 
 logger = logging.getLogger(__name__)
 
@@ -382,7 +386,7 @@ class ContentPostViewSet(ModelViewSet):
             return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
         
         content = self.get_object()
-        images = content.images.all()
+        images = list(content.images.all())
         
         if not images:
             return Response(
@@ -390,37 +394,104 @@ class ContentPostViewSet(ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Create ZIP file in memory
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Add metadata file
-            metadata = {
-                'title': content.title,
-                'description': content.content,
-                'platform': content.platform,
-                'scheduled_date': content.scheduled_date.isoformat(),
-                'client_name': content.client.name
-            }
-            zip_file.writestr('post_info.json', json.dumps(metadata, indent=2))
-            
-            # Add each image
-            for i, img in enumerate(images):
-                try:
-                    img.image.open()
-                    image_data = img.image.read()
-                    # Get file extension
-                    ext = img.image.name.split('.')[-1]
-                    filename = f"image_{i+1}.{ext}"
-                    zip_file.writestr(filename, image_data)
-                except Exception as e:
-                    logger.error(f"Error reading image {img.id}: {e}")
+        # Metadata file, then each image streamed from storage as it is sent
+        metadata = {
+            'title': content.title,
+            'description': content.content,
+            'platform': content.platform,
+            'scheduled_date': content.scheduled_date.isoformat(),
+            'client_name': content.client.name
+        }
+        entries = [('post_info.json', json.dumps(metadata, indent=2))]
+        for i, img in enumerate(images):
+            ext = img.image.name.split('.')[-1]
+            entries.append((f"image_{i+1}.{ext}", img.image))
         
-        # Prepare response
-        zip_buffer.seek(0)
-        response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
+        response = StreamingHttpResponse(iter_zip(entries), content_type='application/zip')
         response['Content-Disposition'] = f'attachment; filename="post_{content.id}_images.zip"'
         return response
     
+    @action(detail=False, methods=['post'])
+    def bulk_export(self, request):
+        """
+        Export many posts with their images as one ZIP, built in the background
+        Body: client, platform, status, start_date, end_date (YYYY-MM-DD), all optional
+        Returns the job; poll export_status until download_url is set
+        """
+        if request.user.role != 'admin':
+            return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            filters = ContentExportService.clean_filters(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        post_count = ContentExportService.posts_for(filters).count()
+        if not post_count:
+            return Response({'error': 'No content matches these filters'}, status=status.HTTP_404_NOT_FOUND)
+        max_posts = settings.CONTENT_EXPORTS['max_posts']
+        if post_count > max_posts:
+            return Response(
+                {'error': f'{post_count} posts match; narrow the filters to at most {max_posts}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        job = ContentExportJob.objects.create(
+            requested_by=request.user,
+            filters=filters,
+            post_count=post_count
+        )
+        
+        def enqueue():
+            try:
+                build_content_export.delay(str(job.id))
+            except Exception as e:
+                logger.error(f"Could not queue content export {job.id}: {e}")
+                ContentExportJob.objects.filter(id=job.id).update(
+                    status='failed', error='Export queue unavailable, try again later', completed_at=timezone.now()
+                )
+            else:
+                logger.info(f"Content export {job.id} queued by {request.user.email}: {filters}")
+        
+        transaction.on_commit(enqueue)
+        
+        serializer = ContentExportJobSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'], url_path=r'exports/(?P<job_id>[0-9a-f-]+)')
+    def export_status(self, request, job_id=None):
+        """Status of a bulk export job, with download_url once completed"""
+        if request.user.role != 'admin':
+            return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            job = ContentExportJob.objects.get(id=job_id)
+        except (ContentExportJob.DoesNotExist, ValidationError):
+            return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = ContentExportJobSerializer(job, context={'request': request})
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], url_path=r'exports/(?P<job_id>[0-9a-f-]+)/download')
+    def export_download(self, request, job_id=None):
+        """The finished archive of a bulk export job"""
+        if request.user.role != 'admin':
+            return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            job = ContentExportJob.objects.get(id=job_id, status='completed')
+        except (ContentExportJob.DoesNotExist, ValidationError):
+            return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not job.file:
+            return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return FileResponse(
+            job.file.open('rb'),
+            as_attachment=True,
+            filename=f"content_export_{job.created_at:%Y%m%d}_{job.id}.zip",
+            content_type='application/zip'
+        )
+    
     @action(detail=True, methods=['delete'])
     def delete_image(self, request, pk=None):
         """Delete a specific image from the post"""
@@ -31,8 +31,9 @@ logger = logging.getLogger(__name__)
 from ...models import (
     User, Client, Task, ContentPost, PerformanceData,
     Message, Invoice, TeamMember, Project, File, Notification,
-    SocialMediaAccount, RealTimeMetrics
+    SocialMediaAccount, LatestAccountMetrics
 )
+from ...services.metrics_aggregation_service import MetricsAggregationService
 
 # Social Media Account ViewSet
 class SocialMediaAccountViewSet(ModelViewSet):
@@ -41,13 +42,14 @@ class SocialMediaAccountViewSet(ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
+        queryset = SocialMediaAccount.objects.select_related('client', 'latest_metrics')
         if self.request.user.role == 'admin':
-            return SocialMediaAccount.objects.all()
+            return queryset
         else:
             # Clients can only see their own accounts
             try:
                 client = self.request.user.client_profile
-                return SocialMediaAccount.objects.filter(client=client)
+                return queryset.filter(client=client)
             except Client.DoesNotExist:
                 return SocialMediaAccount.objects.none()
     
@@ -55,7 +57,8 @@ class SocialMediaAccountViewSet(ModelViewSet):
         # Only admins can create accounts manually
         if self.request.user.role != 'admin':
             raise PermissionError('Admin access required')
-        serializer.save()
+        account = serializer.save()
+        MetricsAggregationService.invalidate_client_stats(account.client_id)
     
     @action(detail=True, methods=['post'])
     def sync(self, request, pk=None):
@@ -104,6 +107,7 @@ class SocialMediaAccountViewSet(ModelViewSet):
         # Soft delete - preserve historical data
         account.is_active = False
         account.save()
+        MetricsAggregationService.invalidate_client_stats(account.client_id)
         
         return Response({'message': f'{account.platform} account disconnected'})
 
@@ -123,24 +127,98 @@ def get_realtime_metrics(request):
         accounts = SocialMediaAccount.objects.filter(is_active=True)
     
     metrics_data = []
-    for account in accounts:
-        # Get latest metrics for each account
-        latest_metrics = RealTimeMetrics.objects.filter(
-            account=account
-        ).order_by('-date').first()
+    for account in accounts.select_related('latest_metrics'):
+        # Latest metrics come from the per-account snapshot (joined above)
+        try:
+            latest_metrics = account.latest_metrics
+        except LatestAccountMetrics.DoesNotExist:
+            continue
         
-        if latest_metrics:
-            metrics_data.append({
-                'account': {
-                    'id': str(account.id),
-                    'platform': account.platform,
-                    'username': account.username
-                },
-                'followers_count': latest_metrics.followers_count,
-                'engagement_rate': float(latest_metrics.engagement_rate),
-                'reach': latest_metrics.reach,
-                'daily_growth': latest_metrics.daily_growth,
-                'last_updated': latest_metrics.created_at
-            })
+        metrics_data.append({
+            'account': {
+                'id': str(account.id),
+                'platform': account.platform,
+                'username': account.username
+            },
+            'followers_count': latest_metrics.followers_count,
+            'engagement_rate': float(latest_metrics.engagement_rate),
+            'reach': latest_metrics.reach,
+            'daily_growth': latest_metrics.daily_growth,
+            'last_updated': latest_metrics.updated_at
+        })
     
     return Response({'data': metrics_data})
+
+# Metrics history endpoint
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_metrics_history(request):
+    """
+    Metrics history for connected accounts over a date range
+    Query params: start_date, end_date (YYYY-MM-DD, default last 90 days),
+    resolution (auto, day, week, month), account_id, client_id (admin only)
+    """
+    from ...services.metrics_rollup_service import MetricsRollupService, RESOLUTIONS
+    
+    if request.user.role == 'client':
+        try:
+            client = request.user.client_profile
+            accounts = SocialMediaAccount.objects.filter(client=client, is_active=True)
+        except Client.DoesNotExist:
+            return Response({'error': 'Client profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    else:
+        accounts = SocialMediaAccount.objects.filter(is_active=True)
+        client_id = request.query_params.get('client_id')
+        if client_id:
+            accounts = accounts.filter(client_id=client_id)
+    
+    account_id = request.query_params.get('account_id')
+    if account_id:
+        accounts = accounts.filter(id=account_id)
+    
+    resolution = request.query_params.get('resolution', 'auto')
+    if resolution != 'auto' and resolution not in RESOLUTIONS:
+        return Response(
+            {'error': f"Invalid resolution. Use auto, {', '.join(RESOLUTIONS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        end_date = datetime.strptime(
+            request.query_params.get('end_date') or timezone.now().strftime('%Y-%m-%d'), '%Y-%m-%d'
+        ).date()
+        start_param = request.query_params.get('start_date')
+        start_date = (
+            datetime.strptime(start_param, '%Y-%m-%d').date() if start_param
+            else end_date - timedelta(days=90)
+        )
+    except ValueError:
+        return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if start_date > end_date:
+        return Response({'error': 'start_date must be before end_date'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    account_info = {
+        account['id']: account
+        for account in accounts.values('id', 'platform', 'username')
+    }
+    resolution, history = MetricsRollupService.get_history(
+        list(account_info.keys()), start_date, end_date, resolution
+    )
+    
+    return Response({
+        'resolution': resolution,
+        'start_date': start_date,
+        'end_date': end_date,
+        'data': [
+            {
+                'account': {
+                    'id': str(account_id),
+                    'platform': account_info[account_id]['platform'],
+                    'username': account_info[account_id]['username']
+                },
+                'points': points
+            }
+            for account_id, points in history.items()
+        ]
+    })
@@ -102,8 +102,8 @@ def client_dashboard_stats_view(request):
     # Import the aggregation service
     from ...services.metrics_aggregation_service import MetricsAggregationService
     
-    # Get REAL-TIME stats (not monthly aggregation)
-    stats = MetricsAggregationService.get_client_real_time_stats(client)
+    # Get REAL-TIME stats (not monthly aggregation), cached per client
+    stats = MetricsAggregationService.get_cached_client_stats(client)
     
     # Add payment info
     stats['next_payment_amount'] = float(client.monthly_fee)
@@ -122,64 +122,67 @@ def analytics_overview(request):
     if request.user.role != 'admin':
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
     
-    # Date range
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=90)  # Last 3 months
-    
-    # Client growth
-    client_growth = []
-    current_date = start_date
-    while current_date <= end_date:
-        count = Client.objects.filter(created_at__date__lte=current_date).count()
-        client_growth.append({
-            'date': current_date,
-            'count': count
-        })
-        current_date += timedelta(days=7)  # Weekly data points
-    
-    # Revenue trends (SQLite/Postgres compatible)
-    from django.db import connection
-    if connection.vendor == 'sqlite':
-        revenue_data = Invoice.objects.filter(
-            status='paid',
-            paid_at__date__gte=start_date
-        ).extra(
-            select={'month': 
-                "date(paid_at, 'start of month')"  # SQLite-compatible date formatting
-            }
-        ).values('month').annotate(
-            total=Sum('amount')
-        ).order_by('month')
-    else:
-        from django.db.models.functions import TruncMonth
-        revenue_data = Invoice.objects.filter(
-            status='paid',
-            paid_at__date__gte=start_date
-        ).annotate(
-            month=TruncMonth('paid_at')
-        ).values('month').annotate(
-            total=Sum('amount')
-        ).order_by('month')
-    
-    # Task completion rates
-    task_stats = Task.objects.aggregate(
-        total=Count('id'),
-        completed=Count('id', filter=Q(status='completed')),
-        pending=Count('id', filter=Q(status='pending')),
-        in_progress=Count('id', filter=Q(status='in-progress'))
-    )
+    from ...services.analytics_service import AnalyticsService
     
-    completion_rate = 0
-    if task_stats['total'] > 0:
-        completion_rate = (task_stats['completed'] / task_stats['total']) * 100
+    # Last 3 months: weekly client growth, monthly revenue
+    end_date = timezone.now().date()
+    start_date = end_date - timedelta(days=90)
+    data = AnalyticsService.get_timeseries(start_date, end_date, bucket='week', revenue_bucket='month')
     
     return Response({
-        'client_growth': client_growth,
-        'revenue_trends': list(revenue_data),
-        'task_stats': task_stats,
-        'completion_rate': completion_rate
+        'client_growth': [
+            {'date': point['date'], 'count': point['count']} for point in data['client_growth']
+        ],
+        'revenue_trends': [
+            {'month': point['date'], 'total': point['total']} for point in data['revenue'] if point['invoices']
+        ],
+        'task_stats': data['task_stats'],
+        'completion_rate': data['completion_rate']
     })
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analytics_timeseries(request):
+    """
+    Client growth, revenue and task stats over any range
+    Query params: start_date, end_date (YYYY-MM-DD, default last 90 days),
+    bucket (day, week, month; default week)
+    """
+    if request.user.role != 'admin':
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    
+    from ...services.analytics_service import AnalyticsService, BUCKETS, MAX_BUCKETS
+    
+    bucket = request.query_params.get('bucket', 'week')
+    if bucket not in BUCKETS:
+        return Response(
+            {'error': f"Invalid bucket. Use {', '.join(BUCKETS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        end_date = datetime.strptime(
+            request.query_params.get('end_date') or timezone.now().strftime('%Y-%m-%d'), '%Y-%m-%d'
+        ).date()
+        start_param = request.query_params.get('start_date')
+        start_date = (
+            datetime.strptime(start_param, '%Y-%m-%d').date() if start_param
+            else end_date - timedelta(days=90)
+        )
+    except ValueError:
+        return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if start_date > end_date:
+        return Response({'error': 'start_date must be before end_date'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if AnalyticsService.count_buckets(start_date, end_date, bucket) > MAX_BUCKETS:
+        return Response(
+            {'error': f'Range too long for {bucket} buckets (max {MAX_BUCKETS} points)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response(AnalyticsService.get_timeseries(start_date, end_date, bucket))
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def client_performance_report(request, client_id):
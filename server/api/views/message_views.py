@@ -3,13 +3,19 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.db.models import Q, OuterRef, Subquery, FilteredRelation
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 import logging
+import uuid
 
 from ..models import User, Client, Message
 from ..serializers import MessageSerializer
 from ..services.notification_service import NotificationService  # NEW IMPORT
+from ..services.realtime_service import RealtimeService
+from ..services.unread_counter_service import UnreadCounterService
+from ..utils.pagination import InvalidCursor, encode_cursor, keyset_page, page_size_from
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +68,8 @@ class MessageViewSet(ModelViewSet):
     
     def perform_create(self, serializer):
         message = serializer.save(sender=self.request.user)
+        UnreadCounterService.adjust('messages', message.receiver_id, 1)
+        RealtimeService.publish_message(message)
         
         # 🔔 NEW: Notify recipient of new message
         sender_name = f"{self.request.user.first_name} {self.request.user.last_name}" if self.request.user.first_name else self.request.user.email
@@ -70,13 +78,22 @@ class MessageViewSet(ModelViewSet):
             sender_name=sender_name
         )
     
+    def perform_update(self, serializer):
+        message = serializer.save()
+        UnreadCounterService.invalidate('messages', message.receiver_id)
+    
+    def perform_destroy(self, instance):
+        receiver_id = instance.receiver_id
+        instance.delete()
+        UnreadCounterService.invalidate('messages', receiver_id)
+    
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Mark message as read"""
         message = self.get_object()
-        if message.receiver == request.user:
-            message.read = True
-            message.save()
+        if message.receiver_id == request.user.id:
+            updated = Message.objects.filter(pk=message.pk, read=False).update(read=True)
+            UnreadCounterService.adjust('messages', request.user.id, -updated)
             return Response({'message': 'Message marked as read'})
         else:
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
@@ -124,6 +141,8 @@ def send_message_to_admin(request):
             receiver=admin_user,
             content=content
         )
+        UnreadCounterService.adjust('messages', message.receiver_id, 1)
+        RealtimeService.publish_message(message)
         
         # 🔔 NEW: Notify admin of new message
         sender_name = f"{request.user.first_name} {request.user.last_name}" if request.user.first_name else request.user.email
@@ -170,6 +189,8 @@ def send_message_to_client(request):
             receiver=client_user,
             content=content
         )
+        UnreadCounterService.adjust('messages', message.receiver_id, 1)
+        RealtimeService.publish_message(message)
         
         # 🔔 NEW: Notify client of new message
         sender_name = f"{request.user.first_name} {request.user.last_name}" if request.user.first_name else "Admin"
@@ -191,7 +212,14 @@ def send_message_to_client(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_admin_conversations(request):
-    """Get all client conversations for admin with proper user IDs"""
+    """
+    Get all client conversations for admin with proper user IDs
+    
+    One query annotates every client with its latest message and unread
+    count; a second loads those latest messages for serialization.
+    Newest activity first (latest message, or sign-up for clients with no
+    messages). Pass page_size and then the returned next_cursor to page.
+    """
     try:
         if request.user.role != 'admin':
             return Response({'error': 'Admin access required'}, 
@@ -199,28 +227,46 @@ def get_admin_conversations(request):
         
         logger.info(f"Admin {request.user.username} fetching conversations")
         
-        # Get all clients with their user accounts
-        clients = Client.objects.select_related('user').all()
-        conversations = []
+        admin = request.user
+        between_admin_and_client = Message.objects.filter(
+            Q(sender=admin, receiver=OuterRef('user')) |
+            Q(sender=OuterRef('user'), receiver=admin)
+        ).order_by('-timestamp')
+        
+        clients = Client.objects.filter(user__isnull=False).annotate(
+            last_message_id=Subquery(between_admin_and_client.values('id')[:1]),
+            last_activity_at=Coalesce(
+                Subquery(between_admin_and_client.values('timestamp')[:1]),
+                'created_at'
+            ),
+            unread_from_client=FilteredRelation(
+                'user__sent_messages',
+                condition=Q(user__sent_messages__receiver=admin, user__sent_messages__read=False)
+            ),
+            unread_count=Count('unread_from_client')
+        ).select_related('user')
         
+        paginate = 'cursor' in request.query_params or 'page_size' in request.query_params
+        next_cursor = None
+        if paginate:
+            try:
+                clients, next_cursor = keyset_page(
+                    clients, ['last_activity_at', 'id'],
+                    cursor=request.query_params.get('cursor'),
+                    page_size=page_size_from(request.query_params)
+                )
+            except (InvalidCursor, ValidationError):
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            clients = list(clients.order_by('-last_activity_at', '-id'))
+        
+        last_messages = Message.objects.select_related('sender', 'receiver').in_bulk(
+            [client.last_message_id for client in clients if client.last_message_id]
+        )
+        
+        conversations = []
         for client in clients:
-            # Skip clients without user accounts
-            if not client.user:
-                logger.warning(f"Client {client.name} has no user account")
-                continue
-            
-            # Get latest message with this client
-            latest_message = Message.objects.filter(
-                Q(sender=request.user, receiver=client.user) |
-                Q(sender=client.user, receiver=request.user)
-            ).order_by('-timestamp').first()
-            
-            # Count unread messages from this client
-            unread_count = Message.objects.filter(
-                sender=client.user,
-                receiver=request.user,
-                read=False
-            ).count()
+            latest_message = last_messages.get(client.last_message_id)
             
             conversation_data = {
                 'id': str(client.id),
@@ -232,7 +278,7 @@ def get_admin_conversations(request):
                 'email': client.user.email,
                 'role': 'client',
                 'lastMessage': MessageSerializer(latest_message).data if latest_message else None,
-                'unreadCount': unread_count
+                'unreadCount': client.unread_count
             }
             
             # Add user avatar if available
@@ -243,7 +289,10 @@ def get_admin_conversations(request):
         
         logger.info(f"Found {len(conversations)} conversations")
         
-        return Response({'conversations': conversations})
+        response = {'conversations': conversations}
+        if paginate:
+            response['next_cursor'] = next_cursor
+        return Response(response)
         
     except Exception as e:
         logger.error(f"Error fetching admin conversations: {str(e)}")
@@ -253,41 +302,100 @@ def get_admin_conversations(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_conversation_messages(request, user_id):
-    """Get messages between current user and specified user"""
+    """
+    Get messages between current user and specified user
+    
+    Without paging parameters the whole thread is returned, oldest first.
+    With any of page_size, before, after or since_id, one page is returned
+    as {'messages', 'before', 'after'}:
+    - no cursor: the newest page_size messages
+    - before=<cursor>: the page of older messages (from a previous 'before')
+    - after=<cursor> or since_id=<message id>: messages newer than that,
+      for polling; keep passing the returned 'after' (on an empty thread it
+      marks the time of the request, so polling can start from there)
+    Each direction of the thread is read with its own index range scan,
+    so a page costs the same however long the thread is.
+    """
     try:
         logger.info(f"User {request.user.username} fetching messages with user {user_id}")
         
         # Verify the user exists
-        try:
-            other_user = User.objects.get(id=user_id)
-            logger.info(f"Found other user: {other_user.username}")
-        except User.DoesNotExist:
+        if not User.objects.filter(id=user_id).exists():
             logger.error(f"User not found with ID: {user_id}")
             return Response({'error': 'User not found'}, 
                           status=status.HTTP_404_NOT_FOUND)
         
-        # Get messages between the two users
-        messages = Message.objects.filter(
-            Q(sender=request.user, receiver_id=user_id) |
-            Q(sender_id=user_id, receiver=request.user)
-        ).order_by('timestamp')
-        
-        logger.info(f"Found {messages.count()} messages")
-        
         # Mark messages from the other user as read
-        unread_messages = messages.filter(
+        marked = Message.objects.filter(
             sender_id=user_id,
             receiver=request.user,
             read=False
-        )
+        ).update(read=True)
+        if marked:
+            UnreadCounterService.adjust('messages', request.user.id, -marked)
+            logger.info(f"Marked {marked} messages as read")
         
-        unread_count = unread_messages.count()
-        if unread_count > 0:
-            unread_messages.update(read=True)
-            logger.info(f"Marked {unread_count} messages as read")
+        params = request.query_params
+        if not any(key in params for key in ('page_size', 'before', 'after', 'since_id')):
+            messages = Message.objects.filter(
+                Q(sender=request.user, receiver_id=user_id) |
+                Q(sender_id=user_id, receiver=request.user)
+            ).select_related('sender', 'receiver').order_by('timestamp', 'id')
+            serializer = MessageSerializer(messages, many=True)
+            return Response(serializer.data)
+        
+        directions = [
+            Message.objects.filter(sender=request.user, receiver_id=user_id).select_related('sender', 'receiver'),
+            Message.objects.filter(sender_id=user_id, receiver=request.user).select_related('sender', 'receiver'),
+        ]
+        fields = ['timestamp', 'id']
+        page_size = page_size_from(params)
+        # Taken before reading so a message sent meanwhile sorts after it
+        requested_at = timezone.now()
+        
+        try:
+            after = params.get('after')
+            if 'since_id' in params:
+                last_seen = Message.objects.filter(
+                    Q(sender=request.user, receiver_id=user_id) |
+                    Q(sender_id=user_id, receiver=request.user),
+                    id=params['since_id']
+                ).values('timestamp', 'id').first()
+                if last_seen is None:
+                    return Response({'error': 'Message not found in this conversation'},
+                                  status=status.HTTP_404_NOT_FOUND)
+                after = encode_cursor([last_seen['timestamp'], last_seen['id']])
+            
+            if after:
+                # Newer than the cursor, oldest first
+                messages, _ = keyset_page(directions, fields, cursor=after, page_size=page_size, descending=False)
+                before_cursor = None
+            else:
+                # Newest page (or the page before the cursor), returned oldest first
+                messages, before_cursor = keyset_page(
+                    directions, fields, cursor=params.get('before'), page_size=page_size
+                )
+                messages.reverse()
+        except (InvalidCursor, ValidationError):
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if messages:
+            after_cursor = encode_cursor([messages[-1].timestamp, messages[-1].id])
+        elif after:
+            # Nothing new: polling resumes from the same point
+            after_cursor = after
+        elif not params.get('before'):
+            # Empty thread: poll from now; the nil id lets a message stamped
+            # this very instant through
+            after_cursor = encode_cursor([requested_at, uuid.UUID(int=0)])
+        else:
+            after_cursor = None
         
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data)
+        return Response({
+            'messages': MessageSerializer(messages, many=True).data,
+            'before': before_cursor,
+            'after': after_cursor
+        })
         
     except Exception as e:
         logger.error(f"Error fetching conversation messages: {str(e)}")
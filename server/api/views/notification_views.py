@@ -8,6 +8,8 @@ from rest_framework.decorators import action
 from django.contrib.auth import authenticate, login, logout
 from django.db.models import Sum, Count, Q, Avg
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
 from datetime import datetime, timedelta
 import calendar
 import logging
@@ -33,6 +35,7 @@ from ..models import (
     Message, Invoice, TeamMember, Project, File, Notification,
     SocialMediaAccount, RealTimeMetrics
 )
+from ..services.unread_counter_service import UnreadCounterService, LATEST_IDS_CACHED
 
 class NotificationViewSet(ModelViewSet):
     """Notification management viewset"""
@@ -40,18 +43,67 @@ class NotificationViewSet(ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).order_by('-created_at')
+        """
+        The user's notifications, newest first
+        Query params: since (ISO datetime; only notifications created after it),
+        unread (true for unread only)
+        """
+        queryset = Notification.objects.filter(user=self.request.user)
+        
+        since = self.request.query_params.get('since')
+        if since:
+            since_dt = parse_datetime(since)
+            if since_dt is None:
+                raise ValidationError({'since': 'Use an ISO 8601 datetime, e.g. 2024-01-31T12:00:00Z'})
+            if timezone.is_naive(since_dt):
+                since_dt = timezone.make_aware(since_dt)
+            queryset = queryset.filter(created_at__gt=since_dt)
+        
+        if self.request.query_params.get('unread') == 'true':
+            queryset = queryset.filter(read=False)
+        
+        return queryset.order_by('-created_at')
+    
+    def perform_update(self, serializer):
+        serializer.save()
+        UnreadCounterService.invalidate('notifications', self.request.user.id)
+    
+    def perform_destroy(self, instance):
+        instance.delete()
+        UnreadCounterService.invalidate('notifications', self.request.user.id)
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Mark notification as read"""
-        notification = self.get_object()
-        notification.read = True
-        notification.save()
+        notification = self.get_object()  # 404 for unknown or malformed ids
+        # Conditional UPDATE: only the request that flips the row moves the counter
+        updated = self.get_queryset().filter(pk=notification.pk, read=False).update(read=True)
+        if updated:
+            UnreadCounterService.adjust('notifications', request.user.id, -updated)
         return Response({'message': 'Notification marked as read'})
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all notifications as read"""
-        updated_count = self.get_queryset().update(read=True)
+        updated_count = self.get_queryset().filter(read=False).update(read=True)
+        UnreadCounterService.adjust('notifications', request.user.id, -updated_count)
         return Response({'message': f'{updated_count} notifications marked as read'})
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Unread counts and the newest notification ids, for badge polling
+        Query params: limit (latest ids to return, default 5, max 20)
+        Served from cache; fetch the notifications themselves only when the ids change
+        """
+        try:
+            limit = max(0, min(int(request.query_params.get('limit', 5)), LATEST_IDS_CACHED))
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        counts = UnreadCounterService.get_counts(request.user.id)
+        return Response({
+            'unread_notifications': counts['notifications'],
+            'unread_messages': counts['messages'],
+            'latest_ids': UnreadCounterService.get_latest_notification_ids(request.user.id, limit)
+        })
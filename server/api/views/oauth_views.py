@@ -16,6 +16,8 @@ from urllib.parse import urlencode, parse_qs
 from ..models import SocialMediaAccount, Client
 from ..services.instagram_service import InstagramService
 from ..services.youtube_service import YouTubeService
+from ..services.youtube_client_cache import build_client
+from ..services.metrics_aggregation_service import MetricsAggregationService
 from ..tasks import sync_instagram_data, sync_youtube_data
 
 logger = logging.getLogger(__name__)
@@ -147,6 +149,7 @@ def handle_instagram_callback(request):
                 'is_active': True
             }
         )
+        MetricsAggregationService.invalidate_client_stats(client.id)
         
         # Clean up session
         if 'oauth_state_instagram' in request.session:
@@ -288,7 +291,6 @@ def handle_youtube_callback(request):
         logger.info("Access token received, fetching channel info...")
         
         # Get YouTube channel info
-        from googleapiclient.discovery import build
         from google.oauth2.credentials import Credentials
         
         creds = Credentials(
@@ -299,7 +301,7 @@ def handle_youtube_callback(request):
             client_secret=settings.GOOGLE_CLIENT_SECRET
         )
         
-        youtube = build('youtube', 'v3', credentials=creds)
+        youtube = build_client('youtube', 'v3', creds)
         channels_response = youtube.channels().list(
             part='snippet,statistics',
             mine=True
@@ -337,6 +339,7 @@ def handle_youtube_callback(request):
                 'is_active': True
             }
         )
+        MetricsAggregationService.invalidate_client_stats(client.id)
         
         logger.info(f"Account saved: {account.username} (created: {created})")
         
@@ -382,12 +385,12 @@ def get_connected_accounts(request):
                           status=status.HTTP_403_FORBIDDEN)
         
         client = request.user.client_profile
-        accounts = SocialMediaAccount.objects.filter(client=client)
+        accounts = SocialMediaAccount.objects.filter(client=client).select_related('latest_metrics')
         
         account_data = []
         for account in accounts:
-            # Get latest metrics
-            latest_metrics = account.metrics.order_by('-date').first()
+            # Get latest metrics from the per-account snapshot
+            latest_metrics = getattr(account, 'latest_metrics', None)
             
             account_info = {
                 'id': str(account.id),
@@ -438,6 +441,7 @@ def disconnect_account(request, account_id):
         # Soft delete - mark as inactive instead of deleting to preserve historical data
         account.is_active = False
         account.save()
+        MetricsAggregationService.invalidate_client_stats(client.id)
         
         # Optionally, you could also revoke the token on the platform side here
         # For Instagram/Facebook, you would call their revoke endpoint
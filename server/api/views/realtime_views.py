@@ -0,0 +1,116 @@
+# server/api/views/realtime_views.py
+"""
+Server-Sent Events stream of a user's messages and notifications
+
+    const { ticket } = await api.post('/realtime/ticket/');
+    const events = new EventSource(`${API}/realtime/stream/?ticket=${ticket}`);
+    events.addEventListener('message', e => ...);
+    events.addEventListener('notification', e => ...);
+
+EventSource cannot send an Authorization header, and a DRF token in the
+query string would end up in proxy and access logs, so the client first
+trades its token for a signed ticket that is only good for opening a
+stream within REALTIME['ticket_max_age_seconds']; a logged-in session
+works too. Fetch a new ticket before each reconnect. The view is
+async and holds no database connection or worker thread while idle, so it
+must be served through ASGI (server/asgi.py under uvicorn or daphne).
+Streams close after REALTIME['max_stream_seconds'] and EventSource
+reconnects on its own; this keeps load balancers from cutting them off
+and bounds streams whose client vanished without the server noticing.
+"""
+
+import json
+import logging
+import time
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from ..services.realtime_service import user_channel
+
+logger = logging.getLogger(__name__)
+
+TICKET_SALT = 'api.realtime.stream'
+
+
+@api_view(['POST'])
+def realtime_ticket(request):
+    """Short-lived ticket for opening the current user's realtime stream"""
+    ticket = signing.TimestampSigner(salt=TICKET_SALT).sign(str(request.user.id))
+    return Response({
+        'ticket': ticket,
+        'expires_in': settings.REALTIME['ticket_max_age_seconds']
+    })
+
+
+async def _authenticated_user(request):
+    ticket = request.GET.get('ticket')
+    if ticket:
+        try:
+            user_id = signing.TimestampSigner(salt=TICKET_SALT).unsign(
+                ticket, max_age=settings.REALTIME['ticket_max_age_seconds']
+            )
+        except signing.BadSignature:  # Also raised for expired tickets
+            return None
+        return await get_user_model().objects.filter(id=user_id, is_active=True).afirst()
+
+    user = await sync_to_async(lambda: request.user)()
+    return user if user.is_authenticated else None
+
+
+def _sse(event, data):
+    """One SSE frame; data is already JSON"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _event_stream(user_id):
+    config = settings.REALTIME
+    client = aioredis.Redis.from_url(config['redis_url'])
+    pubsub = client.pubsub()
+    deadline = time.monotonic() + config['max_stream_seconds']
+
+    try:
+        await pubsub.subscribe(user_channel(user_id))
+        # Reconnect delay for EventSource, then tell the client it is live
+        yield f"retry: {config['retry_ms']}\n\n"
+        yield _sse('ready', json.dumps({'user_id': str(user_id)}))
+
+        while time.monotonic() < deadline:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=config['heartbeat_seconds']
+            )
+            if message is None:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+
+            payload = json.loads(message['data'])
+            yield _sse(payload['event'], json.dumps(payload['data']))
+
+    except aioredis.RedisError as e:
+        # EventSource reconnects after `retry`; the client reloads lists meanwhile
+        logger.warning(f"Realtime stream for {user_id} lost Redis: {str(e)}")
+    finally:
+        await pubsub.close()
+        await client.close()
+
+
+async def realtime_stream(request):
+    """Stream the current user's new messages and notifications as Server-Sent Events"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    user = await _authenticated_user(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    response = StreamingHttpResponse(_event_stream(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable nginx response buffering
+    return response
@@ -0,0 +1,24 @@
+# server/gunicorn.conf.py
+"""
+Gunicorn settings for the API: gunicorn -c gunicorn.conf.py
+
+Workers are uvicorn's, serving server.asgi, so the realtime/stream/
+Server-Sent Events endpoint holds idle connections without tying up a
+worker each; the regular sync views run in Django's thread pool.
+deploy.sh points the gunicorn systemd unit at this file and passes the
+bind address and worker count the unit used before in GUNICORN_BIND and
+GUNICORN_WORKERS; the defaults are gunicorn's own.
+"""
+
+# Plain os.environ: gunicorn reads every top-level name here as a setting, and
+# "config" is one of them
+import os
+
+wsgi_app = 'server.asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+
+# Open streams are closed after REALTIME['max_stream_seconds'] anyway
+graceful_timeout = 30
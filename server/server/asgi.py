@@ -3,6 +3,10 @@ ASGI config for server project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve through ASGI so the realtime/stream/ Server-Sent Events endpoint can
+hold many idle connections without a worker thread each, e.g.:
+gunicorn server.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -32,9 +32,17 @@ app.conf.task_routes = {
     'api.tasks.sync_instagram_data': {'queue': 'instagram'},
     'api.tasks.sync_youtube_data': {'queue': 'youtube'},
     'api.tasks.sync_all_client_data': {'queue': 'sync'},
+    'api.tasks.refresh_expiring_tokens': {'queue': 'sync'},
+    'api.tasks.refresh_token_batch': {'queue': 'sync'},
     'api.tasks.update_client_monthly_performance': {'queue': 'analytics'},
+    'api.tasks.refresh_metrics_rollups': {'queue': 'analytics'},
     'api.tasks.cleanup_old_metrics': {'queue': 'maintenance'},
+    'api.tasks.maintain_metrics_partitions': {'queue': 'maintenance'},
+    'api.tasks.archive_old_notifications': {'queue': 'maintenance'},
     'api.tasks.generate_weekly_reports': {'queue': 'reports'},
+    'api.tasks.build_content_export': {'queue': 'reports'},
+    'api.tasks.expire_content_exports': {'queue': 'maintenance'},
+    'api.tasks.fan_out_notification': {'queue': 'reports'},
 }
 
 @app.task(bind=True)
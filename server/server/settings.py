@@ -203,6 +203,16 @@ INSTAGRAM_CLIENT_SECRET = config('INSTAGRAM_CLIENT_SECRET', default='')
 INSTAGRAM_REDIRECT_URI = config('INSTAGRAM_REDIRECT_URI', default=f"{FRONTEND_URL}/auth/instagram/callback")
 FACEBOOK_APP_ID = config('FACEBOOK_APP_ID', default='')
 FACEBOOK_APP_SECRET = config('FACEBOOK_APP_SECRET', default='')
+# Max parallel Graph API calls per account sync, and whether post insights
+# are fetched through Graph API batch requests (up to 50 media per call)
+INSTAGRAM_INSIGHTS_CONCURRENCY = config('INSTAGRAM_INSIGHTS_CONCURRENCY', default=8, cast=int)
+INSTAGRAM_USE_BATCH_REQUESTS = config('INSTAGRAM_USE_BATCH_REQUESTS', default=True, cast=bool)
+# Fetch profile, insights and media in one field-expanded request per sync
+INSTAGRAM_EXPANDED_FETCH = config('INSTAGRAM_EXPANDED_FETCH', default=True, cast=bool)
+
+# Post syncs fetch only posts newer than the per-account high-water mark and
+# re-check older posts on a decaying schedule (hourly, daily, then weekly)
+INCREMENTAL_POST_SYNC = config('INCREMENTAL_POST_SYNC', default=True, cast=bool)
 
 # Google/YouTube API
 GOOGLE_CLIENT_ID = config('GOOGLE_CLIENT_ID', default='')
@@ -224,6 +234,12 @@ LINKEDIN_CLIENT_SECRET = config('LINKEDIN_CLIENT_SECRET', default='')
 
 # Encryption key for storing access tokens (32 characters)
 ENCRYPTION_KEY = config('ENCRYPTION_KEY', default='your-32-character-encryption-key-here')
+# Previous keys, comma separated, still accepted for decryption during key rotation
+ENCRYPTION_KEY_FALLBACKS = config(
+    'ENCRYPTION_KEY_FALLBACKS',
+    default='',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
 
 # ============ REDIS & CACHE CONFIGURATION ============
 
@@ -243,36 +259,93 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 CELERY_TASK_SOFT_TIME_LIMIT = 25 * 60  # 25 minutes
+# Longest countdown/ETA any task is scheduled with (sync fan-out spread, retries)
+CELERY_MAX_COUNTDOWN_SECONDS = 4 * 60 * 60
+# Redis redelivers tasks not acked within visibility_timeout, and ETA tasks stay
+# unacked until they run, so it must be well above CELERY_MAX_COUNTDOWN_SECONDS.
+# A task held by a worker that dies is redelivered only after this long.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': 3 * CELERY_MAX_COUNTDOWN_SECONDS,
+}
+
+# Fan-out of per-account sync tasks (see api.services.sync_orchestrator)
+# window_seconds: spread task start times over this window
+# concurrency: sync tasks started per slot for the platform. This shapes the start
+#   rate only; how many syncs run at once is bounded by worker concurrency on the queue
+# chunk_size: accounts enqueued per Celery group
+# min_slot_seconds: floor on slot length; large fleets overflow the window instead,
+#   up to CELERY_MAX_COUNTDOWN_SECONDS, after which slots shrink to fit
+SYNC_ORCHESTRATION = {
+    'youtube': {
+        'window_seconds': 60 * 60,
+        'concurrency': 25,
+        'chunk_size': 500,
+        'min_slot_seconds': 10,
+    },
+    'instagram': {
+        'window_seconds': 60 * 60,
+        'concurrency': 50,
+        'chunk_size': 500,
+        'min_slot_seconds': 10,
+    },
+}
+
+# Rate-limited syncs are retried only when the budget frees up within this long.
+# Longer waits (YouTube's daily quota resets at Pacific midnight) drop the task
+# and leave the account to the next scheduled sync run.
+SYNC_RATE_LIMIT_RETRY_MAX_SECONDS = 15 * 60
 
 # Celery Beat Schedule for periodic tasks
 from celery.schedules import crontab
 
 CELERY_BEAT_SCHEDULE = {
-    # Sync all social media data every 4 hours
-    'sync-all-data': {
+    # Sync all YouTube accounts every 6 hours
+    'sync-youtube-accounts': {
+        'task': 'api.tasks.sync_all_client_data',
+        'schedule': crontab(minute=0, hour='*/6'),
+        'kwargs': {'platforms': ['youtube']},
+    },
+    # Sync all Instagram accounts every 4 hours
+    'sync-instagram-accounts': {
         'task': 'api.tasks.sync_all_client_data',
         'schedule': crontab(minute=0, hour='*/4'),
+        'kwargs': {'platforms': ['instagram']},
+    },
+    # Refresh OAuth tokens ahead of expiry
+    'refresh-expiring-tokens': {
+        'task': 'api.tasks.refresh_expiring_tokens',
+        'schedule': crontab(minute='*/15'),
+    },
+    # Keep future RealTimeMetrics partitions created (no-op unless partitioned)
+    'maintain-metrics-partitions': {
+        'task': 'api.tasks.maintain_metrics_partitions',
+        'schedule': crontab(minute=30, hour=1),
+    },
+    # Refold weekly / monthly metrics rollups after each sync round (either platform)
+    'refresh-metrics-rollups': {
+        'task': 'api.tasks.refresh_metrics_rollups',
+        'schedule': crontab(minute=30, hour='0,4,6,8,12,16,18,20'),
     },
     # Clean up old metrics weekly
     'cleanup-old-metrics': {
         'task': 'api.tasks.cleanup_old_metrics',
         'schedule': crontab(minute=0, hour=2, day_of_week=0),
     },
+    # Move old read notifications out of the inbox table
+    'archive-old-notifications': {
+        'task': 'api.tasks.archive_old_notifications',
+        'schedule': crontab(minute=0, hour=3),
+    },
+    # Delete expired bulk content export archives
+    'expire-content-exports': {
+        'task': 'api.tasks.expire_content_exports',
+        'schedule': crontab(minute=15),
+    },
     # Generate weekly reports
     'generate-weekly-reports': {
         'task': 'api.tasks.generate_weekly_reports',
         'schedule': crontab(minute=0, hour=9, day_of_week=1),
     },
-    # Sync all YouTube accounts every 6 hours
-    'sync-youtube-accounts': {
-        'task': 'api.tasks.sync_all_youtube_accounts',
-        'schedule': crontab(minute=0, hour='*/6'),  # Every 6 hours
-    },
-    # Sync all Instagram accounts every 4 hours
-    'sync-instagram-accounts': {
-        'task': 'api.tasks.sync_all_instagram_accounts',
-        'schedule': crontab(minute=0, hour='*/4'),  # Every 4 hours
-    },
     # Aggregate monthly performance daily at 2 AM
     'aggregate-monthly-performance': {
         'task': 'api.tasks.aggregate_monthly_performance',
@@ -313,6 +386,8 @@ CACHE_TIMEOUTS = {
     'api_response': 300,           # 5 minutes
     'dashboard_stats': 180,        # 3 minutes
     'social_metrics': 900,         # 15 minutes
+    'analytics': 300,              # 5 minutes
+    'unread_counts': 900,          # 15 minutes, bounds drift in unread badges
 }
 
 # Cache configuration using Redis
@@ -476,14 +551,105 @@ API_RATE_LIMITS = {
     }
 }
 
+# Proactive token refresh (see api.services.token_refresh_service)
+# proactive: scan for expiring tokens (off: refreshed when a sync finds them expired)
+# lookahead_minutes: refresh tokens expiring within this window
+# batch_size: accounts per refresh task; concurrency: parallel refreshes per task
+TOKEN_REFRESH_JITTER_SECONDS = 120
+TOKEN_REFRESH = {
+    'youtube': {
+        # Google access tokens live for one hour; refresh them lazily at sync time
+        'proactive': False,
+        'lookahead_minutes': 10,
+        'batch_size': 50,
+        'concurrency': 8,
+    },
+    'instagram': {
+        'lookahead_minutes': 7 * 24 * 60,  # Long-lived tokens live for 60 days
+        'batch_size': 50,
+        'concurrency': 4,
+    },
+}
+
+# Server-Sent Events push (see api.services.realtime_service)
+# heartbeat_seconds: keepalive interval on idle streams; max_stream_seconds: streams close and the browser reconnects
+# ticket_max_age_seconds: how long a ticket from realtime/ticket/ can be used to open a stream
+REALTIME = {
+    'redis_url': config('REALTIME_REDIS_URL', default=f'{REDIS_URL}/3'),
+    'heartbeat_seconds': 15,
+    'max_stream_seconds': 300,
+    'retry_ms': 3000,
+    'ticket_max_age_seconds': 60,
+}
+
+# Read notification retention (see api.tasks.archive_old_notifications)
+# archive: copy expired rows to NotificationArchive before deleting them; max_batches bounds one run
+NOTIFICATION_ARCHIVING = {
+    'archive': config('NOTIFICATION_ARCHIVE', default=True, cast=bool),
+    'batch_size': 1000,
+    'max_batches': 200,
+}
+
+# Multi-post content exports (see api.services.content_export_service)
+# max_posts: largest export accepted; expire_hours: finished archives are deleted after this
+# root: where archives are stored, outside MEDIA_ROOT; they are only served through the admin download action
+CONTENT_EXPORTS = {
+    'max_posts': 1000,
+    'expire_hours': 48,
+    'root': config('CONTENT_EXPORTS_ROOT', default=os.path.join(BASE_DIR, 'private', 'exports')),
+}
+
+# Notifications sent to every admin (see NotificationService.notify_admins)
+# async: write them from a Celery worker (reports queue) instead of the request; batch_size: rows per INSERT
+NOTIFICATION_FANOUT = {
+    'async': config('NOTIFICATION_FANOUT_ASYNC', default=True, cast=bool),
+    'batch_size': 500,
+}
+
+# Built YouTube API clients kept per worker process (see api.services.youtube_client_cache)
+YOUTUBE_CLIENT_CACHE_SIZE = 256
+
+# Token buckets shared by all workers (see api.services.rate_governor)
+# capacity: units (YouTube quota units, Graph API calls) the bucket holds
+# period: seconds to refill an empty bucket; one bucket per platform, one per account
+RATE_GOVERNOR_REDIS_URL = config('RATE_GOVERNOR_REDIS_URL', default=f'{REDIS_URL}/2')
+RATE_GOVERNOR_MAX_WAIT = 10  # Seconds a worker may block before rescheduling instead
+RATE_GOVERNOR_BUCKETS = {
+    'youtube': {
+        'platform': {'capacity': API_RATE_LIMITS['youtube']['calls_per_day'], 'period': 24 * 60 * 60},
+        'account': {'capacity': 1500, 'period': 24 * 60 * 60},
+    },
+    'instagram': {
+        'platform': {'capacity': 20000, 'period': 60 * 60},
+        'account': {'capacity': API_RATE_LIMITS['instagram']['calls_per_hour'], 'period': 60 * 60},
+    },
+}
+
 # Data retention settings
 DATA_RETENTION_DAYS = {
     'metrics': 365,  # Keep metrics for 1 year
     'post_metrics': 180,  # Keep post metrics for 6 months
     'sync_logs': 90,  # Keep sync logs for 3 months
+    'read_notifications': 90,  # Read notifications move to NotificationArchive after 3 months
     'payment_logs': 2555,  # Keep payment logs for 7 years (compliance)
 }
 
+# Metrics history tiers (see api.services.metrics_rollup_service)
+# daily_days / weekly_days: longest range served from daily rows / weekly rollups; longer ranges read monthly rollups
+# refresh_lookback_days: days of recent syncs whose weeks and months each refresh refolds
+METRICS_ROLLUP = {
+    'daily_days': 90,
+    'weekly_days': 730,
+    'refresh_lookback_days': 7,
+}
+
+# Monthly RealTimeMetrics partitions on PostgreSQL (see api.services.metrics_partition_service)
+# months_ahead: future partitions kept created; archive_expired: detach expired months instead of dropping
+METRICS_PARTITIONING = {
+    'months_ahead': config('METRICS_PARTITION_MONTHS_AHEAD', default=3, cast=int),
+    'archive_expired': config('METRICS_PARTITION_ARCHIVE', default=False, cast=bool),
+}
+
 # Webhook settings for real-time updates
 WEBHOOK_SECRET = config('WEBHOOK_SECRET', default='your-webhook-secret-key')
 WEBHOOK_VERIFY_TOKEN = config('WEBHOOK_VERIFY_TOKEN', default='your-verify-token')